@@ -13,7 +13,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.core.config import settings
-from app.models import SQLModel, User, Subscription
+from app.models import SQLModel, User, Subscription, SubscriptionArchive, DailySnapshot, Budget, BudgetAlert, UserDirectory, IdBlock, FxRate, TokenRevocation, RateLimitBucket, IdempotencyKey
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
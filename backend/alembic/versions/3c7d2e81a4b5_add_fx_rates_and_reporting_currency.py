@@ -0,0 +1,36 @@
+"""Add fx rates table and reporting currency
+
+Revision ID: 3c7d2e81a4b5
+Revises: 9f927a2e9c19
+Create Date: 2026-10-19 09:12:44.301518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d2e81a4b5'
+down_revision: Union[str, Sequence[str], None] = '9f927a2e9c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fx_rates',
+    sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False),
+    sa.Column('rate', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('currency')
+    )
+    op.add_column('users', sa.Column('reporting_currency', sqlmodel.sql.sqltypes.AutoString(), server_default='USD', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'reporting_currency')
+    op.drop_table('fx_rates')
@@ -0,0 +1,46 @@
+"""Add unique budget category index
+
+Revision ID: 4f2a7c9d1e63
+Revises: 6a1c8e3f9b27
+Create Date: 2026-10-22 10:12:40.518274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a7c9d1e63'
+down_revision: Union[str, Sequence[str], None] = '6a1c8e3f9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Budgets sharing a user and category with an older (lower id) budget
+DUPLICATES = """
+    SELECT id FROM budgets b
+    WHERE EXISTS (
+        SELECT 1 FROM budgets older
+        WHERE older.user_id = b.user_id
+          AND coalesce(older.category, '') = coalesce(b.category, '')
+          AND older.id < b.id
+    )
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Drop duplicates left by concurrent creates, keeping the oldest budget
+    op.execute(f"DELETE FROM budget_alerts WHERE budget_id IN ({DUPLICATES})")
+    op.execute(f"DELETE FROM budgets WHERE id IN ({DUPLICATES})")
+    op.create_index(
+        'ix_budgets_user_category', 'budgets', ['user_id', sa.text("coalesce(category, '')")],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_budgets_user_category', table_name='budgets')
@@ -0,0 +1,46 @@
+"""Add user directory and id blocks
+
+Revision ID: 5e0b9c7d3a14
+Revises: c3e8a1f5d920
+Create Date: 2026-10-20 10:14:52.208931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b9c7d3a14'
+down_revision: Union[str, Sequence[str], None] = 'c3e8a1f5d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_directory',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('shard', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('calendar_token', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('moving', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_user_directory_email'), 'user_directory', ['email'], unique=True)
+    op.create_index(op.f('ix_user_directory_calendar_token'), 'user_directory', ['calendar_token'], unique=True)
+    op.create_table('id_blocks',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('next_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_blocks')
+    op.drop_index(op.f('ix_user_directory_calendar_token'), table_name='user_directory')
+    op.drop_index(op.f('ix_user_directory_email'), table_name='user_directory')
+    op.drop_table('user_directory')
@@ -0,0 +1,64 @@
+"""Add budgets and budget alerts
+
+Revision ID: 6a1c8e3f9b27
+Revises: 2d9e4c6b8f13
+Create Date: 2026-10-21 09:47:13.204856
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1c8e3f9b27'
+down_revision: Union[str, Sequence[str], None] = '2d9e4c6b8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('budgets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('monthly_limit', sa.Float(), nullable=False),
+    sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('warn_ratio', sa.Float(), nullable=False),
+    sa.Column('current_total', sa.Float(), nullable=False),
+    sa.Column('alert_level', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_budgets_user_id'), 'budgets', ['user_id'], unique=False)
+    op.create_table('budget_alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('budget_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('current_total', sa.Float(), nullable=False),
+    sa.Column('monthly_limit', sa.Float(), nullable=False),
+    sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('delivered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_budget_alerts_user_id'), 'budget_alerts', ['user_id'], unique=False)
+    op.create_index(op.f('ix_budget_alerts_delivered_at'), 'budget_alerts', ['delivered_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_budget_alerts_delivered_at'), table_name='budget_alerts')
+    op.drop_index(op.f('ix_budget_alerts_user_id'), table_name='budget_alerts')
+    op.drop_table('budget_alerts')
+    op.drop_index(op.f('ix_budgets_user_id'), table_name='budgets')
+    op.drop_table('budgets')
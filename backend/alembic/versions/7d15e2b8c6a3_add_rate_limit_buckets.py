@@ -0,0 +1,36 @@
+"""Add rate limit buckets
+
+Revision ID: 7d15e2b8c6a3
+Revises: e4a9c3f1b7d2
+Create Date: 2026-10-19 15:22:48.716204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d15e2b8c6a3'
+down_revision: Union[str, Sequence[str], None] = 'e4a9c3f1b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('refilled_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_rate_limit_buckets_refilled_at'), 'rate_limit_buckets', ['refilled_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_rate_limit_buckets_refilled_at'), table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,28 @@
+"""Add user admin flag
+
+Revision ID: 8b3f5a2d7c61
+Revises: 5e0b9c7d3a14
+Create Date: 2026-10-20 16:02:37.514820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f5a2d7c61'
+down_revision: Union[str, Sequence[str], None] = '5e0b9c7d3a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_admin')
@@ -0,0 +1,33 @@
+"""Add calendar feed token and subscriptions version
+
+Revision ID: b81f4c0d9e27
+Revises: 3c7d2e81a4b5
+Create Date: 2026-10-19 11:40:02.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f4c0d9e27'
+down_revision: Union[str, Sequence[str], None] = '3c7d2e81a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('calendar_token', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('users', sa.Column('subscriptions_changed_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    op.create_index(op.f('ix_users_calendar_token'), 'users', ['calendar_token'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_calendar_token'), table_name='users')
+    op.drop_column('users', 'subscriptions_changed_at')
+    op.drop_column('users', 'calendar_token')
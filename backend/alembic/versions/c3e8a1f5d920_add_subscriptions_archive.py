@@ -0,0 +1,64 @@
+"""Add subscriptions archive
+
+Revision ID: c3e8a1f5d920
+Revises: f1b6d47a2c85
+Create Date: 2026-10-19 18:40:12.662104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a1f5d920'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d47a2c85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # Mirror the live table's column types exactly (enum types included),
+        # so rows copy across and UNION ALL with it unchanged
+        op.execute("CREATE TABLE subscriptions_archive (LIKE subscriptions)")
+        op.add_column('subscriptions_archive', sa.Column('archived_at', sa.DateTime(), nullable=False))
+        op.create_primary_key('subscriptions_archive_pkey', 'subscriptions_archive', ['id'])
+        op.create_foreign_key(
+            'subscriptions_archive_user_id_fkey', 'subscriptions_archive', 'users', ['user_id'], ['id']
+        )
+    else:
+        op.create_table('subscriptions_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('interval', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('next_renewal_date', sa.Date(), nullable=False),
+        sa.Column('vendor', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('custom_interval_days', sa.Integer(), nullable=True),
+        sa.Column('last_paid_at', sa.Date(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('tags', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('color', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('website', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('status', sa.Enum('ACTIVE', 'CANCELLED', 'PAUSED', name='subscriptionstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index(op.f('ix_subscriptions_archive_user_id'), 'subscriptions_archive', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_subscriptions_archive_user_id'), table_name='subscriptions_archive')
+    op.drop_table('subscriptions_archive')
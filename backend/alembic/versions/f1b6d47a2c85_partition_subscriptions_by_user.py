@@ -0,0 +1,96 @@
+"""Hash-partition subscriptions by user_id
+
+Revision ID: f1b6d47a2c85
+Revises: a52f8e06d3c1
+Create Date: 2026-10-19 18:02:37.415920
+
+Postgres only: subscriptions becomes a declaratively partitioned table
+(PARTITION BY HASH (user_id)) with PARTITIONS partitions. A partitioned
+table's primary key must include the partition key, so it becomes
+(id, user_id); ids still come from the existing subscriptions_id_seq.
+Rows are copied under an exclusive lock, so run this in a maintenance
+window on large tables. Other databases are left unpartitioned.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d47a2c85'
+down_revision: Union[str, Sequence[str], None] = 'a52f8e06d3c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 8
+
+INDEXES = {
+    'ix_subscriptions_category': ['category'],
+    'ix_subscriptions_name': ['name'],
+    'ix_subscriptions_next_renewal_date': ['next_renewal_date'],
+    'ix_subscriptions_user_id': ['user_id'],
+}
+
+
+def _create_indexes(partial: bool) -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'subscriptions', columns, unique=False)
+    if partial:
+        # Hot reads only look at active rows
+        op.create_index(
+            'ix_subscriptions_active_user_renewal', 'subscriptions', ['user_id', 'next_renewal_date'],
+            unique=False, postgresql_where=sa.text("status = 'ACTIVE'")
+        )
+
+
+def _rebuild(old_name: str, partitioned: bool, primary_key: str) -> None:
+    """Recreate subscriptions like the renamed table old_name, copy rows over and drop it."""
+    op.execute(f"CREATE TABLE subscriptions (LIKE {old_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+               + (" PARTITION BY HASH (user_id)" if partitioned else ""))
+    op.execute(f"ALTER TABLE subscriptions ADD CONSTRAINT subscriptions_pkey PRIMARY KEY ({primary_key})")
+    op.create_foreign_key('subscriptions_user_id_fkey', 'subscriptions', 'users', ['user_id'], ['id'])
+    if partitioned:
+        for remainder in range(PARTITIONS):
+            op.execute(
+                f"CREATE TABLE subscriptions_p{remainder} PARTITION OF subscriptions "
+                f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+            )
+
+    op.execute(f"INSERT INTO subscriptions SELECT * FROM {old_name}")
+    op.execute("ALTER SEQUENCE subscriptions_id_seq OWNED BY subscriptions.id")
+    op.execute(f"DROP TABLE {old_name}")
+    # Indexes after the copy: one bulk build instead of per-row maintenance
+    _create_indexes(partial=partitioned)
+    op.execute("ANALYZE subscriptions")
+
+
+def _rename_current(new_name: str) -> None:
+    op.execute("LOCK TABLE subscriptions IN ACCESS EXCLUSIVE MODE")
+    op.rename_table('subscriptions', new_name)
+    # Free the index and constraint names for the new table
+    for name in [*INDEXES, 'ix_subscriptions_active_user_renewal']:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute(f"ALTER TABLE {new_name} RENAME CONSTRAINT subscriptions_pkey TO {new_name}_pkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        # Without partitioning support, just add the partial index
+        op.create_index(
+            'ix_subscriptions_active_user_renewal', 'subscriptions', ['user_id', 'next_renewal_date'],
+            unique=False
+        )
+        return
+    _rename_current('subscriptions_unpartitioned')
+    _rebuild('subscriptions_unpartitioned', partitioned=True, primary_key='id, user_id')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_subscriptions_active_user_renewal', table_name='subscriptions')
+        return
+    _rename_current('subscriptions_partitioned')
+    _rebuild('subscriptions_partitioned', partitioned=False, primary_key='id')
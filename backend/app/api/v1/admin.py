@@ -0,0 +1,178 @@
+# app/api/v1/admin.py
+from datetime import date, timedelta
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.db import statement_timeout
+from app.deps import AdminUser
+from app.schemas import CurrencyTotal
+from app.serialization import ORJSONResponse
+from app.services.reports import (
+    cached_report,
+    duplicate_report,
+    renewal_report,
+    report_cache,
+    stream_user_breakdown,
+    subscription_report
+)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(statement_timeout(120_000))]
+)
+
+CurrencyParam = Annotated[str, Query(pattern=r"^[A-Za-z]{3}$")]
+
+# Longest range the renewals report will cover
+MAX_RENEWAL_DAYS = 366
+
+
+class CategoryTotal(BaseModel):
+    category: str
+    total_amount: float
+    count: int
+    by_currency: list[CurrencyTotal] = []
+
+
+class IntervalTotal(BaseModel):
+    interval: str
+    total_amount: float
+    count: int
+    by_currency: list[CurrencyTotal] = []
+
+
+class PlatformSubscriptionReport(BaseModel):
+    currency: str
+    total_monthly_cost: float
+    active_subscriptions: int
+    by_currency: list[CurrencyTotal]
+    by_category: list[CategoryTotal]
+    by_interval: list[IntervalTotal]
+
+
+class RenewalDay(BaseModel):
+    date: date
+    total_amount: float
+    count: int
+    by_currency: list[CurrencyTotal] = []
+
+
+class PlatformRenewalReport(BaseModel):
+    currency: str
+    start: date
+    end: date
+    total_amount: float
+    count: int
+    days: list[RenewalDay]  # Only days with at least one renewal
+
+
+@router.get("/reports/subscriptions", response_model=PlatformSubscriptionReport, response_class=ORJSONResponse)
+def get_subscription_report(
+    request: Request,
+    admin: AdminUser,
+    currency: CurrencyParam = "USD"
+):
+    """
+    Active subscriptions across all users by category, interval and currency.
+
+    Amounts are normalized monthly costs converted into currency, with a
+    breakdown by original currency. Cached for ADMIN_REPORT_CACHE_SECONDS.
+    """
+    currency = currency.upper()
+    return cached_report(
+        ("subscriptions", currency),
+        lambda: subscription_report(currency, request)
+    )
+
+
+@router.get("/reports/renewals", response_model=PlatformRenewalReport, response_class=ORJSONResponse)
+def get_renewal_report(
+    request: Request,
+    admin: AdminUser,
+    start: date | None = None,
+    end: date | None = None,
+    currency: CurrencyParam = "USD"
+):
+    """
+    Renewal volume per day across all users (default: the next 30 days).
+
+    Counts every charge active subscriptions make in the range, recurrences
+    included, with amounts converted into currency. Cached for
+    ADMIN_REPORT_CACHE_SECONDS.
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=30)
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    if (end - start).days > MAX_RENEWAL_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range must be at most {MAX_RENEWAL_DAYS} days"
+        )
+
+    currency = currency.upper()
+    return cached_report(
+        ("renewals", start, end, currency),
+        lambda: renewal_report(start, end, currency, request)
+    )
+
+
+class DuplicateUser(BaseModel):
+    user_id: int
+    groups: int
+    redundant_monthly_cost: float
+
+
+class PlatformDuplicateReport(BaseModel):
+    currency: str
+    users_scanned: int
+    users_with_duplicates: int
+    groups: int
+    subscriptions_in_groups: int
+    redundant_monthly_cost: float  # Combined cost of all but the priciest member of each group
+    top_users: list[DuplicateUser]
+
+
+@router.get("/reports/duplicates", response_model=PlatformDuplicateReport, response_class=ORJSONResponse)
+def get_duplicate_report(
+    request: Request,
+    admin: AdminUser,
+    currency: CurrencyParam = "USD"
+):
+    """
+    Likely duplicate subscriptions across all users.
+
+    Precomputed in USD by the daily duplicate scan; other currencies (or a
+    cold cache) are computed on demand and cached for
+    ADMIN_REPORT_CACHE_SECONDS.
+    """
+    currency = currency.upper()
+    return cached_report(
+        ("duplicates", currency),
+        lambda: duplicate_report(currency, request)
+    )
+
+
+@router.get("/reports/breakdown")
+def get_user_breakdown(request: Request, admin: AdminUser):
+    """
+    Per-user active subscription totals by category and currency.
+
+    A JSON array of {user_id, category, currency, count, monthly_total}
+    streamed through server-side cursors; monthly totals are in the
+    original currency. Served from cache when a recent copy exists.
+    """
+    headers = {"Content-Disposition": 'attachment; filename="subscription-breakdown.json"'}
+    cached = report_cache.get(("breakdown",))
+    if cached is not None:
+        return Response(cached, media_type="application/json", headers=headers)
+    return StreamingResponse(
+        stream_user_breakdown(request),
+        media_type="application/json",
+        headers=headers
+    )
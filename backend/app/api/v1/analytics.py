@@ -1,27 +1,49 @@
 # app/api/v1/analytics.py
-from typing import Annotated
+from typing import Annotated, Literal
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func
-from app.db import get_session
-from app.models import Subscription, SubscriptionStatus, BillingCycle
-from app.schemas import CategorySpend, UpcomingRenewal, SubscriptionResponse
-from app.deps import CurrentUser
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session
+from app.db import statement_timeout
+from app.models import Subscription, BillingCycle
+from app.schemas import (
+    CategorySpend,
+    CurrencyTotal,
+    UpcomingRenewal,
+    ScenarioRequest,
+    ScenarioResponse
+)
+from app.core.singleflight import coalesced
+from app.deps import CurrentUser, get_read_session
+from app.serialization import ORJSONResponse, SUBSCRIPTION_ENCODER
+from app.services.fx import fx_rates, reporting_currency
+from app.services.snapshots import fetch_snapshot_rows, spend_trends
+from app.services.subscriptions import (
+    category_spend,
+    fetch_upcoming_rows,
+    grouped_spend,
+    monthly_spend
+)
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Optional ISO 4217 override of the user's reporting currency
+CurrencyParam = Annotated[str | None, Query(pattern=r"^[A-Za-z]{3}$")]
+
 
 class SummaryStats(BaseModel):
     total_monthly_cost: float
     total_subscriptions: int
     average_cost: float
+    currency: str = "USD"
+    by_currency: list[CurrencyTotal] = []
 
 
 class CycleSpend(BaseModel):
     interval: str  # Using interval to match database
     total_amount: float
     count: int
+    by_currency: list[CurrencyTotal] = []
 
 
 class MonthlyProjection(BaseModel):
@@ -29,124 +51,132 @@ class MonthlyProjection(BaseModel):
     projected_cost: float
 
 
+class CalendarDay(BaseModel):
+    date: date
+    total_amount: float
+    count: int
+
+
+class CashFlowCalendar(BaseModel):
+    currency: str
+    start: date
+    end: date
+    total_amount: float
+    count: int
+    days: list[CalendarDay]  # Only days with at least one expected charge
+
+
+class TrendCategory(BaseModel):
+    category: str
+    total_amount: float
+    count: int
+
+
+class TrendPoint(BaseModel):
+    date: date  # Start of the day, week or month
+    snapshot_date: date  # The snapshot representing it (the period's latest)
+    total_monthly_cost: float
+    count: int
+    by_category: list[TrendCategory]
+
+
+class SpendTrends(BaseModel):
+    currency: str
+    start: date
+    end: date
+    resolution: str
+    points: list[TrendPoint]  # Only periods with a snapshot
+
+
+# Longest range the calendar endpoint will expand
+MAX_CALENDAR_DAYS = 3 * 366
+
+# Longest range of daily snapshots the trends endpoint will read
+MAX_TRENDS_DAYS = 3 * 366
+
+
 @router.get("/summary", response_model=SummaryStats)
+@coalesced("analytics.summary")
 def get_summary(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[Session, Depends(get_read_session)],
+    currency: CurrencyParam = None
 ):
     """
     Get summary statistics.
 
-    Returns total monthly cost, subscription count, and average cost per subscription.
+    Returns total monthly cost, subscription count, and average cost per subscription,
+    converted into the reporting currency, plus a breakdown by original currency.
     """
-    statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
+    target = reporting_currency(current_user, currency)
+    total_monthly, count, by_currency = monthly_spend(
+        session, current_user.id, target, fx_rates.get_rates()
     )
-    active_subs = session.exec(statement).all()
-
-    # Calculate total monthly spend
-    total_monthly = 0.0
-    for sub in active_subs:
-        if sub.interval == "weekly":
-            total_monthly += sub.amount * 52 / 12
-        elif sub.interval == "monthly":
-            total_monthly += sub.amount
-        elif sub.interval == "quarterly":
-            total_monthly += sub.amount * 4 / 12
-        elif sub.interval == "yearly":
-            total_monthly += sub.amount / 12
-
-    count = len(active_subs)
     average = total_monthly / count if count > 0 else 0
 
     return SummaryStats(
         total_monthly_cost=round(total_monthly, 2),
         total_subscriptions=count,
-        average_cost=round(average, 2)
+        average_cost=round(average, 2),
+        currency=target,
+        by_currency=by_currency
     )
 
 
 @router.get("/by-category", response_model=list[CategorySpend])
+@coalesced("analytics.by_category")
 def get_spending_by_category(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[Session, Depends(get_read_session)],
+    currency: CurrencyParam = None
 ):
     """
     Get spending grouped by category.
 
-    Returns monthly cost breakdown for each category.
+    Returns monthly cost breakdown for each category, in the reporting currency.
     """
-    statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
-    )
-    active_subs = session.exec(statement).all()
-
-    # Calculate monthly cost per category
-    category_totals = {}
-    category_counts = {}
-
-    for sub in active_subs:
-        monthly_cost = 0.0
-        if sub.interval == "weekly":
-            monthly_cost = sub.amount * 52 / 12
-        elif sub.interval == "monthly":
-            monthly_cost = sub.amount
-        elif sub.interval == "quarterly":
-            monthly_cost = sub.amount * 4 / 12
-        elif sub.interval == "yearly":
-            monthly_cost = sub.amount / 12
-
-        category = sub.category or "Other"
-        category_totals[category] = category_totals.get(category, 0) + monthly_cost
-        category_counts[category] = category_counts.get(category, 0) + 1
-
-    return [
-        CategorySpend(
-            category=cat,
-            total_amount=round(amount, 2),
-            count=category_counts[cat]
-        )
-        for cat, amount in category_totals.items()
-    ]
+    target = reporting_currency(current_user, currency)
+    return category_spend(session, current_user.id, target, fx_rates.get_rates())
 
 
 @router.get("/by-cycle", response_model=list[CycleSpend])
+@coalesced("analytics.by_cycle")
 def get_spending_by_cycle(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[Session, Depends(get_read_session)],
+    currency: CurrencyParam = None
 ):
     """
     Get spending grouped by billing cycle.
 
-    Returns the sum of costs for each billing cycle type.
+    Returns the sum of costs for each billing cycle type, in the reporting currency.
     """
-    statement = select(
+    target = reporting_currency(current_user, currency)
+    results = grouped_spend(
+        session,
+        current_user.id,
+        Subscription.amount,
         Subscription.interval,
-        func.sum(Subscription.amount).label("total"),
-        func.count(Subscription.id).label("count")
-    ).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
-    ).group_by(Subscription.interval)
-
-    results = session.exec(statement).all()
+        target,
+        fx_rates.get_rates()
+    )
 
     return [
         CycleSpend(
-            interval=str(row[0]),
-            total_amount=round(float(row[1] or 0), 2),
-            count=int(row[2] or 0)
+            interval=str(interval),
+            total_amount=round(total, 2),
+            count=count,
+            by_currency=by_currency
         )
-        for row in results
+        for interval, total, count, by_currency in results
     ]
 
 
-@router.get("/upcoming", response_model=list[UpcomingRenewal])
+@router.get("/upcoming", response_model=list[UpcomingRenewal], response_class=ORJSONResponse)
+@coalesced("analytics.upcoming")
 def get_upcoming_renewals(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[Session, Depends(get_read_session)],
     days: int = 30
 ):
     """
@@ -157,52 +187,140 @@ def get_upcoming_renewals(
     today = date.today()
     end_date = today + timedelta(days=days)
 
-    statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE,
-        Subscription.next_renewal_date >= today,
-        Subscription.next_renewal_date <= end_date
-    ).order_by(Subscription.next_renewal_date)
+    upcoming_rows = fetch_upcoming_rows(session, current_user.id, today, end_date)
+
+    return ORJSONResponse([
+        {
+            "subscription": SUBSCRIPTION_ENCODER.to_dict(row),
+            "days_until_renewal": (row.renews_on - today).days
+        }
+        for row in upcoming_rows
+    ])
+
+
+@router.get(
+    "/calendar",
+    response_model=CashFlowCalendar,
+    response_class=ORJSONResponse,
+    dependencies=[Depends(statement_timeout(15_000))]
+)
+@coalesced("analytics.calendar")
+def get_cash_flow_calendar(
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)],
+    start: Annotated[date | None, Query(alias="from")] = None,
+    end: Annotated[date | None, Query(alias="to")] = None,
+    currency: CurrencyParam = None
+):
+    """
+    Get expected charges per day.
+
+    Expands recurring billing across the range (default: the next 30 days)
+    and returns per-day totals and charge counts in the reporting currency.
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=30)
 
-    upcoming_subs = session.exec(statement).all()
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'to' must not be before 'from'"
+        )
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Range is limited to {MAX_CALENDAR_DAYS} days"
+        )
 
-    return [
-        UpcomingRenewal(
-            subscription=SubscriptionResponse.model_validate(sub),
-            days_until_renewal=(sub.next_renewal_date - today).days
+    # NumPy is imported on first use, keeping worker start-up fast
+    import numpy as np
+    from app.services.projection import daily_charges
+
+    target = reporting_currency(current_user, currency)
+    totals, counts = daily_charges(
+        session, current_user.id, start, end, target, fx_rates.get_rates()
+    )
+
+    charged = np.flatnonzero(counts)
+    charged_dates = (np.datetime64(start, "D") + charged).tolist()
+
+    return ORJSONResponse({
+        "currency": target,
+        "start": start,
+        "end": end,
+        "total_amount": round(float(totals.sum()), 2),
+        "count": int(counts.sum()),
+        "days": [
+            {"date": day, "total_amount": round(total, 2), "count": count}
+            for day, total, count in zip(
+                charged_dates, totals[charged].tolist(), counts[charged].tolist()
+            )
+        ]
+    })
+
+
+@router.get("/trends", response_model=SpendTrends, response_class=ORJSONResponse)
+@coalesced("analytics.trends")
+def get_spend_trends(
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)],
+    start: Annotated[date | None, Query(alias="from")] = None,
+    end: Annotated[date | None, Query(alias="to")] = None,
+    resolution: Literal["day", "week", "month"] = "day",
+    currency: CurrencyParam = None
+):
+    """
+    Get monthly spend over time from the nightly snapshots.
+
+    Returns one point per day (default: the last 90 days), or per week or
+    month with resolution, each with a per-category breakdown, converted
+    into the reporting currency at current rates.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=90)
+
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'to' must not be before 'from'"
+        )
+    if (end - start).days + 1 > MAX_TRENDS_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Range is limited to {MAX_TRENDS_DAYS} days"
         )
-        for sub in upcoming_subs
-    ]
+
+    target = reporting_currency(current_user, currency)
+    rows = fetch_snapshot_rows(session, current_user.id, start, end)
+
+    return ORJSONResponse({
+        "currency": target,
+        "start": start,
+        "end": end,
+        "resolution": resolution,
+        "points": spend_trends(rows, resolution, target, fx_rates.get_rates()),
+    })
 
 
 @router.get("/monthly-projection", response_model=list[MonthlyProjection])
+@coalesced("analytics.monthly_projection")
 def get_monthly_projection(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)],
-    months: int = 12
+    session: Annotated[Session, Depends(get_read_session)],
+    months: int = 12,
+    currency: CurrencyParam = None
 ):
     """
     Project monthly costs for the next N months.
 
     Default is 12 months (1 year).
     """
-    statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
-    )
-    active_subs = session.exec(statement).all()
+    target = reporting_currency(current_user, currency)
 
     # Calculate total monthly spend
-    total_monthly = 0.0
-    for sub in active_subs:
-        if sub.interval == "weekly":
-            total_monthly += sub.amount * 52 / 12
-        elif sub.interval == "monthly":
-            total_monthly += sub.amount
-        elif sub.interval == "quarterly":
-            total_monthly += sub.amount * 4 / 12
-        elif sub.interval == "yearly":
-            total_monthly += sub.amount / 12
+    total_monthly, _, _ = monthly_spend(
+        session, current_user.id, target, fx_rates.get_rates()
+    )
 
     # Generate projection for next N months
     projections = []
@@ -227,3 +345,77 @@ def get_monthly_projection(
         )
 
     return projections
+
+
+@router.post(
+    "/scenarios",
+    response_model=ScenarioResponse,
+    dependencies=[Depends(statement_timeout(15_000))]
+)
+def simulate_scenarios(
+    scenario_request: ScenarioRequest,
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)]
+):
+    """
+    Simulate what-if scenarios against active subscriptions.
+
+    Each scenario can cancel subscriptions, change amounts and change billing
+    cycles. Subscriptions are loaded once and all scenarios are evaluated
+    together; returns monthly and yearly deltas plus a month-by-month timeline
+    of expected charges for each scenario.
+    """
+    # NumPy is imported on first use, keeping worker start-up fast
+    from app.services.projection import (
+        build_scenario_matrices,
+        evaluate_scenarios,
+        load_snapshot,
+        month_labels
+    )
+
+    target = reporting_currency(current_user, scenario_request.currency)
+    snapshot = load_snapshot(session, current_user.id, target, fx_rates.get_rates())
+
+    scenarios = scenario_request.scenarios
+    try:
+        matrices = build_scenario_matrices(
+            snapshot,
+            [scenario.cancel for scenario in scenarios],
+            [scenario.amount_changes for scenario in scenarios],
+            [{sub_id: cycle.value for sub_id, cycle in scenario.interval_changes.items()}
+             for scenario in scenarios]
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown or inactive subscription ids: {e.args[0]}"
+        ) from e
+
+    today = date.today()
+    monthly, timeline = evaluate_scenarios(snapshot, matrices, today, scenario_request.months)
+    labels = month_labels(today, scenario_request.months)
+
+    # Row 0 is the baseline
+    baseline_monthly = float(monthly[0])
+    deltas = monthly[1:] - baseline_monthly
+    timeline_deltas = timeline[1:] - timeline[0]
+
+    return ScenarioResponse(
+        currency=target,
+        baseline_monthly_cost=round(baseline_monthly, 2),
+        scenarios=[
+            {
+                "name": scenario.name,
+                "monthly_cost": round(float(monthly[i + 1]), 2),
+                "monthly_delta": round(float(deltas[i]), 2),
+                "yearly_delta": round(float(deltas[i]) * 12, 2),
+                "timeline": [
+                    {"month": label, "projected_cost": round(cost, 2), "delta": round(delta, 2)}
+                    for label, cost, delta in zip(
+                        labels, timeline[i + 1].tolist(), timeline_deltas[i].tolist()
+                    )
+                ]
+            }
+            for i, scenario in enumerate(scenarios)
+        ]
+    )
@@ -2,18 +2,21 @@
 import logging
 from typing import Annotated
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlmodel import Session
 from sqlalchemy.exc import IntegrityError, OperationalError
 from app.db import get_session
 from app.models import User
-from app.schemas import UserCreate, UserLogin, UserResponse, Token
+from app.schemas import UserCreate, UserLogin, UserResponse, UserUpdate, Token
+from app.core.ratelimit import check_auth_rate_limit
 from app.core.security import (
     get_password_hash,
     verify_password,
     create_access_token
 )
-from app.deps import CurrentUser
+from app.deps import CurrentDBUser, UserSession
+from app.services.auth import deactivate_user, token_claims
+from app.services.directory import create_user, find_user_by_email
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -23,6 +26,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(
+    request: Request,
     user_data: UserCreate,
     session: Annotated[Session, Depends(get_session)]
 ):
@@ -32,13 +36,16 @@ def register(
     Creates a new user account with hashed password.
     Returns the created user information (without password).
     """
+    # Throttle before any hashing or query
+    check_auth_rate_limit(request, user_data.email)
+
     # Check if user already exists
-    statement = select(User).where(User.email == user_data.email)
-    existing_user = session.exec(statement).first()
+    existing_user = find_user_by_email(session, user_data.email)
 
     if existing_user:
         logger.warning(
-            f"Registration attempt with existing email: {user_data.email}"
+            "Registration attempt with existing email: %s", user_data.email,
+            extra={"sample": "auth.register_existing"}
         )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -53,19 +60,17 @@ def register(
     )
 
     try:
-        session.add(db_user)
-        session.commit()
-        session.refresh(db_user)
+        db_user = create_user(session, db_user)
 
         # Log successful registration
         logger.info(
-            f"New user registered successfully: {db_user.email} (ID: {db_user.id})"
+            "New user registered successfully: %s (ID: %s)", db_user.email, db_user.id
         )
     except IntegrityError as e:
         # Email already exists (race condition - two simultaneous requests)
         session.rollback()
         logger.error(
-            f"IntegrityError during registration for {user_data.email}: {str(e)}"
+            "IntegrityError during registration for %s: %s", user_data.email, e
         )
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -75,7 +80,7 @@ def register(
         # Database connection issue, disk full, etc.
         session.rollback()
         logger.error(
-            f"OperationalError during registration for {user_data.email}: {str(e)}"
+            "OperationalError during registration for %s: %s", user_data.email, e
         )
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -85,7 +90,7 @@ def register(
         # Catch any other unexpected errors
         session.rollback()
         logger.critical(
-            f"Unexpected error during registration for {user_data.email}: {str(e)}",
+            "Unexpected error during registration for %s: %s", user_data.email, e,
             exc_info=True  # This includes the full stack trace
         )
         raise HTTPException(
@@ -98,6 +103,7 @@ def register(
 
 @router.post("/login", response_model=Token)
 def login(
+    request: Request,
     credentials: UserLogin,
     session: Annotated[Session, Depends(get_session)]
 ):
@@ -106,9 +112,11 @@ def login(
 
     Validates credentials and returns a JWT access token.
     """
+    # Throttle before any hashing or query
+    check_auth_rate_limit(request, credentials.email)
+
     # Find user by email
-    statement = select(User).where(User.email == credentials.email)
-    user = session.exec(statement).first()
+    user = find_user_by_email(session, credentials.email)
 
     # Timing attack mitigation: Always hash a password, even if user doesn't exist
     # This ensures both paths (user exists / doesn't exist) take similar time
@@ -121,7 +129,8 @@ def login(
             "$2b$12$dummyhashtopreventtimingattacksshouldnotmatchanything"
         )
         logger.warning(
-            f"Failed login attempt - email not found: {credentials.email}"
+            "Failed login attempt - email not found: %s", credentials.email,
+            extra={"sample": "auth.login_failed"}
         )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,7 +141,8 @@ def login(
     # Verify password
     if not verify_password(credentials.password, user.hashed_password):
         logger.warning(
-            f"Failed login attempt - incorrect password for: {credentials.email}"
+            "Failed login attempt - incorrect password for: %s", credentials.email,
+            extra={"sample": "auth.login_failed"}
         )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -143,7 +153,8 @@ def login(
     # Check if user is active
     if not user.is_active:
         logger.warning(
-            f"Login attempt by inactive user: {credentials.email}"
+            "Login attempt by inactive user: %s", credentials.email,
+            extra={"sample": "auth.login_inactive"}
         )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -151,17 +162,17 @@ def login(
         )
 
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
 
     logger.info(
-        f"User logged in successfully: {user.email} (ID: {user.id})"
+        "User logged in successfully: %s (ID: %s)", user.email, user.id
     )
 
     return Token(access_token=access_token)
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: CurrentUser):
+def get_current_user_info(current_user: CurrentDBUser):
     """
     Get current user information.
 
@@ -169,3 +180,48 @@ def get_current_user_info(current_user: CurrentUser):
     Returns the authenticated user's profile.
     """
     return current_user
+
+
+@router.patch("/me", response_model=UserResponse)
+def update_current_user_info(
+    user_data: UserUpdate,
+    current_user: CurrentDBUser,
+    session: UserSession
+):
+    """
+    Update current user profile.
+
+    Only updates fields that are provided in the request. With stateless
+    auth, tokens keep the profile claims they were issued with (e.g. the
+    reporting currency) until the user logs in again.
+    """
+    update_data = user_data.model_dump(exclude_unset=True)
+
+    if update_data.get("reporting_currency"):
+        update_data["reporting_currency"] = update_data["reporting_currency"].upper()
+
+    for key, value in update_data.items():
+        setattr(current_user, key, value)
+
+    current_user.updated_at = datetime.utcnow()
+
+    session.add(current_user)
+    session.commit()
+    session.refresh(current_user)
+
+    return current_user
+
+
+@router.post("/me/deactivate", response_model=UserResponse)
+def deactivate_current_user(
+    current_user: CurrentDBUser,
+    session: UserSession
+):
+    """
+    Deactivate the current user's account.
+
+    Revokes all outstanding tokens, including under stateless auth,
+    where other workers pick the revocation up within
+    AUTH_REVOCATION_POLL_SECONDS.
+    """
+    return deactivate_user(session, current_user)
@@ -0,0 +1,153 @@
+# app/api/v1/batch.py
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Annotated, Optional
+from urllib.parse import urlsplit
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, run_endpoint_function, serialize_response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Match
+from sqlmodel import Session
+from app.db import get_session, statement_timeout
+from app.deps import CurrentUser, get_current_user, get_read_session, get_user_session
+from app.models import User
+from app.schemas import BatchItem, BatchRequest, BatchResponse
+from app.serialization import ORJSONResponse
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+
+def begin_snapshot(session: Session) -> None:
+    """
+    Start the session's transaction at REPEATABLE READ on Postgres.
+
+    Every sub-request then reads from the same snapshot. SQLite
+    transactions are already serializable.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _error(item_id: Optional[str], status_code: int, detail) -> bytes:
+    return orjson.dumps({"id": item_id, "status": status_code, "body": {"detail": detail}})
+
+
+def _encode(item_id: Optional[str], status_code: int, body: bytes) -> bytes:
+    # Splice the already-encoded body in rather than decoding it again
+    head = orjson.dumps({"id": item_id, "status": status_code})
+    return head[:-1] + b',"body":' + (body or b"null") + b"}"
+
+
+def _match_route(request: Request, scope: dict) -> Optional[tuple[APIRoute, dict]]:
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return (route, child_scope) if isinstance(route, APIRoute) else None
+    return None
+
+
+async def run_subrequest(
+    request: Request,
+    item: BatchItem,
+    current_user: User,
+    session: Session,
+) -> bytes:
+    """Run one GET sub-request through its route, reusing the batch's user and session."""
+    url = urlsplit(item.path)
+    scope = {
+        **request.scope,
+        "method": item.method,
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "state": {},
+    }
+
+    matched = _match_route(request, scope)
+    if matched is None or matched[0].endpoint is run_batch:
+        return _error(item.id, status.HTTP_404_NOT_FOUND, "Not Found")
+    route, child_scope = matched
+    scope.update(child_scope)
+    sub_request = Request(scope)
+
+    # Authentication and sessions resolve to the batch's own
+    dependency_cache = {
+        (get_current_user, ()): current_user,
+        (get_session, ()): session,
+        (get_read_session, ()): session,
+        (get_user_session, ()): session,
+    }
+
+    async with AsyncExitStack() as stack:
+        try:
+            values, errors, _, sub_response, _ = await solve_dependencies(
+                request=sub_request,
+                dependant=route.dependant,
+                dependency_overrides_provider=request.app,
+                dependency_cache=dependency_cache,
+                async_exit_stack=stack,
+            )
+            if errors:
+                return _error(item.id, status.HTTP_422_UNPROCESSABLE_ENTITY, jsonable_encoder(errors))
+
+            is_coroutine = asyncio.iscoroutinefunction(route.dependant.call)
+            raw = await run_endpoint_function(
+                dependant=route.dependant, values=values, is_coroutine=is_coroutine
+            )
+        except HTTPException as e:
+            return _error(item.id, e.status_code, e.detail)
+
+    status_code = sub_response.status_code or route.status_code or status.HTTP_200_OK
+
+    if isinstance(raw, Response):
+        if isinstance(raw, StreamingResponse) or "json" not in (raw.media_type or ""):
+            return _error(item.id, status.HTTP_400_BAD_REQUEST, "Only JSON routes can be batched")
+        return _encode(item.id, raw.status_code, raw.body)
+
+    content = await serialize_response(
+        field=route.response_field,
+        response_content=raw,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+        is_coroutine=is_coroutine,
+    )
+    return _encode(item.id, status_code, orjson.dumps(content))
+
+
+@router.post(
+    "",
+    response_model=BatchResponse,
+    response_class=ORJSONResponse,
+    dependencies=[Depends(statement_timeout(30_000))]
+)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)]
+):
+    """
+    Run several GET API calls in one round trip.
+
+    Sub-requests go through the existing routes (with their parameters
+    and validation) in order, but share this request's authentication and
+    a single read session and transaction snapshot. Each result carries
+    its own status; a failing sub-request does not fail the batch.
+    Streaming and non-JSON routes (export, calendar feed) are rejected.
+    """
+    await run_in_threadpool(begin_snapshot, session)
+
+    results = []
+    for item in batch.requests:
+        results.append(await run_subrequest(request, item, current_user, session))
+
+    return ORJSONResponse(b'{"responses":[' + b",".join(results) + b"]}")
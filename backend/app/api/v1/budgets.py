@@ -0,0 +1,156 @@
+# app/api/v1/budgets.py
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, select
+from app.deps import CurrentUser, UserSession
+from app.models import Budget, BudgetAlert
+from app.schemas import BudgetAlertResponse, BudgetCreate, BudgetResponse, BudgetUpdate
+from app.services.budgets import EXCEEDED, WARNING, budget_level, evaluate, recompute_budget
+from app.services.directory import new_budget_id
+from app.services.fx import reporting_currency
+
+router = APIRouter(prefix="/budgets", tags=["Budgets"])
+
+# Most recent alerts returned by the alerts endpoint
+MAX_ALERTS = 50
+
+
+def budget_to_response(budget: Budget) -> dict:
+    level = budget_level(budget)
+    return {
+        "id": budget.id,
+        "category": budget.category,
+        "monthly_limit": budget.monthly_limit,
+        "currency": budget.currency,
+        "warn_ratio": budget.warn_ratio,
+        "current_total": round(budget.current_total, 2),
+        "remaining": round(budget.monthly_limit - budget.current_total, 2),
+        "status": "exceeded" if level == EXCEEDED else "warning" if level == WARNING else "under",
+        "created_at": budget.created_at,
+        "updated_at": budget.updated_at,
+    }
+
+
+def get_user_budget(session, budget_id: int, user_id: int) -> Budget:
+    budget = session.get(Budget, budget_id)
+    if not budget or budget.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Budget not found"
+        )
+    return budget
+
+
+@router.get("", response_model=list[BudgetResponse])
+def list_budgets(current_user: CurrentUser, session: UserSession):
+    """
+    List the user's budgets with their current monthly spend.
+
+    Spend is kept up to date as subscriptions change, so this does not
+    rescan subscriptions.
+    """
+    budgets = session.exec(
+        select(Budget).where(Budget.user_id == current_user.id).order_by(Budget.id)
+    ).all()
+    return [budget_to_response(budget) for budget in budgets]
+
+
+@router.post("", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
+def create_budget(budget_data: BudgetCreate, current_user: CurrentUser, session: UserSession):
+    """
+    Create a monthly budget, overall (no category) or for one category.
+
+    The current spend is computed once from the active subscriptions;
+    alerts are raised when later changes cross the warning share or the
+    limit.
+    """
+    existing = session.exec(
+        select(Budget.id).where(
+            Budget.user_id == current_user.id,
+            Budget.category == budget_data.category if budget_data.category is not None
+            else Budget.category.is_(None)
+        )
+    ).first()
+    if existing is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A budget for this category already exists"
+        )
+
+    budget = Budget(
+        id=new_budget_id(),
+        user_id=current_user.id,
+        category=budget_data.category,
+        monthly_limit=budget_data.monthly_limit,
+        currency=reporting_currency(current_user, budget_data.currency),
+        warn_ratio=budget_data.warn_ratio,
+    )
+    recompute_budget(session, budget)
+    # Starting over a threshold is reported in the response, not alerted
+    budget.alert_level = budget_level(budget)
+    session.add(budget)
+    try:
+        session.commit()
+    except IntegrityError as e:
+        # A concurrent request created the same budget first
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A budget for this category already exists"
+        ) from e
+    session.refresh(budget)
+    return budget_to_response(budget)
+
+
+@router.patch("/{budget_id}", response_model=BudgetResponse)
+def update_budget(
+    budget_id: int,
+    budget_data: BudgetUpdate,
+    current_user: CurrentUser,
+    session: UserSession
+):
+    """
+    Change a budget's limit, warning share or currency.
+
+    A lower limit that puts spend over a threshold raises an alert.
+    """
+    budget = get_user_budget(session, budget_id, current_user.id)
+    update_data = budget_data.model_dump(exclude_unset=True)
+    if update_data.get("currency"):
+        update_data["currency"] = update_data["currency"].upper()
+
+    for key, value in update_data.items():
+        if value is not None:
+            setattr(budget, key, value)
+
+    if "currency" in update_data:
+        recompute_budget(session, budget)
+    budget.updated_at = datetime.utcnow()
+    evaluate(session, budget)
+
+    session.add(budget)
+    session.commit()
+    session.refresh(budget)
+    return budget_to_response(budget)
+
+
+@router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_budget(budget_id: int, current_user: CurrentUser, session: UserSession):
+    """Delete a budget and its alerts."""
+    budget = get_user_budget(session, budget_id, current_user.id)
+    session.exec(delete(BudgetAlert).where(BudgetAlert.budget_id == budget.id))
+    session.delete(budget)
+    session.commit()
+    return None
+
+
+@router.get("/alerts", response_model=list[BudgetAlertResponse])
+def list_budget_alerts(current_user: CurrentUser, session: UserSession):
+    """The user's most recent budget alerts, newest first."""
+    return session.exec(
+        select(BudgetAlert)
+        .where(BudgetAlert.user_id == current_user.id)
+        .order_by(BudgetAlert.id.desc())
+        .limit(MAX_ALERTS)
+    ).all()
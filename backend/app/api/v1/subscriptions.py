@@ -1,24 +1,60 @@
 # app/api/v1/subscriptions.py
 from typing import Annotated
-from datetime import datetime, date, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select, func
+from datetime import datetime, date, timedelta, timezone
+import secrets
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from sqlalchemy import union_all
 from sqlalchemy.exc import IntegrityError
-from app.db import get_session
-from app.models import Subscription, SubscriptionStatus, BillingCycle
+from app.core.compression import choose_encoding, etag_matches, weak_etag
+from app.core.config import settings
+from app.db import get_session, open_session, statement_timeout
+from app.models import Subscription, SubscriptionArchive, SubscriptionStatus, BillingCycle, User
 from app.schemas import (
     SubscriptionCreate,
     SubscriptionUpdate,
     SubscriptionResponse,
     DashboardStats,
-    CategorySpend,
+    DuplicateReport,
     UpcomingRenewal
 )
-from app.deps import CurrentUser
+from app.core.singleflight import coalesced
+from app.deps import CurrentDBUser, CurrentUser, UserSession, get_read_session
+from app.serialization import ORJSONResponse, RowEncoder, subscription_encoder
+from app.services.archive import archived_columns
+from app.services.budgets import apply_subscription_change, contribution
+from app.services.fx import fx_rates, reporting_currency
+from app.services.calendar import cached_feed, render_and_cache
+from app.services.directory import calendar_token_engine, new_subscription_id, set_calendar_token
+from app.services.duplicates import fetch_duplicate_records, find_duplicates
+from app.services.subscriptions import (
+    category_spend,
+    fetch_upcoming_rows,
+    mark_subscriptions_changed,
+    monthly_spend
+)
 
 router = APIRouter(prefix="/subscriptions", tags=["Subscriptions"])
 
 
+def sparse_fields(
+    fields: str | None = Query(
+        default=None,
+        description="Comma-separated subscription fields to return, e.g. id,name,cost,next_renewal"
+    )
+) -> RowEncoder:
+    """Dependency resolving the fields= parameter to a cached column/encoder plan."""
+    try:
+        return subscription_encoder(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+
+SparseFields = Annotated[RowEncoder, Depends(sparse_fields)]
+
+
 def subscription_to_response(subscription: Subscription) -> dict:
     """Convert a Subscription model to frontend-expected format."""
     return {
@@ -48,7 +84,7 @@ def subscription_to_response(subscription: Subscription) -> dict:
 def create_subscription(
     subscription_data: SubscriptionCreate,
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: UserSession
 ):
     payload = subscription_data.model_dump(by_alias=True)
 
@@ -67,7 +103,7 @@ def create_subscription(
     payload.pop("user_id", None)
 
     try:
-        db_subscription = Subscription(**payload, user_id=current_user.id)
+        db_subscription = Subscription(**payload, id=new_subscription_id(), user_id=current_user.id)
     except TypeError as e:
         # Field mismatch between schema and model
         raise HTTPException(
@@ -76,6 +112,8 @@ def create_subscription(
         ) from e
 
     session.add(db_subscription)
+    mark_subscriptions_changed(session, current_user.id)
+    apply_subscription_change(session, current_user.id, None, contribution(db_subscription))
     try:
         session.commit()
     except IntegrityError as e:
@@ -90,13 +128,15 @@ def create_subscription(
     return subscription_to_response(db_subscription)
 
 
-@router.get("")
+@router.get("", response_class=ORJSONResponse)
 def list_subscriptions(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[Session, Depends(get_read_session)],
+    encoder: SparseFields,
     status_filter: SubscriptionStatus | None = Query(default=None),
     category: str | None = Query(default=None),
     search: str | None = Query(default=None),
+    include_archived: bool = Query(default=False),
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=100)
 ):
@@ -104,127 +144,286 @@ def list_subscriptions(
     List all subscriptions for the current user.
 
     Supports filtering by status, category, and search text, with pagination.
+    Only the columns named in fields= are selected and returned. Long-
+    cancelled subscriptions are archived and only listed with
+    include_archived=true.
     """
-    statement = select(Subscription).where(Subscription.user_id == current_user.id)
-
-    if status_filter:
-        statement = statement.where(Subscription.status == status_filter)
-
-    if category:
-        statement = statement.where(Subscription.category == category)
-
-    if search:
-        statement = statement.where(Subscription.name.ilike(f"%{search}%"))
-
-    statement = statement.offset(skip).limit(limit).order_by(Subscription.next_renewal_date)
+    def filters(model) -> list:
+        conditions = [model.user_id == current_user.id]
+        if status_filter:
+            conditions.append(model.status == status_filter)
+        if category:
+            conditions.append(model.category == category)
+        if search:
+            conditions.append(model.name.ilike(f"%{search}%"))
+        return conditions
+
+    if include_archived:
+        # Same columns from both tables, plus the sort key, then page the union
+        combined = union_all(
+            select(*encoder.columns, Subscription.next_renewal_date.label("sort_key"))
+            .where(*filters(Subscription)),
+            select(*archived_columns(encoder.columns), SubscriptionArchive.next_renewal_date.label("sort_key"))
+            .where(*filters(SubscriptionArchive)),
+        ).subquery()
+        statement = select(*list(combined.c)[:-1]).order_by(combined.c.sort_key)
+    else:
+        statement = select(*encoder.columns).where(
+            *filters(Subscription)
+        ).order_by(Subscription.next_renewal_date)
+
+    statement = statement.offset(skip).limit(limit)
+
+    # Rows, not scalars, even when a single field is selected
+    rows = session.connection().execute(statement).all()
+    return ORJSONResponse(encoder.encode(rows))
+
+
+@router.get(
+    "/export",
+    response_class=ORJSONResponse,
+    dependencies=[Depends(statement_timeout(120_000))]
+)
+def export_subscriptions(
+    request: Request,
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)],
+    encoder: SparseFields
+):
+    """
+    Export all subscriptions for the current user as a JSON array.
 
-    subscriptions = session.exec(statement).all()
-    return [subscription_to_response(sub) for sub in subscriptions]
+    Rows are streamed from the database in batches and encoded
+    batch by batch, so large accounts are never held in memory at once.
+    """
+    statement = select(*encoder.columns).where(
+        Subscription.user_id == current_user.id
+    ).order_by(Subscription.id).execution_options(yield_per=500)
+
+    def generate():
+        # The request session is closed once the handler returns, so the
+        # stream uses its own session on the same engine
+        with open_session(session.get_bind(), request) as stream_session:
+            yield b"["
+            first = True
+            for batch in stream_session.connection().execute(statement).partitions():
+                if not first:
+                    yield b","
+                # Strip the surrounding brackets so batches join into one array
+                yield encoder.encode(batch)[1:-1]
+                first = False
+            yield b"]"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/json",
+        headers={"Content-Disposition": 'attachment; filename="subscriptions.json"'}
+    )
 
 
-@router.get("/dashboard", response_model=DashboardStats)
+@router.get("/dashboard", response_model=DashboardStats, response_class=ORJSONResponse)
+@coalesced("subscriptions.dashboard")
 def get_dashboard_stats(
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[Session, Depends(get_read_session)],
+    encoder: SparseFields,
+    currency: str | None = Query(default=None, pattern=r"^[A-Za-z]{3}$")
 ):
     """
     Get dashboard statistics.
 
     Returns:
-    - Total monthly spend
+    - Total monthly spend, in the reporting currency
     - Count of active subscriptions
-    - Upcoming renewals in next 30 days
-    - Spend by category
+    - Upcoming renewals in next 30 days (subscriptions narrowed by fields=)
+    - Monthly spend by category
+    - Monthly spend by original currency
     """
-    # Get all active subscriptions
-    statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
-    )
-    active_subs = session.exec(statement).all()
+    target = reporting_currency(current_user, currency)
+    rates = fx_rates.get_rates()
 
     # Calculate total monthly spend
-    total_monthly = 0.0
-    for sub in active_subs:
-        if sub.interval == "weekly":
-            total_monthly += sub.amount * 52 / 12
-        elif sub.interval == "monthly":
-            total_monthly += sub.amount
-        elif sub.interval == "quarterly":
-            total_monthly += sub.amount * 4 / 12
-        elif sub.interval == "yearly":
-            total_monthly += sub.amount / 12
+    total_monthly, active_count, spend_by_currency = monthly_spend(
+        session, current_user.id, target, rates
+    )
 
     # Get upcoming renewals (next 30 days)
     today = date.today()
     thirty_days = today + timedelta(days=30)
 
-    upcoming_statement = select(Subscription).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE,
-        Subscription.next_renewal_date >= today,
-        Subscription.next_renewal_date <= thirty_days
-    ).order_by(Subscription.next_renewal_date)
-
-    upcoming_subs = session.exec(upcoming_statement).all()
+    upcoming_rows = fetch_upcoming_rows(session, current_user.id, today, thirty_days, encoder)
 
     upcoming_renewals = [
         {
-            "subscription": subscription_to_response(sub),
-            "days_until_renewal": (sub.next_renewal_date - today).days
+            "subscription": encoder.to_dict(row),
+            "days_until_renewal": (row.renews_on - today).days
         }
-        for sub in upcoming_subs
+        for row in upcoming_rows
     ]
 
     # Get spend by category
-    category_statement = select(
-        Subscription.category,
-        func.sum(Subscription.amount).label("total"),
-        func.count(Subscription.id).label("count")
-    ).where(
-        Subscription.user_id == current_user.id,
-        Subscription.status == SubscriptionStatus.ACTIVE
-    ).group_by(Subscription.category)
-
-    category_results = session.exec(category_statement).all()
-
-    spend_by_category = [
-        CategorySpend(
-            category=row[0] or "Other",
-            total_amount=float(row[1] or 0),
-            count=int(row[2] or 0)
-        )
-        for row in category_results
-    ]
+    spend_by_category = category_spend(session, current_user.id, target, rates)
+
+    # Shaped like DashboardStats, but encoded directly by orjson
+    return ORJSONResponse({
+        "total_monthly_spend": round(total_monthly, 2),
+        "currency": target,
+        "active_subscriptions": active_count,
+        "upcoming_renewals": upcoming_renewals,
+        "spend_by_category": spend_by_category,
+        "spend_by_currency": spend_by_currency
+    })
+
+
+@router.get("/duplicates", response_model=DuplicateReport, response_class=ORJSONResponse)
+@coalesced("subscriptions.duplicates")
+def get_duplicate_subscriptions(
+    current_user: CurrentUser,
+    session: Annotated[Session, Depends(get_read_session)],
+    currency: str | None = Query(default=None, pattern=r"^[A-Za-z]{3}$")
+):
+    """
+    Find active subscriptions that look like the same service.
 
-    return DashboardStats(
-        total_monthly_spend=round(total_monthly, 2),
-        active_subscriptions=len(active_subs),
-        upcoming_renewals=upcoming_renewals,
-        spend_by_category=spend_by_category
+    Names and vendors are normalized and compared only within shared
+    blocking keys; returns groups of likely duplicates with their
+    combined monthly cost in the reporting currency.
+    """
+    target = reporting_currency(current_user, currency)
+    records = fetch_duplicate_records(session, current_user.id)
+    return ORJSONResponse({
+        "currency": target,
+        "groups": find_duplicates(records, target, fx_rates.get_rates()),
+    })
+
+
+@router.post("/calendar-token")
+def create_calendar_token(
+    request: Request,
+    current_user: CurrentDBUser,
+    session: UserSession
+):
+    """
+    Create (or rotate) the secret token for the iCalendar renewal feed.
+
+    Any previously issued feed URL stops working.
+    """
+    current_user.calendar_token = secrets.token_urlsafe(32)
+    session.add(current_user)
+    session.commit()
+    set_calendar_token(current_user.id, current_user.calendar_token)
+
+    feed_url = request.url_for("get_calendar_feed").include_query_params(
+        token=current_user.calendar_token
     )
+    return {"token": current_user.calendar_token, "url": str(feed_url)}
+
 
+@router.get("/calendar.ics")
+def get_calendar_feed(
+    token: str,
+    request: Request,
+    session: Annotated[Session, Depends(get_session)]
+):
+    """
+    iCalendar feed of renewals for calendar apps, authenticated by feed token.
 
-@router.get("/{subscription_id}")
+    Calendar clients poll often, so the rendered feed is cached per user and
+    rebuilt only after that user's subscriptions change. Conditional requests
+    (If-Modified-Since / If-None-Match) are answered from a single indexed
+    lookup of the user's version.
+    """
+    # With sharding the token is resolved to the owner's shard first
+    bind = calendar_token_engine(session, token)
+    owner = None
+    if bind is not None:
+        with open_session(bind, request) as owner_session:
+            owner = owner_session.exec(
+                select(User.id, User.is_active, User.subscriptions_changed_at)
+                .where(User.calendar_token == token)
+            ).first()
+
+    if owner is None or not owner.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendar feed not found"
+        )
+
+    version = owner.subscriptions_changed_at
+    last_modified = version.replace(microsecond=0, tzinfo=timezone.utc)
+    headers = {
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "ETag": f'"{owner.id}-{version.timestamp():.6f}"',
+        "Cache-Control": "private, max-age=300",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        # Weak comparison: compressed variants are served with W/ tags
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    elif if_modified_since:
+        # Versions fall in distinct seconds (next_subscriptions_version), so
+        # a write after the client's copy always moves Last-Modified past it
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and since.tzinfo is not None and last_modified <= since:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = "text/calendar"
+
+    feed = cached_feed(owner.id, version)
+    if feed is not None:
+        encoding = None
+        if settings.COMPRESSION_ENABLED and len(feed.body) >= settings.COMPRESSION_MIN_SIZE:
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is None:
+            return Response(feed.body, media_type=media_type, headers=headers)
+        # Reuse the cached compressed body instead of recompressing per poll
+        headers.update({
+            "ETag": weak_etag(headers["ETag"]),
+            "Content-Encoding": encoding,
+            "Vary": "Accept-Encoding",
+        })
+        return Response(feed.encoded(encoding), media_type=media_type, headers=headers)
+
+    def generate():
+        # The request session is closed once the handler returns
+        with open_session(bind, request) as stream_session:
+            yield from render_and_cache(stream_session, owner.id, version)
+
+    return StreamingResponse(generate(), media_type=media_type, headers=headers)
+
+
+@router.get("/{subscription_id}", response_class=ORJSONResponse)
 def get_subscription(
     subscription_id: int,
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[Session, Depends(get_read_session)],
+    encoder: SparseFields
 ):
     """
     Get a specific subscription by ID.
 
     Returns 404 if not found or not owned by current user.
     """
-    subscription = session.get(Subscription, subscription_id)
+    row = session.connection().execute(
+        select(*encoder.columns).where(
+            Subscription.id == subscription_id,
+            Subscription.user_id == current_user.id
+        )
+    ).first()
 
-    if not subscription or subscription.user_id != current_user.id:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Subscription not found"
         )
 
-    return subscription_to_response(subscription)
+    return ORJSONResponse(encoder.encode_one(row))
 
 
 @router.patch("/{subscription_id}")
@@ -232,14 +431,15 @@ def update_subscription(
     subscription_id: int,
     subscription_data: SubscriptionUpdate,
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: UserSession
 ):
     """
     Update a subscription.
 
     Only updates fields that are provided in the request.
     """
-    subscription = session.get(Subscription, subscription_id)
+    # Locked so concurrent writes to it read their budget "before" in turn
+    subscription = session.get(Subscription, subscription_id, with_for_update=True)
 
     if not subscription or subscription.user_id != current_user.id:
         raise HTTPException(
@@ -261,12 +461,15 @@ def update_subscription(
         if frontend_field in update_data:
             update_data[backend_field] = update_data.pop(frontend_field)
 
+    before = contribution(subscription)
     for key, value in update_data.items():
         setattr(subscription, key, value)
 
     subscription.updated_at = datetime.utcnow()
 
     session.add(subscription)
+    mark_subscriptions_changed(session, current_user.id)
+    apply_subscription_change(session, current_user.id, before, contribution(subscription))
     session.commit()
     session.refresh(subscription)
 
@@ -277,14 +480,15 @@ def update_subscription(
 def delete_subscription(
     subscription_id: int,
     current_user: CurrentUser,
-    session: Annotated[Session, Depends(get_session)]
+    session: UserSession
 ):
     """
     Delete a subscription.
 
     Permanently removes the subscription from the database.
     """
-    subscription = session.get(Subscription, subscription_id)
+    # Locked so a concurrent delete finds it gone rather than subtracting it twice
+    subscription = session.get(Subscription, subscription_id, with_for_update=True)
 
     if not subscription or subscription.user_id != current_user.id:
         raise HTTPException(
@@ -293,6 +497,8 @@ def delete_subscription(
         )
 
     session.delete(subscription)
+    mark_subscriptions_changed(session, current_user.id)
+    apply_subscription_change(session, current_user.id, contribution(subscription), None)
     session.commit()
 
     return None
@@ -0,0 +1,110 @@
+# app/core/compression.py
+import re
+import zlib
+from typing import Optional
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+# Content types worth compressing (prefix match)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Supported content codings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick a content coding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in available_encodings():
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress a complete body with the configured (or given) level."""
+    if encoding == "br":
+        quality = settings.COMPRESSION_BROTLI_QUALITY if level is None else level
+        return brotli.compress(body, quality=quality)
+    if level is None:
+        level = settings.COMPRESSION_GZIP_LEVEL
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """
+    Incremental compressor for streamed bodies.
+
+    Each chunk is flushed as it is compressed, so clients receive data as
+    the response streams instead of when the compressor's buffer fills.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def weak_etag(etag: str) -> str:
+    """Entity tag for an encoded variant: strong tags become weak."""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+# One entity tag in an If-None-Match list (quoted strings may hold commas)
+ENTITY_TAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag: "*" or any tag in its
+    comma-separated list, compared weakly (W/ prefixes ignored).
+    """
+    opaque = etag.removeprefix("W/")
+    for candidate in ENTITY_TAG.findall(if_none_match):
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
@@ -0,0 +1,166 @@
+# app/core/logs.py
+import logging
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import orjson
+from app.core.config import settings
+
+# Correlation id of the request being handled (set by RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not caller-supplied `extra` fields
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sample"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request_id,
+    any `extra` fields, and the formatted exception if there is one.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for development, with the request id when set."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thin out high-volume events.
+
+    Records logged with `extra={"sample": key}` pass for the first `burst`
+    per key in each `window` seconds, then one in every `every`. Each
+    record that passes carries `suppressed`: how many of its kind were
+    dropped since the previous one. Untagged records always pass.
+    """
+
+    def __init__(self, burst: int, every: int, window: float):
+        super().__init__()
+        self.burst = burst
+        self.every = max(every, 1)
+        self.window = window
+        self._lock = threading.Lock()
+        # key -> [window start, seen in window, dropped since last passed]
+        self._windows: dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                state = self._windows[key] = [now, 0, state[2] if state else 0]
+            state[1] += 1
+            over = state[1] - self.burst
+            if over > 0 and over % self.every:
+                state[2] += 1
+                return False
+            record.suppressed = state[2]
+            state[2] = 0
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue handler that defers formatting to the listener thread.
+
+    The stock QueueHandler formats every message in the calling thread;
+    here the request thread only tags the record with the current request
+    id (and renders a traceback, which can't outlive its frames) before
+    enqueueing it. Arguments are formatted by the listener, so they
+    should not be mutated after logging.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # SimpleQueue is thread-safe; skip the per-handler lock
+        passed = self.filter(record)
+        if passed:
+            self.emit(record)
+        return passed
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # This is the only root handler, so the record is tagged in place
+        # rather than copied
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_previous_handlers: list[logging.Handler] = []
+
+
+def configure_logging() -> None:
+    """
+    Route all application logging through a queue to a background writer.
+
+    Request threads only enqueue records; a QueueListener thread formats
+    them (JSON or text, per LOG_FORMAT) and writes them to stderr. Safe to
+    call more than once.
+    """
+    global _listener, _previous_handlers
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(
+        settings.LOG_SAMPLE_BURST,
+        settings.LOG_SAMPLE_EVERY,
+        settings.LOG_SAMPLE_WINDOW_SECONDS,
+    ))
+
+    root = logging.getLogger()
+    _previous_handlers = root.handlers[:]
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and restore the previous root handlers."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logging.getLogger().handlers = _previous_handlers
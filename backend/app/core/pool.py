@@ -0,0 +1,106 @@
+# app/core/pool.py
+import logging
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkouts that wait longer than this count as contended
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class PoolStats:
+    """Counters for connection checkouts on one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_overflow = 0
+
+    def record_checkout(self, wait: float, overflow: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            if wait > SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "peak_overflow": self.peak_overflow,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records checkout wait time, overflow use and timeouts.
+
+    SQLAlchemy has no "before checkout" event, so waiting is timed around
+    _do_get(), which is where a caller blocks on a saturated pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            logger.warning(
+                "Connection pool timeout: size=%s overflow=%s checked_out=%s",
+                self.size(), self.overflow(), self.checkedout()
+            )
+            raise
+        self.stats.record_checkout(time.perf_counter() - start, self.overflow())
+        return connection
+
+    def recreate(self):
+        # Keep counters across engine.dispose()
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def pool_status(pool) -> dict:
+    """Current occupancy and checkout counters for a pool."""
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    status = {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+    }
+    capacity = status["size"] + max(status["max_overflow"], 0)
+    status["saturation"] = round(status["checked_out"] / capacity, 3) if capacity else 0.0
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
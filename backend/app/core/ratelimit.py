@@ -0,0 +1,225 @@
+# app/core/ratelimit.py
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from fastapi import HTTPException, Request, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    """Token bucket parameters: burst size and refill rate."""
+    capacity: float
+    per_second: float
+
+    @classmethod
+    def per_minute(cls, burst: float, rate: float) -> "Limit":
+        return cls(float(burst), rate / 60.0)
+
+    @property
+    def full_after(self) -> float:
+        """Seconds after which an idle bucket is full again."""
+        return self.capacity / self.per_second if self.per_second else math.inf
+
+
+def refill(tokens: float, elapsed: float, limit: Limit) -> tuple[float, float]:
+    """
+    Refill a bucket and try to take one token.
+
+    Returns (tokens left, retry_after); retry_after is 0.0 when the token
+    was taken, else the seconds until one is available.
+    """
+    tokens = min(limit.capacity, tokens + max(elapsed, 0.0) * limit.per_second)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    if not limit.per_second:
+        return tokens, math.inf
+    return tokens, (1.0 - tokens) / limit.per_second
+
+
+class MemoryBuckets:
+    """
+    Token buckets held in process memory.
+
+    Bounded to maxsize keys; the least recently used bucket is evicted
+    (an evicted key simply starts again with a full bucket).
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.capacity, now))
+            tokens, retry_after = refill(tokens, now - updated, limit)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseBuckets:
+    """
+    Token buckets in the rate_limit_buckets table, shared by all workers.
+
+    Each take is one short transaction: the row is read FOR UPDATE
+    (serializing concurrent takes on Postgres), refilled and written back.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def take(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        table = RateLimitBucket.__table__
+        for _ in range(2):
+            try:
+                with self.engine.begin() as connection:
+                    row = connection.execute(
+                        select(table.c.tokens, table.c.refilled_at)
+                        .where(table.c.key == key)
+                        .with_for_update()
+                    ).first()
+                    if row is None:
+                        tokens, retry_after = refill(limit.capacity, 0.0, limit)
+                        connection.execute(
+                            insert(table).values(key=key, tokens=tokens, refilled_at=now)
+                        )
+                    else:
+                        tokens, retry_after = refill(row.tokens, now - row.refilled_at, limit)
+                        connection.execute(
+                            update(table)
+                            .where(table.c.key == key)
+                            .values(tokens=tokens, refilled_at=now)
+                        )
+                return retry_after
+            except IntegrityError:
+                # Another worker created the bucket first; retry as an update
+                continue
+        return 0.0
+
+    def purge(self, idle_seconds: float) -> int:
+        """Delete buckets idle long enough to be full again."""
+        table = RateLimitBucket.__table__
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                delete(table).where(table.c.refilled_at < time.time() - idle_seconds)
+            )
+        return result.rowcount
+
+
+class RateLimiter:
+    """
+    Keyed token-bucket limiter with an optional shared backend.
+
+    The per-process buckets are always checked first. A key's shared
+    bucket sees every request its local bucket sees, so a local rejection
+    is also a global one and is answered without touching the database.
+    """
+
+    def __init__(self, local: MemoryBuckets, shared: Optional[DatabaseBuckets] = None):
+        self.local = local
+        self.shared = shared
+        self.rejected = 0
+
+    def hit(self, key: str, limit: Limit) -> float:
+        retry_after = self.local.take(key, limit)
+        if not retry_after and self.shared is not None:
+            retry_after = self.shared.take(key, limit)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+
+def auth_limits() -> tuple[Limit, Limit]:
+    """(per-IP, per-email) limits for login and registration."""
+    return (
+        Limit.per_minute(settings.RATE_LIMIT_IP_BURST, settings.RATE_LIMIT_IP_PER_MINUTE),
+        Limit.per_minute(settings.RATE_LIMIT_EMAIL_BURST, settings.RATE_LIMIT_EMAIL_PER_MINUTE),
+    )
+
+
+_auth_limiter: Optional[RateLimiter] = None
+_auth_limiter_lock = threading.Lock()
+
+
+def get_auth_limiter() -> RateLimiter:
+    """The process-wide limiter for auth endpoints, built on first use."""
+    global _auth_limiter
+    if _auth_limiter is None:
+        with _auth_limiter_lock:
+            if _auth_limiter is None:
+                shared = None
+                if settings.RATE_LIMIT_BACKEND == "database":
+                    shared = DatabaseBuckets(_rate_limit_engine())
+                _auth_limiter = RateLimiter(MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS), shared)
+    return _auth_limiter
+
+
+def _rate_limit_engine():
+    from app.db import engine
+
+    if not settings.RATE_LIMIT_DATABASE_URL:
+        return engine
+    from sqlmodel import create_engine
+    from app.db import engine_options
+
+    shared_engine = create_engine(
+        settings.RATE_LIMIT_DATABASE_URL, **engine_options(settings.RATE_LIMIT_DATABASE_URL)
+    )
+    RateLimitBucket.__table__.create(shared_engine, checkfirst=True)
+    return shared_engine
+
+
+def check_auth_rate_limit(request: Request, email: str) -> None:
+    """
+    Enforce the login/registration limits for a client IP and email.
+
+    Call before any password hashing or user lookup. Raises 429 with a
+    Retry-After header when either bucket is empty; the email bucket is
+    only charged once the IP bucket allowed the attempt.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    limiter = get_auth_limiter()
+    ip_limit, email_limit = auth_limits()
+    client_ip = request.client.host if request.client else "unknown"
+
+    retry_after = limiter.hit(f"ip:{client_ip}", ip_limit)
+    if not retry_after:
+        retry_after = limiter.hit(f"email:{email.strip().lower()}", email_limit)
+    if retry_after:
+        logger.warning(
+            "Auth rate limit exceeded for %s on %s", client_ip, request.url.path,
+            extra={"sample": "auth.rate_limited"}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def purge_rate_limit_buckets() -> None:
+    """Scheduler job: drop shared buckets that have refilled completely."""
+    limiter = get_auth_limiter()
+    if limiter.shared is None:
+        return
+    idle = max(limit.full_after for limit in auth_limits())
+    if math.isfinite(idle):
+        limiter.shared.purge(idle)
@@ -0,0 +1,185 @@
+# app/core/singleflight.py
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+from fastapi import Request
+from sqlmodel import Session
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one execution.
+
+    While a call for a key is in flight, further calls with the same key
+    wait for it and share its result (or exception) instead of running
+    again. Nothing is cached once the call completes.
+
+    do() serves sync callers (e.g. handlers in the threadpool) and
+    do_async() serves coroutines on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._futures: dict[Hashable, asyncio.Future] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, key: Hashable, coalesced: bool) -> None:
+        name = key[0] if isinstance(key, tuple) and key else str(key)
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "executed": 0, "coalesced": 0})
+            stats["calls"] += 1
+            stats["coalesced" if coalesced else "executed"] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(key, coalesced=not leader)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._futures.get(key)
+        if future is not None:
+            self._count(key, coalesced=True)
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" when nobody else waited
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._futures[key] = future
+        self._count(key, coalesced=False)
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._futures[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._futures),
+                "routes": {name: dict(counts) for name, counts in self._stats.items()},
+            }
+
+
+flight = SingleFlight()
+
+
+def _request_key(name: str, kwargs: dict) -> tuple:
+    """
+    Key a handler call by route name, user and remaining parameters.
+
+    The user's write stamp is part of the key, so a request made after a
+    write never joins a read that started before it.
+    """
+    user = kwargs.get("current_user")
+    params = []
+    for param, value in sorted(kwargs.items()):
+        if param == "current_user" or isinstance(value, (Session, Request)):
+            continue
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+        params.append((param, value))
+    return (name, getattr(user, "id", None), getattr(user, "subscriptions_changed_at", None), tuple(params))
+
+
+def _wrote_here(kwargs: dict) -> bool:
+    """Whether this process handled a write by the request's user within the window."""
+    from app.services.subscriptions import recent_writers
+
+    user = kwargs.get("current_user")
+    return user is not None and bool(recent_writers.get(user.id))
+
+
+def _replica_reads() -> bool:
+    from app.deps import replica_reads
+
+    return replica_reads()
+
+
+def _wrote_recently(kwargs: dict) -> bool:
+    """
+    Whether the request's user wrote within the read-your-writes window.
+    Only called when reads can go to a lagging replica, where a stateless
+    user's stamp may be looked up on the primary.
+    """
+    from app.deps import recently_wrote
+
+    user = kwargs.get("current_user")
+    return user is not None and recently_wrote(user)
+
+
+def coalesced(name: str):
+    """
+    Route decorator sharing one computation between identical concurrent requests.
+
+    Apply below @router.get(...). Requests are identical when they are for
+    the same route, the same user (current_user) and the same parameters;
+    sessions and the request object are ignored. Users who wrote within
+    READ_YOUR_WRITES_SECONDS are not coalesced, since an in-flight read
+    may predate the write. Without a read replica this costs no query: the
+    write stamp in the key separates reads before and after a write, and
+    stateless-auth users (no stamp) are checked against this process's
+    recent writers. Works on sync and async handlers; FastAPI still sees
+    the original signature.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _wrote_here(kwargs) or (
+                    _replica_reads() and await asyncio.to_thread(_wrote_recently, kwargs)
+                ):
+                    return await func(*args, **kwargs)
+                return await flight.do_async(
+                    _request_key(name, kwargs), lambda: func(*args, **kwargs)
+                )
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _wrote_here(kwargs) or (_replica_reads() and _wrote_recently(kwargs)):
+                return func(*args, **kwargs)
+            return flight.do(_request_key(name, kwargs), lambda: func(*args, **kwargs))
+        return wrapper
+
+    return decorator
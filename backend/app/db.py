@@ -1,25 +1,183 @@
 # app/db.py
+import logging
+import threading
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlmodel import create_engine, SQLModel, Session
 from app.core.config import settings
+from app.core.pool import InstrumentedQueuePool
 
-# Create database engine with connection retry settings
-try:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        echo=True,  # Set to False in production
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-        connect_args={
-            "connect_timeout": 10,
-            "options": "-c statement_timeout=30000"
+logger = logging.getLogger(__name__)
+
+
+def pool_limits() -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) for one worker's engine.
+
+    With DB_MAX_CONNECTIONS set, the budget is split evenly across
+    WEB_CONCURRENCY workers, so all of them together never exceed it.
+    """
+    if not settings.DB_MAX_CONNECTIONS:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    share = max(settings.DB_MAX_CONNECTIONS // max(settings.WEB_CONCURRENCY, 1), 1)
+    pool_size = min(settings.DB_POOL_SIZE, share)
+    return pool_size, share - pool_size
+
+
+def engine_options(url: str) -> dict:
+    """
+    create_engine() keyword arguments for a database URL, from settings.
+
+    SQLite (used for local replica/shard testing) takes none of the
+    Postgres pool and connection settings. In PgBouncer mode the pool is
+    left to PgBouncer (NullPool) and no startup options are sent, since
+    transaction pooling rejects them; psycopg2 never uses server-side
+    prepared statements, so nothing else needs disabling.
+    """
+    if url.startswith("sqlite"):
+        return {
+            "echo": settings.DB_ECHO,
+            "connect_args": {"check_same_thread": False},
         }
-    )
-    print(f"✓ Database engine created successfully")
-except Exception as e:
-    print(f"✗ Warning: Failed to create database engine: {e}")
-    print(f"  DATABASE_URL prefix: {settings.DATABASE_URL[:30]}...")
-    engine = None
+
+    connect_args = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+
+    if settings.DB_PGBOUNCER:
+        return {
+            "echo": settings.DB_ECHO,
+            "poolclass": NullPool,
+            "connect_args": connect_args,
+        }
+
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    pool_size, max_overflow = pool_limits()
+    return {
+        "echo": settings.DB_ECHO,
+        "poolclass": InstrumentedQueuePool,
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "connect_args": connect_args,
+    }
+
+
+def _create_engine(url: str, label: str):
+    # Create database engine with connection retry settings
+    try:
+        created = create_engine(url, **engine_options(url))
+        logger.info("%s engine created", label)
+        return created
+    except Exception as e:
+        logger.warning("Failed to create %s engine: %s (URL prefix: %s...)", label, e, url[:30])
+        return None
+
+
+# Engines are created on first use rather than at import, so importing the
+# app (workers, Alembic, scripts) stays cheap. Once created they are plain
+# module attributes: app.db.engine and app.db.read_engine.
+_engine_lock = threading.Lock()
+_MISSING = object()
+
+
+def get_engine():
+    """Primary engine: all writes, and reads that must see them."""
+    created = globals().get("engine", _MISSING)
+    if created is _MISSING:
+        with _engine_lock:
+            created = globals().get("engine", _MISSING)
+            if created is _MISSING:
+                created = globals()["engine"] = _create_engine(settings.DATABASE_URL, "Database")
+    return created
+
+
+def get_read_engine():
+    """Replica engine for read-heavy GET routes; the primary when unset."""
+    created = globals().get("read_engine", _MISSING)
+    if created is _MISSING:
+        primary = get_engine()
+        with _engine_lock:
+            created = globals().get("read_engine", _MISSING)
+            if created is _MISSING:
+                if settings.READ_DATABASE_URL:
+                    created = _create_engine(settings.READ_DATABASE_URL, "Read replica")
+                else:
+                    created = primary
+                globals()["read_engine"] = created
+    return created
+
+
+_shard_engines: dict = {}
+
+
+def get_shard_engine(name: str):
+    """Engine for a shard named in SHARDS (the primary's when the URL is DATABASE_URL)."""
+    created = _shard_engines.get(name)
+    if created is None:
+        url = settings.SHARDS[name]
+        primary = get_engine() if url == settings.DATABASE_URL else None
+        with _engine_lock:
+            created = _shard_engines.get(name)
+            if created is None:
+                created = primary or _create_engine(url, f"Shard {name}")
+                _shard_engines[name] = created
+    return created
+
+
+def shard_engines() -> dict:
+    """Every database holding user rows, by shard name: the shards, or just the primary."""
+    if not settings.SHARDS:
+        return {"default": get_engine()}
+    return {name: get_shard_engine(name) for name in settings.SHARDS}
+
+
+def __getattr__(name: str):
+    # Lazily create engines on `from app.db import engine` / `app.db.engine`
+    if name == "engine":
+        return get_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def dispose_engines() -> None:
+    """
+    Forget pooled connections inherited from a parent process.
+
+    Call in a freshly forked worker: connections opened before the fork
+    are left for the parent (close=False) and the worker's pools start
+    empty, so no two processes share a socket.
+    """
+    created = [globals().get("engine"), globals().get("read_engine"), *_shard_engines.values()]
+    for existing in {id(e): e for e in created if e is not None}.values():
+        existing.dispose(close=False)
+
+
+def prewarm_pool(connections: int) -> int:
+    """
+    Open up to `connections` pooled connections to the primary ahead of traffic.
+
+    Returns how many were opened. Call at startup (in a thread) so the
+    first requests don't pay for connection setup.
+    """
+    engine = get_engine()
+    if engine is None or connections <= 0 or not isinstance(engine.pool, QueuePool):
+        return 0
+    opened = []
+    try:
+        for _ in range(min(connections, engine.pool.size())):
+            connection = engine.connect()
+            connection.exec_driver_sql("SELECT 1")
+            opened.append(connection)
+    except Exception as e:
+        logger.warning("Connection pool prewarm stopped: %s", e)
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
 
 
 def create_db_and_tables():
@@ -27,15 +185,50 @@ def create_db_and_tables():
     Create all database tables.
     This is useful for development. In production, use Alembic migrations.
     """
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
+
+
+def statement_timeout(milliseconds: int):
+    """
+    Route dependency that sets the statement timeout for the route's sessions.
+
+    Usage: @router.get(..., dependencies=[Depends(statement_timeout(60000))])
+    """
+    def set_statement_timeout(request: Request) -> None:
+        request.state.statement_timeout_ms = milliseconds
+    return set_statement_timeout
+
+
+def open_session(bind, request: Optional[Request] = None) -> Session:
+    """
+    Create a session, applying statement timeouts on Postgres.
+
+    The timeout is set with SET LOCAL at the start of every transaction:
+    a per-route override from statement_timeout(), or the default when in
+    PgBouncer mode (where it cannot be sent as a startup option).
+    """
+    session = Session(bind)
+
+    if bind.dialect.name == "postgresql":
+        def apply_timeout(session, transaction, connection):
+            timeout = getattr(request.state, "statement_timeout_ms", None) if request else None
+            if timeout is None and settings.DB_PGBOUNCER:
+                timeout = settings.DB_STATEMENT_TIMEOUT_MS
+            if timeout is not None:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+        event.listen(session, "after_begin", apply_timeout)
+
+    return session
 
 
-def get_session():
+def get_session(request: Request):
     """
     Dependency to get database session.
     Use this in FastAPI route dependencies.
     """
+    engine = get_engine()
     if engine is None:
         raise RuntimeError("Database engine not initialized. Check DATABASE_URL configuration.")
-    with Session(engine) as session:
+    with open_session(engine, request) as session:
         yield session
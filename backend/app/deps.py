@@ -1,48 +1,48 @@
 # app/deps.py
+import secrets
+from datetime import datetime, timedelta
 from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session, select
-from app.db import get_session
+from app.core.config import settings
+from app.db import get_engine, get_read_engine, open_session
 from app.models import User
 from app.core.security import decode_access_token
 from app.schemas import TokenData
+from app.services.auth import revocations, user_from_claims
+from app.services.directory import directory_entry, engine_for_user
+from app.services.subscriptions import recent_writers
 
 # Security scheme
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    session: Annotated[Session, Depends(get_session)]
-) -> User:
-    """
-    Dependency to get the current authenticated user.
-
-    Validates the JWT token and returns the user object.
-    Raises HTTPException if token is invalid or user not found.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Decode token
-    token = credentials.credentials
-    payload = decode_access_token(token)
 
+def _authenticate(payload: dict | None, session: Session) -> User:
+    """Load and check the user a decoded token payload refers to."""
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
-    user_id: int = payload.get("sub")
+    user_id = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     # Get user from database
-    user = session.get(User, user_id)
+    user = session.get(User, int(user_id))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    # Tokens issued before the last deactivation are revoked
+    if payload.get("ver", user.token_version) < user.token_version:
+        raise _credentials_exception()
 
     if not user.is_active:
         raise HTTPException(
@@ -53,5 +53,180 @@ def get_current_user(
     return user
 
 
+def require_metrics_token(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))]
+) -> None:
+    """
+    Dependency guarding /metrics: the caller must send METRICS_TOKEN as a
+    bearer token. Without METRICS_TOKEN the endpoint does not exist.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise _credentials_exception()
+
+
+def token_payload(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
+) -> dict | None:
+    """Decoded bearer token (None if invalid); decoded once per request."""
+    return decode_access_token(credentials.credentials)
+
+
+def get_user_session(request: Request, payload: Annotated[dict | None, Depends(token_payload)]):
+    """
+    Dependency to get a session on the database holding the caller's rows.
+
+    The primary, or with SHARDS the authenticated user's shard. While the
+    rebalancer is moving the user, writes get 503 and should be retried.
+    """
+    if not settings.SHARDS:
+        engine = get_engine()
+    else:
+        if payload is None or payload.get("sub") is None:
+            raise _credentials_exception()
+        entry = directory_entry(int(payload["sub"]))
+        if entry is None:
+            raise _credentials_exception()
+        if entry.moving and request.method not in ("GET", "HEAD"):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Account is being moved; retry shortly",
+                headers={"Retry-After": str(max(settings.SHARD_DIRECTORY_CACHE_SECONDS, 1))},
+            )
+        engine = engine_for_user(entry.user_id)
+    if engine is None:
+        raise RuntimeError("Database engine not initialized. Check DATABASE_URL configuration.")
+    with open_session(engine, request) as session:
+        yield session
+
+
+UserSession = Annotated[Session, Depends(get_user_session)]
+
+
+def get_current_user(
+    payload: Annotated[dict | None, Depends(token_payload)],
+    session: UserSession
+) -> User:
+    """
+    Dependency to get the current authenticated user.
+
+    Validates the JWT token and returns the user object.
+    Raises HTTPException if token is invalid or user not found.
+
+    With AUTH_STATELESS, tokens carrying active/version claims are checked
+    against the in-memory revocation set instead of the users table, and a
+    transient User built from the claims is returned (no query is made).
+    """
+    if settings.AUTH_STATELESS and payload is not None and "ver" in payload and "sub" in payload:
+        if revocations.is_revoked(int(payload["sub"]), payload["ver"]):
+            raise _credentials_exception()
+        if not payload.get("active", False):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Inactive user"
+            )
+        return user_from_claims(payload)
+
+    return _authenticate(payload, session)
+
+
+def get_current_db_user(
+    payload: Annotated[dict | None, Depends(token_payload)],
+    session: UserSession
+) -> User:
+    """
+    Dependency to get the current user, always loaded from the database.
+
+    For routes that modify the user or return its full profile; the
+    returned instance belongs to the request's UserSession.
+    """
+    return _authenticate(payload, session)
+
+
+def get_current_admin(current_user: Annotated[User, Depends(get_current_db_user)]) -> User:
+    """
+    Dependency to get the current user, who must be an admin.
+
+    The flag is read from the database rather than token claims, so
+    revoking admin access takes effect immediately.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
 # Type alias for dependency injection
 CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentDBUser = Annotated[User, Depends(get_current_db_user)]
+AdminUser = Annotated[User, Depends(get_current_admin)]
+
+
+def replica_reads() -> bool:
+    """Whether reads can go to a lagging read replica (unsharded, replica configured)."""
+    return not settings.SHARDS and get_read_engine() is not get_engine()
+
+
+def _stored_write_stamp(user_id: int) -> datetime:
+    """The user's latest write stamp, read from the primary."""
+    engine = get_engine()
+    if engine is None:
+        return datetime.max  # unconfigured: assume a fresh write
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(User.subscriptions_changed_at, User.updated_at).where(User.id == user_id)
+        ).first()
+    if row is None:
+        return datetime.min
+    return max(stamp or datetime.min for stamp in row)
+
+
+def recently_wrote(user: User) -> bool:
+    """
+    Whether the user wrote within the read-your-writes window.
+
+    Uses the version stamps on the user row (already loaded from the
+    primary for authentication), so the check is shared across workers
+    and costs no extra query. Stateless-auth users carry no stamps: unless
+    this process saw the write, their stamps are read from the primary
+    (one primary-key lookup), but only when a read replica is configured;
+    otherwise every read is on the primary and sees the write anyway.
+    """
+    if recent_writers.get(user.id):
+        return True
+    last_write = max(
+        user.subscriptions_changed_at or datetime.min,
+        user.updated_at or datetime.min
+    )
+    if last_write == datetime.min:
+        if not replica_reads():
+            return False
+        last_write = _stored_write_stamp(user.id)
+    window = timedelta(seconds=settings.READ_YOUR_WRITES_SECONDS)
+    return datetime.utcnow() - last_write < window
+
+
+def get_read_session(request: Request, current_user: CurrentUser):
+    """
+    Dependency to get a read-only database session.
+
+    Routes to the read replica, except for users who wrote within the last
+    READ_YOUR_WRITES_SECONDS, who stay on the primary so they see their
+    own changes despite replication lag. With SHARDS, reads go to the
+    user's shard (shards have no replicas).
+    """
+    if settings.SHARDS:
+        bind = engine_for_user(current_user.id)
+    elif replica_reads() and not recently_wrote(current_user):
+        bind = get_read_engine()
+    else:
+        bind = get_engine()
+    if bind is None:
+        raise RuntimeError("Database engine not initialized. Check DATABASE_URL configuration.")
+    with open_session(bind, request) as session:
+        yield session
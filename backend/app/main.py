@@ -1,12 +1,32 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.db import create_db_and_tables
-from app.api.v1 import auth, subscriptions, analytics
+from app.core.logs import configure_logging, shutdown_logging
+from app.db import create_db_and_tables, prewarm_pool
+from app.deps import require_metrics_token
+from app.api.v1 import auth, subscriptions, analytics, batch, admin, budgets
+from app.core.ratelimit import purge_rate_limit_buckets
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.services.archive import archive_cancelled_subscriptions
+from app.services.auth import poll_revocations
+from app.services.budgets import deliver_budget_alerts, reconcile_budgets
+from app.services.fx import refresh_fx_rates
+from app.services.health import check_health, health
+from app.services.idempotency import purge_expired_keys
+from app.services.reports import scan_duplicates
+from app.services.scheduler import scheduler
+from app.services.snapshots import snapshot_daily_spend
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,26 +36,54 @@ async def lifespan(app: FastAPI):
     On startup: Create database tables (for development).
     In production, use Alembic migrations instead.
     """
-    print("=" * 50)
-    print("STARTUP: Beginning application startup...")
-    print(f"STARTUP: PORT environment variable: {os.getenv('PORT', 'NOT SET')}")
-    print(f"STARTUP: DATABASE_URL starts with: {settings.DATABASE_URL[:20]}...")
-    print(f"STARTUP: CORS_ORIGINS: {settings.CORS_ORIGINS}")
-    print("=" * 50)
+    configure_logging()
+    logger.info(
+        "Starting up: PORT=%s DATABASE_URL=%s... CORS_ORIGINS=%s",
+        os.getenv("PORT", "NOT SET"), settings.DATABASE_URL[:20], settings.CORS_ORIGINS
+    )
 
     # Temporarily disable database table creation to debug Railway deployment
     # try:
-    #     print("STARTUP: Creating database tables...")
     #     create_db_and_tables()
-    #     print("STARTUP: ✓ Database tables created successfully")
+    #     logger.info("Database tables created")
     # except Exception as e:
-    #     print(f"STARTUP: ✗ Warning: Could not create database tables: {e}")
-    #     print("STARTUP: App will continue, but database operations may fail")
-
-    print("STARTUP: ✓ Application startup complete (DB creation disabled)")
-    print("=" * 50)
+    #     logger.warning("Could not create database tables: %s", e)
+
+    # Background jobs
+    scheduler.add_job("health-check", check_health, settings.HEALTH_CHECK_SECONDS)
+    scheduler.add_job("fx-rates", refresh_fx_rates, settings.FX_REFRESH_SECONDS)
+    scheduler.add_job("idempotency-keys", purge_expired_keys, settings.IDEMPOTENCY_CLEANUP_SECONDS)
+    scheduler.add_job(
+        "subscription-archive", archive_cancelled_subscriptions, settings.SUBSCRIPTION_ARCHIVE_INTERVAL_SECONDS
+    )
+    scheduler.add_job("spend-snapshots", snapshot_daily_spend, settings.SNAPSHOT_CHECK_SECONDS)
+    scheduler.add_job("duplicate-scan", scan_duplicates, settings.DUPLICATE_SCAN_SECONDS, run_at_start=False)
+    scheduler.add_job("budget-alerts", deliver_budget_alerts, settings.BUDGET_ALERT_DELIVERY_SECONDS)
+    scheduler.add_job("budget-reconcile", reconcile_budgets, settings.BUDGET_RECONCILE_SECONDS, run_at_start=False)
+    if settings.AUTH_STATELESS:
+        scheduler.add_job("auth-revocations", poll_revocations, settings.AUTH_REVOCATION_POLL_SECONDS)
+    if settings.RATE_LIMIT_BACKEND == "database":
+        scheduler.add_job("rate-limit-purge", purge_rate_limit_buckets, 3600)
+    scheduler.start()
+
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == "memory" and settings.WEB_CONCURRENCY > 1:
+        logger.warning(
+            "Auth rate limits are per worker: with %s workers a client gets up to %s times the limit; "
+            "set RATE_LIMIT_BACKEND=database to share them",
+            settings.WEB_CONCURRENCY, settings.WEB_CONCURRENCY
+        )
+
+    # Create the engine (and optionally open pooled connections) before
+    # the first request rather than during it
+    warmed = await asyncio.to_thread(prewarm_pool, settings.DB_POOL_PREWARM)
+    if warmed:
+        logger.info("Prewarmed %s database connections", warmed)
+
+    logger.info("Application startup complete (DB creation disabled)")
     yield
-    print("SHUTDOWN: Shutting down...")
+    logger.info("Shutting down")
+    await scheduler.stop()
+    shutdown_logging()
 
 
 # Create FastAPI application
@@ -46,6 +94,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Retry-safe subscription writes (inside CORS, so replays get CORS headers)
+app.add_middleware(IdempotencyMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -53,12 +104,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Compress responses (outermost, so every response is covered)
+app.add_middleware(CompressionMiddleware)
+
+# Correlation id for logs (outside everything else, so all of it is covered)
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(subscriptions.router, prefix="/api/v1")
 app.include_router(analytics.router, prefix="/api/v1")
+app.include_router(batch.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+app.include_router(budgets.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -75,38 +136,93 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """
     Health check endpoint.
-    Use this for monitoring and load balancers.
+    Summary of the cached health status; never touches the database.
     """
-    from app.db import engine
+    primary = health.database("primary")
+    if primary is None:
+        database = "unknown"
+    elif primary["status"] == "error":
+        database = f"error: {primary['error'][:50]}"
+    elif primary["status"] == "not_configured":
+        database = "not_configured"
+    else:
+        database = "connected"
 
-    health_status = {
+    return {
         "status": "healthy",
-        "database": "unknown"
+        "database": database
     }
 
-    # Check database connection
-    if engine is None:
-        health_status["database"] = "not_configured"
-    else:
-        try:
-            from sqlalchemy import text
-            with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            health_status["database"] = "connected"
-        except Exception as e:
-            health_status["database"] = f"error: {str(e)[:50]}"
 
-    return health_status
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process is up and its event loop is responding.
+    Restart the instance when this fails.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 when the instance can serve traffic, else 503.
+
+    Served from the status cached by the health-check job (database
+    reachability, pool saturation and migration state per database), so
+    probes cost no database connections. Not ready until the first check
+    completes, when a database is unreachable or behind this code's
+    migration head, or when the cached status has gone stale.
+    """
+    ready, report = health.readiness()
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """
+    Runtime metrics for monitoring, for callers holding METRICS_TOKEN.
+
+    Connection pool occupancy and saturation events (checkout wait,
+    overflow use and timeouts) per engine, and how many expensive reads
+    were coalesced into an in-flight identical request.
+    """
+    from app.core.pool import pool_status
+    from app.core.singleflight import flight
+    from app.db import engine, read_engine, shard_engines
+
+    pools = {}
+    if engine is not None:
+        pools["primary"] = pool_status(engine.pool)
+    if read_engine is not None and read_engine is not engine:
+        pools["replica"] = pool_status(read_engine.pool)
+    if settings.SHARDS:
+        for name, shard_engine in shard_engines().items():
+            if shard_engine is not engine:
+                pools[f"shard:{name}"] = pool_status(shard_engine.pool)
+
+    return {"pools": pools, "singleflight": flight.stats()}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    if settings.ENVIRONMENT == "production":
+        # Multi-process without preload; `gunicorn app.main:app` is preferred
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=int(os.getenv("PORT", "8000")),
+            workers=settings.WEB_CONCURRENCY,
+            timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+            forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True
+        )
@@ -0,0 +1,121 @@
+# app/middleware/compression.py
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.compression import (
+    StreamCompressor,
+    choose_encoding,
+    compress,
+    is_compressible,
+    weak_etag,
+)
+from app.core.config import settings
+
+# Bodies larger than this are compressed off the event loop
+THREADPOOL_THRESHOLD = 256 * 1024
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip.
+
+    Only compressible content types at least COMPRESSION_MIN_SIZE bytes
+    long are compressed; streamed responses are compressed chunk by chunk.
+    Responses that already carry a Content-Encoding (e.g. precompressed
+    cached bodies) pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingSender(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingSender:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Headers depend on the first body chunk; hold them until then
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if not self.started:
+            self.started = True
+            await self._first_body(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        more_body = message.get("more_body", False)
+        data = self.compressor.compress(message.get("body", b""))
+        if not more_body:
+            data += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _first_body(self, message: Message) -> None:
+        start = self.start_message
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if (
+            "content-encoding" in headers
+            or not is_compressible(headers.get("content-type"))
+            or (not more_body and len(body) < self.minimum_size)
+        ):
+            self.passthrough = True
+            await self._send(start)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["ETag"] = weak_etag(headers["etag"])
+
+        if not more_body:
+            if len(body) > THREADPOOL_THRESHOLD:
+                data = await run_in_threadpool(compress, body, self.encoding)
+            else:
+                data = compress(body, self.encoding)
+            headers["Content-Length"] = str(len(data))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": data})
+            return
+
+        # Streaming: length is unknown once compressed
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        self.compressor = StreamCompressor(self.encoding)
+        await self._send(start)
+        await self._send({
+            "type": "http.response.body",
+            "body": self.compressor.compress(body),
+            "more_body": True,
+        })
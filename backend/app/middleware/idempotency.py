@@ -0,0 +1,143 @@
+# app/middleware/idempotency.py
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.security import decode_access_token
+from app.services import idempotency
+from app.services.directory import engine_for_user
+from app.services.idempotency import IdempotencyConflict, StoredResponse
+
+
+class IdempotencyMiddleware:
+    """
+    Make writes retry-safe with the Idempotency-Key header.
+
+    For write requests under the given path prefixes that carry the header
+    and a valid bearer token, the first request claims the (user, key)
+    pair and its response is stored; a retry with the same key and an
+    identical request gets the stored response back (marked with
+    Idempotent-Replayed: true) without reaching the route. Server errors
+    are not stored, so they can be retried.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefixes: tuple[str, ...] = ("/api/v1/subscriptions",),
+        methods: tuple[str, ...] = ("POST", "PUT", "PATCH", "DELETE"),
+    ):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self.methods = methods
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        user_id = _user_id(headers) if key else None
+        if user_id is None:
+            # No key, or unauthenticated (the route will reject it)
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > 255:
+            response = JSONResponse({"detail": "Idempotency-Key must be at most 255 characters"}, 400)
+            await response(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = idempotency.request_fingerprint(
+            scope["method"], scope["path"], scope.get("query_string", b""), body
+        )
+
+        # Keys live with the user's rows (their shard, when sharded)
+        engine = await run_in_threadpool(engine_for_user, user_id)
+        if engine is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            claim = await run_in_threadpool(idempotency.begin, engine, user_id, key, fingerprint)
+        except IdempotencyConflict as e:
+            response = JSONResponse({"detail": e.detail}, e.status_code)
+            await response(scope, receive, send)
+            return
+
+        if isinstance(claim, StoredResponse):
+            stored = claim
+            response = Response(
+                stored.body,
+                status_code=stored.status_code,
+                media_type=stored.content_type,
+                headers={"Idempotent-Replayed": "true"},
+            )
+            await response(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type = None
+        chunks = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(idempotency.release, engine, user_id, key, claim)
+            raise
+
+        if status_code >= 500:
+            await run_in_threadpool(idempotency.release, engine, user_id, key, claim)
+        else:
+            stored = StoredResponse(status_code, content_type, b"".join(chunks))
+            await run_in_threadpool(idempotency.complete, engine, user_id, key, claim, stored)
+
+
+def _user_id(headers: Headers) -> Optional[int]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    if not payload or payload.get("sub") is None:
+        return None
+    try:
+        return int(payload["sub"])
+    except (TypeError, ValueError):
+        return None
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
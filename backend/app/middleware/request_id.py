@@ -0,0 +1,43 @@
+# app/middleware/request_id.py
+import re
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.logs import request_id_var
+
+HEADER = "X-Request-ID"
+
+# Client-supplied ids are kept only if short and log-safe
+_VALID_ID = re.compile(r"^[A-Za-z0-9._\-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    """
+    Give every request a correlation id.
+
+    Uses the client's X-Request-ID when it is well formed, otherwise
+    generates one. The id is attached to every log record written while
+    handling the request and echoed back in the response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = Headers(scope=scope).get(HEADER)
+        request_id = supplied if supplied and _VALID_ID.match(supplied) else uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[HEADER] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,6 +1,7 @@
 # app/models.py
 from datetime import datetime, date
 from typing import Optional
+from sqlalchemy import Column, Index, LargeBinary, text
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
 
@@ -26,6 +27,14 @@ class User(SQLModel, table=True):
     hashed_password: str = Field(nullable=False)
     full_name: Optional[str] = None
     is_active: bool = Field(default=True)
+    # Grants access to the platform-wide /admin reports
+    is_admin: bool = Field(default=False)
+    # Bumped on deactivation; tokens carrying an older version are rejected
+    token_version: int = Field(default=0)
+    reporting_currency: str = Field(default="USD")
+    calendar_token: Optional[str] = Field(default=None, unique=True, index=True)
+    # Bumped on every subscription write; versions cached per-user output
+    subscriptions_changed_at: datetime = Field(default_factory=datetime.utcnow)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -35,6 +44,15 @@ class User(SQLModel, table=True):
 
 class Subscription(SQLModel, table=True):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Hot reads (dashboard, analytics, calendar) only look at active rows
+        Index(
+            "ix_subscriptions_active_user_renewal",
+            "user_id",
+            "next_renewal_date",
+            postgresql_where=text("status = 'ACTIVE'"),
+        ),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(nullable=False, index=True)
@@ -70,3 +88,158 @@ class Subscription(SQLModel, table=True):
 
     # Relationships
     owner: User = Relationship(back_populates="subscriptions")
+
+
+class SubscriptionArchive(SQLModel, table=True):
+    __tablename__ = "subscriptions_archive"
+
+    # Long-cancelled subscriptions moved out of the hot table by the
+    # archival job; same columns and ids as subscriptions
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    name: str = Field(nullable=False)
+    amount: float = Field(nullable=False)
+    interval: str = Field(nullable=False)
+    next_renewal_date: date = Field(nullable=False)
+    vendor: Optional[str] = None
+    category: str = Field(nullable=False)
+    currency: str = Field(nullable=False)
+    custom_interval_days: Optional[int] = None
+    last_paid_at: Optional[date] = None
+    start_date: date = Field(nullable=False)
+    tags: Optional[str] = None
+    color: Optional[str] = None
+    website: Optional[str] = None
+    description: Optional[str] = None
+    status: SubscriptionStatus = Field(nullable=False)
+    created_at: datetime = Field(nullable=False)
+    updated_at: datetime = Field(nullable=False)
+    user_id: int = Field(foreign_key="users.id", nullable=False, index=True)
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DailySnapshot(SQLModel, table=True):
+    __tablename__ = "daily_snapshots"
+
+    # One row per user, day, category and currency, written nightly from
+    # the active subscriptions. The primary key leads with (user_id,
+    # snapshot_date), so a user's trend over a range is one index scan.
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    snapshot_date: date = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+    # Normalized monthly cost in `currency`, and number of subscriptions
+    monthly_total: float = Field(nullable=False)
+    count: int = Field(nullable=False)
+
+
+class Budget(SQLModel, table=True):
+    __tablename__ = "budgets"
+    __table_args__ = (
+        # One budget per category, and one overall budget (category null)
+        Index(
+            "ix_budgets_user_category",
+            "user_id",
+            text("coalesce(category, '')"),
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False, index=True)
+    # None for the overall budget, else the category it limits
+    category: Optional[str] = None
+    monthly_limit: float = Field(nullable=False)
+    currency: str = Field(default="USD")
+    # Share of the limit at which a warning alert is raised
+    warn_ratio: float = Field(default=0.8)
+    # Running normalized monthly cost of the matching active subscriptions,
+    # in `currency`, adjusted by each subscription write's delta
+    current_total: float = Field(default=0.0)
+    # Highest threshold already alerted on (0 under, 1 warning, 2 over);
+    # alerts are only raised when this goes up
+    alert_level: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class BudgetAlert(SQLModel, table=True):
+    __tablename__ = "budget_alerts"
+
+    # Also the delivery queue: rows with delivered_at null are pending
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False, index=True)
+    budget_id: int = Field(foreign_key="budgets.id", nullable=False)
+    kind: str = Field(nullable=False, max_length=16)  # "warning" or "exceeded"
+    category: Optional[str] = None
+    current_total: float = Field(nullable=False)
+    monthly_limit: float = Field(nullable=False)
+    currency: str = Field(nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    delivered_at: Optional[datetime] = Field(default=None, index=True)
+
+
+class UserDirectory(SQLModel, table=True):
+    __tablename__ = "user_directory"
+
+    # Global index of users when SHARDS is set, kept in the DATABASE_URL
+    # database: user rows and everything keyed by user live on `shard`.
+    # Also allocates user ids, so they are unique across shards.
+    user_id: Optional[int] = Field(default=None, primary_key=True)
+    email: str = Field(unique=True, index=True, nullable=False)
+    shard: str = Field(nullable=False, max_length=64)
+    calendar_token: Optional[str] = Field(default=None, unique=True, index=True)
+    # Set while the rebalancer moves the user's rows; writes are refused
+    moving: bool = Field(default=False)
+
+
+class IdBlock(SQLModel, table=True):
+    __tablename__ = "id_blocks"
+
+    # Next unreserved id per sequence; workers reserve ranges from here so
+    # rows keep unique ids across shards (and when moved between them)
+    name: str = Field(primary_key=True, max_length=64)
+    next_id: int = Field(nullable=False)
+
+
+class FxRate(SQLModel, table=True):
+    __tablename__ = "fx_rates"
+
+    # Units of this currency per one unit of the base currency
+    currency: str = Field(primary_key=True, max_length=3)
+    rate: float = Field(nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class TokenRevocation(SQLModel, table=True):
+    __tablename__ = "token_revocations"
+
+    # Tokens for this user with a version below token_version are revoked
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    token_version: int = Field(nullable=False)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class RateLimitBucket(SQLModel, table=True):
+    __tablename__ = "rate_limit_buckets"
+
+    # Shared token bucket state for the database rate limit backend
+    key: str = Field(primary_key=True, max_length=255)
+    tokens: float = Field(nullable=False)
+    # Unix time of the last refill
+    refilled_at: float = Field(nullable=False, index=True)
+
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+
+    # Idempotency-Key header values are scoped per user
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    # SHA-256 of method, path, query and body of the first request
+    fingerprint: str = Field(max_length=64, nullable=False)
+    # Null while the first request is still being processed
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(nullable=False, index=True)
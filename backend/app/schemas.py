@@ -1,6 +1,6 @@
 # app/schemas.py
 from datetime import datetime, date
-from typing import Optional
+from typing import Any, Literal, Optional
 from pydantic import BaseModel, EmailStr, Field, HttpUrl, field_validator
 from app.models import BillingCycle, SubscriptionStatus
 import re
@@ -32,9 +32,15 @@ class UserLogin(BaseModel):
     password: str
 
 
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    reporting_currency: Optional[str] = Field(default=None, pattern=r"^[A-Za-z]{3}$")
+
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
+    reporting_currency: str = "USD"
     created_at: datetime
 
     class Config:
@@ -125,10 +131,18 @@ class SubscriptionResponse(BaseModel):
 
 
 # Analytics Schemas
+class CurrencyTotal(BaseModel):
+    currency: str
+    total_amount: float  # In the original currency
+    converted_amount: Optional[float] = None  # In the reporting currency; None if no rate
+    count: int
+
+
 class CategorySpend(BaseModel):
     category: str
     total_amount: float
     count: int
+    by_currency: list[CurrencyTotal] = []
 
 
 class UpcomingRenewal(BaseModel):
@@ -138,6 +152,127 @@ class UpcomingRenewal(BaseModel):
 
 class DashboardStats(BaseModel):
     total_monthly_spend: float
+    currency: str = "USD"
     active_subscriptions: int
     upcoming_renewals: list[UpcomingRenewal]
     spend_by_category: list[CategorySpend]
+    spend_by_currency: list[CurrencyTotal] = []
+
+
+class DuplicateMember(BaseModel):
+    id: int
+    name: str
+    vendor: Optional[str] = None
+    currency: str
+    monthly_cost: Optional[float] = None  # In the reporting currency; None if no rate
+
+
+class DuplicateGroup(BaseModel):
+    score: float  # Lowest pairwise match score in the group, 0-1
+    combined_monthly_cost: float
+    subscriptions: list[DuplicateMember]
+
+
+class DuplicateReport(BaseModel):
+    currency: str
+    groups: list[DuplicateGroup]
+
+
+# Budget Schemas
+class BudgetCreate(BaseModel):
+    category: Optional[str] = Field(default=None, min_length=1)  # None for the overall budget
+    monthly_limit: float = Field(gt=0)
+    currency: Optional[str] = Field(default=None, pattern=r"^[A-Za-z]{3}$")  # Defaults to the reporting currency
+    warn_ratio: float = Field(default=0.8, gt=0, le=1)
+
+
+class BudgetUpdate(BaseModel):
+    monthly_limit: Optional[float] = Field(default=None, gt=0)
+    currency: Optional[str] = Field(default=None, pattern=r"^[A-Za-z]{3}$")
+    warn_ratio: Optional[float] = Field(default=None, gt=0, le=1)
+
+
+class BudgetResponse(BaseModel):
+    id: int
+    category: Optional[str] = None
+    monthly_limit: float
+    currency: str
+    warn_ratio: float
+    current_total: float
+    remaining: float
+    status: Literal["under", "warning", "exceeded"]
+    created_at: datetime
+    updated_at: datetime
+
+
+class BudgetAlertResponse(BaseModel):
+    id: int
+    budget_id: int
+    kind: str
+    category: Optional[str] = None
+    current_total: float
+    monthly_limit: float
+    currency: str
+    created_at: datetime
+
+
+# Scenario Schemas
+class Scenario(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    cancel: list[int] = []  # Subscription ids to cancel
+    amount_changes: dict[int, float] = {}  # Subscription id -> new amount, in the reporting currency
+    interval_changes: dict[int, BillingCycle] = {}  # Subscription id -> new billing cycle
+
+    @field_validator('amount_changes')
+    @classmethod
+    def validate_amounts(cls, v):
+        if any(amount <= 0 for amount in v.values()):
+            raise ValueError('Amounts must be greater than 0')
+        return v
+
+
+class ScenarioRequest(BaseModel):
+    scenarios: list[Scenario] = Field(min_length=1, max_length=50)
+    months: int = Field(default=12, ge=1, le=36)
+    currency: Optional[str] = Field(default=None, pattern=r"^[A-Za-z]{3}$")
+
+
+class ScenarioMonth(BaseModel):
+    month: str
+    projected_cost: float
+    delta: float
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    monthly_cost: float
+    monthly_delta: float
+    yearly_delta: float
+    timeline: list[ScenarioMonth]
+
+
+class ScenarioResponse(BaseModel):
+    currency: str
+    baseline_monthly_cost: float
+    scenarios: list[ScenarioResult]
+
+
+# Batch Schemas
+class BatchItem(BaseModel):
+    id: Optional[str] = None  # Echoed back to match responses to requests
+    method: Literal["GET"] = "GET"
+    path: str = Field(pattern=r"^/api/v1/")  # Including any query string
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(min_length=1, max_length=20)
+
+
+class BatchItemResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchItemResponse]
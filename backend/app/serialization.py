@@ -0,0 +1,102 @@
+# app/serialization.py
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Sequence
+import orjson
+from fastapi.responses import JSONResponse
+from app.models import Subscription
+
+
+# Response key -> model column, in the order the frontend expects them.
+# Selecting these columns yields plain result tuples that can be encoded
+# without hydrating Subscription entities.
+SUBSCRIPTION_FIELDS = (
+    ("id", Subscription.id),
+    ("name", Subscription.name),
+    ("cost", Subscription.amount),
+    ("billing_cycle", Subscription.interval),
+    ("next_renewal", Subscription.next_renewal_date),
+    ("category", Subscription.category),
+    ("vendor", Subscription.vendor),
+    ("currency", Subscription.currency),
+    ("custom_interval_days", Subscription.custom_interval_days),
+    ("last_paid_at", Subscription.last_paid_at),
+    ("start_date", Subscription.start_date),
+    ("tags", Subscription.tags),
+    ("color", Subscription.color),
+    ("website", Subscription.website),
+    ("description", Subscription.description),
+    ("status", Subscription.status),
+    ("user_id", Subscription.user_id),
+    ("created_at", Subscription.created_at),
+    ("updated_at", Subscription.updated_at),
+)
+
+
+class RowEncoder:
+    """
+    Encode result tuples straight to JSON bytes.
+
+    The key tuple is built once per encoder, so each row costs a single
+    dict(zip(...)) and orjson handles dates, datetimes and enums natively
+    (no .isoformat() calls and no jsonable_encoder pass).
+    """
+
+    __slots__ = ("keys", "columns")
+
+    def __init__(self, fields: Sequence[tuple[str, Any]]):
+        self.keys = tuple(key for key, _ in fields)
+        self.columns = tuple(column for _, column in fields)
+
+    def to_dict(self, row: Sequence[Any]) -> dict:
+        return dict(zip(self.keys, row))
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        keys = self.keys
+        return orjson.dumps([dict(zip(keys, row)) for row in rows])
+
+    def encode_one(self, row: Sequence[Any]) -> bytes:
+        return orjson.dumps(dict(zip(self.keys, row)))
+
+
+SUBSCRIPTION_ENCODER = RowEncoder(SUBSCRIPTION_FIELDS)
+
+SUBSCRIPTION_COLUMNS = dict(SUBSCRIPTION_FIELDS)
+
+
+@lru_cache(maxsize=256)
+def _subscription_plan(keys: tuple[str, ...]) -> RowEncoder:
+    return RowEncoder(tuple((key, SUBSCRIPTION_COLUMNS[key]) for key in keys))
+
+
+@lru_cache(maxsize=256)
+def subscription_encoder(fields: Optional[str] = None) -> RowEncoder:
+    """
+    Encoder (columns to select and keys to emit) for a sparse fieldset.
+
+    fields is a comma-separated list of response keys; empty means all.
+    Field sets are put in response order, so "name,id" and "id,name"
+    share one cached plan. Raises ValueError for unknown field names.
+    """
+    requested = {name.strip() for name in (fields or "").split(",") if name.strip()}
+    if not requested:
+        return SUBSCRIPTION_ENCODER
+    unknown = requested - SUBSCRIPTION_COLUMNS.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return _subscription_plan(tuple(key for key, _ in SUBSCRIPTION_FIELDS if key in requested))
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Content that is already encoded (bytes) is sent as-is, so routes can
+    hand over the output of a RowEncoder without a second serialization pass.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
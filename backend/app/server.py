@@ -0,0 +1,18 @@
+# app/server.py
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+from app.core.config import settings
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    gunicorn worker class running the app on uvicorn (see gunicorn.conf.py).
+
+    On SIGTERM the worker stops accepting connections, then waits up to
+    GRACEFUL_TIMEOUT for in-flight requests before running the app's
+    shutdown; gunicorn kills it only if that overruns.
+    """
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT,
+    }
@@ -0,0 +1,86 @@
+# app/services/archive.py
+import logging
+from datetime import datetime, timedelta
+from typing import Sequence
+from sqlalchemy import delete, insert, literal, select, update
+from app.core.config import settings
+from app.models import Subscription, SubscriptionArchive, SubscriptionStatus, User
+
+logger = logging.getLogger(__name__)
+
+live = Subscription.__table__
+archive = SubscriptionArchive.__table__
+
+# Columns copied as-is from subscriptions into the archive
+COPIED_COLUMNS = tuple(column.name for column in archive.c if column.name != "archived_at")
+
+
+def archived_columns(columns: Sequence) -> tuple:
+    """The archive's counterparts of Subscription columns, for UNION ALL reads."""
+    return tuple(getattr(SubscriptionArchive, column.key) for column in columns)
+
+
+def archive_batch(engine, cutoff: datetime, batch_size: int) -> int:
+    """
+    Move one batch of subscriptions cancelled before cutoff into the archive.
+
+    Runs in its own short transaction. On Postgres the batch is claimed
+    with FOR UPDATE SKIP LOCKED, so workers running the job at the same
+    time move disjoint batches. Returns the number of rows moved.
+    """
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        rows = connection.execute(
+            select(live.c.id, live.c.user_id)
+            .where(
+                live.c.status == SubscriptionStatus.CANCELLED,
+                live.c.updated_at < cutoff,
+            )
+            .order_by(live.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return 0
+
+        ids = [row.id for row in rows]
+        connection.execute(
+            insert(archive).from_select(
+                [*COPIED_COLUMNS, "archived_at"],
+                select(*(live.c[name] for name in COPIED_COLUMNS), literal(now))
+                .where(live.c.id.in_(ids)),
+            )
+        )
+        connection.execute(delete(live).where(live.c.id.in_(ids)))
+        # Default list output changed; bump the owners' versions as
+        # mark_subscriptions_changed does
+        connection.execute(
+            update(User)
+            .where(User.id.in_({row.user_id for row in rows}))
+            .values(subscriptions_changed_at=now)
+        )
+    return len(ids)
+
+
+def archive_cancelled_subscriptions() -> None:
+    """
+    Scheduler job: archive subscriptions cancelled for longer than
+    SUBSCRIPTION_ARCHIVE_AFTER_DAYS, SUBSCRIPTION_ARCHIVE_BATCH_SIZE rows
+    per transaction, on every shard.
+    """
+    from app.db import shard_engines
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.SUBSCRIPTION_ARCHIVE_AFTER_DAYS)
+    batch_size = settings.SUBSCRIPTION_ARCHIVE_BATCH_SIZE
+
+    moved = 0
+    for engine in shard_engines().values():
+        if engine is None:
+            continue
+        while True:
+            count = archive_batch(engine, cutoff, batch_size)
+            moved += count
+            if count < batch_size:
+                break
+    if moved:
+        logger.info("Archived %s cancelled subscriptions", moved)
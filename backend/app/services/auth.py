@@ -0,0 +1,135 @@
+# app/services/auth.py
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.models import TokenRevocation, User
+
+logger = logging.getLogger(__name__)
+
+# Re-read this far behind the newest revocation seen, in case of
+# transactions that committed out of timestamp order
+REVOCATION_OVERLAP = timedelta(seconds=60)
+
+
+def token_claims(user: User) -> dict:
+    """
+    Access token payload for a user.
+
+    Besides the subject, carries what get_current_user needs to
+    authenticate without a query in stateless mode: the active flag and
+    token version, plus the profile fields routes read off the user.
+    """
+    return {
+        "sub": str(user.id),
+        "active": user.is_active,
+        "ver": user.token_version,
+        "email": user.email,
+        "cur": user.reporting_currency,
+    }
+
+
+def user_from_claims(payload: dict) -> User:
+    """
+    Transient (never added to a session) User built from token claims.
+
+    Only the claim fields are meaningful; routes that write to the user or
+    need other columns should load it with get_current_db_user instead.
+    """
+    return User(
+        id=int(payload["sub"]),
+        email=payload.get("email", ""),
+        hashed_password="",
+        is_active=payload.get("active", True),
+        token_version=payload.get("ver", 0),
+        reporting_currency=payload.get("cur") or "USD",
+        # No write stamps: with a read replica, recently_wrote() reads them
+        # from the primary
+        subscriptions_changed_at=datetime.min,
+        updated_at=datetime.min,
+    )
+
+
+class RevocationSet:
+    """
+    Per-process view of revoked token versions, refreshed from the database.
+
+    Maps user id to the lowest token version still valid. Each poll reads
+    only revocations newer than the last one seen, within the token
+    lifetime (older revocations can only match expired tokens).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._min_versions: dict[int, int] = {}
+        # Newest revocation seen, per database (shard) polled
+        self._seen_until: dict[str, datetime] = {}
+        self.refreshed_at: Optional[datetime] = None
+
+    def add(self, user_id: int, token_version: int) -> None:
+        with self._lock:
+            current = self._min_versions.get(user_id, 0)
+            self._min_versions[user_id] = max(current, token_version)
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        return token_version < self._min_versions.get(user_id, 0)
+
+    def refresh(self, session: Session, source: str = "default") -> int:
+        now = datetime.utcnow()
+        since = now - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        seen_until = self._seen_until.get(source)
+        if seen_until is not None:
+            since = max(since, seen_until - REVOCATION_OVERLAP)
+
+        rows = session.exec(
+            select(TokenRevocation.user_id, TokenRevocation.token_version, TokenRevocation.revoked_at)
+            .where(TokenRevocation.revoked_at >= since)
+        ).all()
+
+        for user_id, token_version, revoked_at in rows:
+            self.add(user_id, token_version)
+            if seen_until is None or revoked_at > seen_until:
+                seen_until = self._seen_until[source] = revoked_at
+        self.refreshed_at = now
+        return len(rows)
+
+
+revocations = RevocationSet()
+
+
+def poll_revocations() -> None:
+    """Scheduler job: pick up deactivations made by other workers (on every shard)."""
+    from app.db import shard_engines
+
+    for name, engine in shard_engines().items():
+        if engine is None:
+            continue
+        with Session(engine) as session:
+            revocations.refresh(session, name)
+
+
+def deactivate_user(session: Session, user: User) -> User:
+    """
+    Deactivate a user and revoke all of their outstanding tokens.
+
+    Bumps the token version and records it in token_revocations, which
+    other workers poll; this worker applies it immediately.
+    """
+    user.is_active = False
+    user.token_version += 1
+    user.updated_at = datetime.utcnow()
+
+    revocation = session.get(TokenRevocation, user.id) or TokenRevocation(user_id=user.id)
+    revocation.token_version = user.token_version
+    revocation.revoked_at = datetime.utcnow()
+
+    session.add(user)
+    session.add(revocation)
+    session.commit()
+    session.refresh(user)
+
+    revocations.add(user.id, user.token_version)
+    logger.info("Deactivated user %s (token version %s)", user.id, user.token_version)
+    return user
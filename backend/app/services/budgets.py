@@ -0,0 +1,223 @@
+# app/services/budgets.py
+import logging
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+from sqlmodel import Session, func, select
+from app.core.config import settings
+from app.models import Budget, BudgetAlert, Subscription, SubscriptionStatus
+from app.services.directory import new_budget_alert_id
+from app.services.fx import convert, fx_rates
+from app.services.subscriptions import monthly_cost, monthly_cost_expr
+
+logger = logging.getLogger(__name__)
+
+# Budget evaluation is incremental: each budget row keeps the running
+# monthly total of the subscriptions it covers. Subscription writes apply
+# their change in normalized monthly cost to the user's budget rows (in
+# the same transaction) and queue an alert when a threshold is crossed
+# upwards; subscriptions are only rescanned when a budget is created or
+# its currency changes, and by the daily reconciliation job.
+
+UNDER, WARNING, EXCEEDED = 0, 1, 2
+
+ALERT_KINDS = {WARNING: "warning", EXCEEDED: "exceeded"}
+
+# Alerts claimed per transaction by the delivery job
+ALERT_DELIVERY_BATCH = 100
+
+
+class Contribution(NamedTuple):
+    """What one subscription adds to budgets: normalized monthly cost."""
+    category: str
+    currency: str
+    monthly: float
+
+
+def contribution(subscription: Subscription) -> Optional[Contribution]:
+    """A subscription's budget contribution; None unless it is active."""
+    if subscription.status != SubscriptionStatus.ACTIVE:
+        return None
+    return Contribution(
+        subscription.category,
+        subscription.currency,
+        monthly_cost(subscription.amount, subscription.interval, subscription.custom_interval_days),
+    )
+
+
+def budget_level(budget: Budget) -> int:
+    if budget.current_total > budget.monthly_limit:
+        return EXCEEDED
+    if budget.current_total >= budget.monthly_limit * budget.warn_ratio:
+        return WARNING
+    return UNDER
+
+
+def covers(budget: Budget, category: str) -> bool:
+    return budget.category is None or budget.category == category
+
+
+def evaluate(session: Session, budget: Budget) -> Optional[BudgetAlert]:
+    """
+    Update a budget's alert level from its running total, queueing an
+    alert if it rose. Falling below a threshold re-arms its alert.
+    """
+    level = budget_level(budget)
+    alert = None
+    if level > budget.alert_level:
+        alert = BudgetAlert(
+            id=new_budget_alert_id(),
+            user_id=budget.user_id,
+            budget_id=budget.id,
+            kind=ALERT_KINDS[level],
+            category=budget.category,
+            current_total=round(budget.current_total, 2),
+            monthly_limit=budget.monthly_limit,
+            currency=budget.currency,
+        )
+        session.add(alert)
+    budget.alert_level = level
+    return alert
+
+
+def apply_subscription_change(
+    session: Session,
+    user_id: int,
+    before: Optional[Contribution],
+    after: Optional[Contribution]
+) -> None:
+    """
+    Apply one subscription write to the user's budgets.
+
+    before/after are the subscription's contribution before and after the
+    write (None when it didn't exist or isn't active). Adds the delta to
+    each covering budget's running total and evaluates thresholds; the
+    caller commits. On Postgres the budget rows are locked, so concurrent
+    writes by the same user apply their deltas one at a time; callers
+    updating or deleting a subscription lock its row before reading
+    before, so two writes to it never subtract the same contribution.
+    """
+    changes = []
+    if before is not None:
+        changes.append(before._replace(monthly=-before.monthly))
+    if after is not None:
+        changes.append(after)
+    if not changes or before == after:
+        return
+
+    budgets = session.exec(
+        select(Budget).where(Budget.user_id == user_id).with_for_update()
+    ).all()
+    if not budgets:
+        return
+
+    rates = fx_rates.get_rates()
+    for budget in budgets:
+        delta = 0.0
+        for category, currency, monthly in changes:
+            if covers(budget, category):
+                delta += convert(monthly, currency, budget.currency, rates) or 0.0
+        if delta:
+            # Clamp rounding drift below zero
+            budget.current_total = max(budget.current_total + delta, 0.0)
+            budget.updated_at = datetime.utcnow()
+            evaluate(session, budget)
+
+
+def _totals(session: Session, user_ids: Iterable[int]) -> dict[int, list[tuple]]:
+    """Active (category, currency, monthly total) rows per user, one query."""
+    statement = select(
+        Subscription.user_id,
+        Subscription.category,
+        Subscription.currency,
+        func.sum(monthly_cost_expr()),
+    ).where(
+        Subscription.user_id.in_(list(user_ids)),
+        Subscription.status == SubscriptionStatus.ACTIVE,
+    ).group_by(Subscription.user_id, Subscription.category, Subscription.currency)
+    totals: dict[int, list[tuple]] = {}
+    for user_id, category, currency, total in session.connection().execute(statement):
+        totals.setdefault(user_id, []).append((category, currency, total or 0.0))
+    return totals
+
+
+def recompute(budget: Budget, rows: list[tuple], rates: dict[str, float]) -> None:
+    """Set a budget's running total from (category, currency, monthly total) rows."""
+    budget.current_total = sum(
+        convert(total, currency, budget.currency, rates) or 0.0
+        for category, currency, total in rows
+        if covers(budget, category)
+    )
+
+
+def recompute_budget(session: Session, budget: Budget) -> None:
+    """Rescan the user's subscriptions for one budget's running total."""
+    rows = _totals(session, [budget.user_id]).get(budget.user_id, [])
+    recompute(budget, rows, fx_rates.get_rates())
+
+
+def reconcile_budgets() -> None:
+    """
+    Scheduler job: recompute every budget's running total from scratch.
+
+    Corrects drift in the incremental totals (such as exchange rate moves
+    since the deltas were applied) and raises alerts for any threshold
+    that has been crossed.
+    """
+    from app.db import shard_engines
+
+    alerts = 0
+    for engine in shard_engines().values():
+        if engine is None:
+            continue
+        with Session(engine) as session:
+            user_ids = session.exec(select(Budget.user_id).distinct()).all()
+            rates = fx_rates.get_rates()
+            for start in range(0, len(user_ids), settings.BUDGET_RECONCILE_BATCH_SIZE):
+                batch = user_ids[start:start + settings.BUDGET_RECONCILE_BATCH_SIZE]
+                # Lock before reading totals, so a concurrent write's delta
+                # lands either in the rescan or after it, never lost
+                budgets = session.exec(
+                    select(Budget).where(Budget.user_id.in_(batch)).with_for_update()
+                ).all()
+                totals = _totals(session, batch)
+                for budget in budgets:
+                    recompute(budget, totals.get(budget.user_id, []), rates)
+                    alerts += evaluate(session, budget) is not None
+                session.commit()
+    if alerts:
+        logger.info("Budget reconciliation raised %s alerts", alerts)
+
+
+def deliver_budget_alerts() -> None:
+    """
+    Scheduler job: deliver queued budget alerts.
+
+    Claims pending alerts with FOR UPDATE SKIP LOCKED on Postgres, so
+    workers running the job together deliver each alert once. Delivery is
+    a structured log record for now; a notifier would hook in here.
+    """
+    from app.db import shard_engines
+
+    for engine in shard_engines().values():
+        if engine is None:
+            continue
+        while True:
+            with Session(engine) as session:
+                pending = session.exec(
+                    select(BudgetAlert)
+                    .where(BudgetAlert.delivered_at.is_(None))
+                    .order_by(BudgetAlert.id)
+                    .limit(ALERT_DELIVERY_BATCH)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                now = datetime.utcnow()
+                for alert in pending:
+                    logger.info(
+                        "Budget %s for user %s: %.2f of %.2f %s",
+                        alert.kind, alert.user_id, alert.current_total, alert.monthly_limit, alert.currency,
+                        extra={"budget_id": alert.budget_id, "category": alert.category},
+                    )
+                    alert.delivered_at = now
+                session.commit()
+            if len(pending) < ALERT_DELIVERY_BATCH:
+                break
@@ -0,0 +1,141 @@
+# app/services/calendar.py
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from sqlmodel import Session, select
+from app.core.cache import LRUCache
+from app.core.compression import compress
+from app.core.config import settings
+from app.models import Subscription
+from app.services.subscriptions import active_filter
+
+
+# RRULE parts for each fixed billing interval
+RRULES = {
+    "weekly": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "quarterly": "FREQ=MONTHLY;INTERVAL=3",
+    "yearly": "FREQ=YEARLY",
+}
+
+ICS_COLUMNS = (
+    Subscription.id,
+    Subscription.name,
+    Subscription.amount,
+    Subscription.currency,
+    Subscription.interval,
+    Subscription.custom_interval_days,
+    Subscription.next_renewal_date,
+    Subscription.website,
+    Subscription.updated_at,
+)
+
+ICS_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//Subscription Radar//Renewals//EN\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "METHOD:PUBLISH\r\n"
+    "X-WR-CALNAME:Subscription renewals\r\n"
+).encode()
+
+ICS_FOOTER = b"END:VCALENDAR\r\n"
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT value per RFC 5545."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets, as RFC 5545 requires."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Don't split inside a multi-byte UTF-8 sequence
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    parts.append(encoded.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def render_event(row) -> str:
+    (sub_id, name, amount, currency, interval, custom_days,
+     renewal, website, updated_at) = row
+
+    rrule = RRULES.get(interval)
+    if rrule is None and custom_days:
+        rrule = f"FREQ=DAILY;INTERVAL={custom_days}"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:subscription-{sub_id}@subscription-radar",
+        f"DTSTAMP:{updated_at:%Y%m%dT%H%M%SZ}",
+        f"DTSTART;VALUE=DATE:{renewal:%Y%m%d}",
+        f"SUMMARY:{escape_text(f'{name} renews ({amount:.2f} {currency})')}",
+        "TRANSP:TRANSPARENT",
+    ]
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    if website:
+        lines.append(f"URL:{escape_text(website)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def render_feed(session: Session, user_id: int, batch_size: int = 500) -> Iterator[bytes]:
+    """Render a user's active subscriptions as iCalendar chunks, batch by batch."""
+    statement = select(*ICS_COLUMNS).where(*active_filter(user_id)).order_by(
+        Subscription.id
+    ).execution_options(yield_per=batch_size)
+
+    yield ICS_HEADER
+    for batch in session.connection().execute(statement).partitions():
+        yield "".join(render_event(row) for row in batch).encode()
+    yield ICS_FOOTER
+
+
+@dataclass(frozen=True)
+class CachedFeed:
+    version: datetime
+    body: bytes
+    # Content coding -> compressed body, filled on first request for each
+    compressed: dict[str, bytes] = field(default_factory=dict, compare=False)
+
+    def encoded(self, encoding: str) -> bytes:
+        """The body compressed with encoding, compressing it only once."""
+        body = self.compressed.get(encoding)
+        if body is None:
+            body = self.compressed[encoding] = compress(self.body, encoding)
+        return body
+
+
+# Rendered feeds per user id, valid while the user's version is unchanged
+feed_cache = LRUCache(maxsize=settings.ICS_CACHE_SIZE)
+
+
+def cached_feed(user_id: int, version: datetime) -> Optional[CachedFeed]:
+    feed = feed_cache.get(user_id)
+    if feed is not None and feed.version == version:
+        return feed
+    return None
+
+
+def render_and_cache(session: Session, user_id: int, version: datetime) -> Iterable[bytes]:
+    """Stream a freshly rendered feed and cache it once fully rendered."""
+    chunks = []
+    for chunk in render_feed(session, user_id):
+        chunks.append(chunk)
+        yield chunk
+    feed_cache.set(user_id, CachedFeed(version, b"".join(chunks)))
@@ -0,0 +1,218 @@
+# app/services/directory.py
+import threading
+from typing import NamedTuple, Optional
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.db import get_engine, get_shard_engine, shard_engines
+from app.models import Budget, BudgetAlert, IdBlock, Subscription, SubscriptionArchive, User, UserDirectory
+
+# Sharding (SHARDS set): every user's rows live on one shard, found through
+# the user_directory table in the DATABASE_URL database. Without SHARDS
+# everything here resolves to the primary and the directory is not used.
+
+
+class DirectoryEntry(NamedTuple):
+    user_id: int
+    shard: str
+    moving: bool
+
+
+# user_id -> DirectoryEntry; entries may be stale for up to the TTL, which
+# the rebalancer allows for when moving users
+_entries = LRUCache(maxsize=100_000)
+
+
+def directory_entry(user_id: int) -> Optional[DirectoryEntry]:
+    """A user's directory entry, cached for SHARD_DIRECTORY_CACHE_SECONDS."""
+    entry = _entries.get(user_id)
+    if entry is None:
+        with get_engine().connect() as connection:
+            row = connection.execute(
+                select(UserDirectory.user_id, UserDirectory.shard, UserDirectory.moving)
+                .where(UserDirectory.user_id == user_id)
+            ).first()
+        if row is None:
+            return None
+        entry = DirectoryEntry(*row)
+        _entries.set(user_id, entry, ttl=settings.SHARD_DIRECTORY_CACHE_SECONDS)
+    return entry
+
+
+def forget_entry(user_id: int) -> None:
+    _entries.pop(user_id)
+
+
+def engine_for_user(user_id: int):
+    """Engine holding a user's rows: their shard's, or the primary when unsharded."""
+    if not settings.SHARDS:
+        return get_engine()
+    entry = directory_entry(user_id)
+    return get_shard_engine(entry.shard) if entry is not None else None
+
+
+def placement(user_id: int) -> str:
+    """Shard for a new user. Existing users stay wherever the directory says."""
+    names = sorted(settings.SHARDS)
+    return names[user_id % len(names)]
+
+
+def find_user_by_email(session: Session, email: str) -> Optional[User]:
+    """
+    Global user lookup by email.
+
+    session is on the primary. With sharding, the email is resolved
+    through the directory and the user is loaded from their shard; the
+    returned User is then detached (fine for reading its fields).
+    """
+    if not settings.SHARDS:
+        return session.exec(select(User).where(User.email == email)).scalars().first()
+
+    user_id = session.exec(
+        select(UserDirectory.user_id).where(UserDirectory.email == email)
+    ).scalars().first()
+    engine = engine_for_user(user_id) if user_id is not None else None
+    if engine is None:
+        return None
+    with Session(engine, expire_on_commit=False) as shard_session:
+        user = shard_session.get(User, user_id)
+        if user is not None:
+            shard_session.expunge(user)
+    return user
+
+
+def create_user(session: Session, user: User) -> User:
+    """
+    Insert a new user.
+
+    With sharding, the directory entry is created first (allocating the
+    id and unique email), then the user row on their shard; a failure on
+    the shard removes the entry again. Raises IntegrityError if the email
+    is taken.
+    """
+    if not settings.SHARDS:
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+    entry = UserDirectory(email=user.email, shard="")
+    session.add(entry)
+    session.flush()
+    entry.shard = placement(entry.user_id)
+    session.commit()
+
+    user.id = entry.user_id
+    try:
+        with Session(get_shard_engine(entry.shard), expire_on_commit=False) as shard_session:
+            shard_session.add(user)
+            shard_session.commit()
+            shard_session.refresh(user)
+            shard_session.expunge(user)
+    except Exception:
+        session.delete(entry)
+        session.commit()
+        raise
+    return user
+
+
+def set_calendar_token(user_id: int, token: Optional[str]) -> None:
+    """Mirror a user's calendar feed token into the directory (sharding only)."""
+    if not settings.SHARDS:
+        return
+    with get_engine().begin() as connection:
+        connection.execute(
+            update(UserDirectory)
+            .where(UserDirectory.user_id == user_id)
+            .values(calendar_token=token)
+        )
+
+
+def calendar_token_engine(session: Session, token: str):
+    """
+    Engine on which to look up a calendar token's owner.
+
+    The request session's (primary) when unsharded; otherwise the owner's
+    shard, found through the directory, or None for an unknown token.
+    """
+    if not settings.SHARDS:
+        return session.get_bind()
+    user_id = session.exec(
+        select(UserDirectory.user_id).where(UserDirectory.calendar_token == token)
+    ).scalars().first()
+    return engine_for_user(user_id) if user_id is not None else None
+
+
+class IdAllocator:
+    """
+    Hands out ids unique across shards, reserving blocks from id_blocks.
+
+    Each worker reserves SHARD_ID_BLOCK_SIZE ids per round trip to the
+    primary. The first reservation starts past the highest id already
+    present on any shard, so existing rows keep their ids.
+    """
+
+    def __init__(self, name: str, models: tuple):
+        self.name = name
+        self.models = models
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve(settings.SHARD_ID_BLOCK_SIZE)
+                self._end = self._next + settings.SHARD_ID_BLOCK_SIZE
+            allocated = self._next
+            self._next += 1
+            return allocated
+
+    def _highest_existing(self) -> int:
+        highest = 0
+        for engine in shard_engines().values():
+            with engine.connect() as connection:
+                for model in self.models:
+                    highest = max(highest, connection.execute(select(func.max(model.id))).scalar() or 0)
+        return highest
+
+    def _reserve(self, size: int) -> int:
+        while True:
+            with get_engine().begin() as connection:
+                start = connection.execute(
+                    select(IdBlock.next_id).where(IdBlock.name == self.name).with_for_update()
+                ).scalar()
+                if start is not None:
+                    connection.execute(
+                        update(IdBlock).where(IdBlock.name == self.name).values(next_id=start + size)
+                    )
+                    return start
+            start = self._highest_existing() + 1
+            try:
+                with get_engine().begin() as connection:
+                    connection.execute(insert(IdBlock).values(name=self.name, next_id=start + size))
+                return start
+            except IntegrityError:
+                continue  # another worker created the row first
+
+
+subscription_ids = IdAllocator("subscriptions", (Subscription, SubscriptionArchive))
+
+
+def new_subscription_id() -> Optional[int]:
+    """Id for a new subscription: globally allocated when sharded, else left to the database."""
+    return subscription_ids.next_id() if settings.SHARDS else None
+
+
+budget_ids = IdAllocator("budgets", (Budget,))
+budget_alert_ids = IdAllocator("budget_alerts", (BudgetAlert,))
+
+
+def new_budget_id() -> Optional[int]:
+    return budget_ids.next_id() if settings.SHARDS else None
+
+
+def new_budget_alert_id() -> Optional[int]:
+    return budget_alert_ids.next_id() if settings.SHARDS else None
@@ -0,0 +1,224 @@
+# app/services/duplicates.py
+import itertools
+import re
+from difflib import SequenceMatcher
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+from sqlmodel import Session, select
+from app.models import Subscription, SubscriptionStatus
+from app.services.fx import convert
+from app.services.subscriptions import monthly_cost
+
+# Duplicate detection: the same service tracked twice under different
+# name/vendor spellings. Each subscription's name and vendor are
+# normalized into keys; only subscriptions sharing a blocking key are
+# compared (not all pairs), matches are scored on key similarity and
+# cost, and matching pairs are merged into groups with union-find.
+
+# Words that don't identify a service
+STOPWORDS = frozenset({
+    "the", "a", "an", "and", "of", "for",
+    "inc", "llc", "ltd", "gmbh", "co", "corp", "company",
+    "com", "net", "org", "io", "www", "app",
+    "subscription", "membership", "plan", "account", "monthly", "yearly", "annual",
+})
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Pairs scoring at least this are duplicates
+MATCH_THRESHOLD = 0.75
+
+# Share of the score from name/vendor similarity; the rest is cost similarity
+TEXT_WEIGHT = 0.8
+
+# Similarity given when one key's words all appear in the other
+# ("netflix" within "netflix premium")
+CONTAINED_SIMILARITY = 0.9
+
+# Blocks larger than this are compared only between neighbours in key
+# order, keeping very common keys from going quadratic
+MAX_BLOCK_SIZE = 50
+NEIGHBOUR_WINDOW = 10
+
+# Length of the key prefix used as a blocking key
+PREFIX_LENGTH = 4
+
+
+class DuplicateRecord(NamedTuple):
+    id: int
+    name: str
+    vendor: Optional[str]
+    amount: float
+    interval: str
+    custom_interval_days: Optional[int]
+    currency: str
+
+
+DUPLICATE_COLUMNS = (
+    Subscription.id,
+    Subscription.name,
+    Subscription.vendor,
+    Subscription.amount,
+    Subscription.interval,
+    Subscription.custom_interval_days,
+    Subscription.currency,
+)
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Matching key for a name or vendor: lowercase ASCII words without
+    punctuation or stopwords ("Netflix, Inc." and "netflix" -> "netflix").
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    words = [word for word in _NON_WORD.split(text) if word and word not in STOPWORDS]
+    return " ".join(words)
+
+
+def key_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two normalized keys between 0 and 1: the closer of
+    their spelling (ignoring spaces) and word containment.
+    """
+    words_a, words_b = set(a.split()), set(b.split())
+    if words_a <= words_b or words_b <= words_a:
+        contained = CONTAINED_SIMILARITY
+    else:
+        contained = 0.0
+    spelling = SequenceMatcher(None, a.replace(" ", ""), b.replace(" ", "")).ratio()
+    return max(spelling, contained)
+
+
+class _Candidate:
+    """A subscription prepared for matching: keys and monthly cost."""
+
+    __slots__ = ("record", "keys", "monthly")
+
+    def __init__(self, record: DuplicateRecord, currency: str, rates: dict[str, float]):
+        self.record = record
+        self.keys = tuple(dict.fromkeys(key for key in (normalize(record.name), normalize(record.vendor)) if key))
+        cost = monthly_cost(record.amount, record.interval, record.custom_interval_days)
+        self.monthly = convert(cost, (record.currency or currency).upper(), currency, rates)
+
+    def blocking_keys(self) -> set[str]:
+        blocks = set()
+        for key in self.keys:
+            blocks.add("w:" + key.split(" ", 1)[0])
+            blocks.add("p:" + key.replace(" ", "")[:PREFIX_LENGTH])
+        return blocks
+
+
+def score(a: _Candidate, b: _Candidate) -> float:
+    """
+    Similarity of two subscriptions between 0 and 1.
+
+    The best similarity between any of their keys (so a name can match
+    the other's vendor), blended with how close their monthly costs are.
+    Costs that can't be compared count as dissimilar.
+    """
+    text = max((key_similarity(x, y) for x in a.keys for y in b.keys), default=0.0)
+    if a.monthly is None or b.monthly is None or max(a.monthly, b.monthly) <= 0:
+        cost = 0.0
+    else:
+        cost = min(a.monthly, b.monthly) / max(a.monthly, b.monthly)
+    return TEXT_WEIGHT * text + (1 - TEXT_WEIGHT) * cost
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def candidate_pairs(candidates: list[_Candidate]) -> Iterable[tuple[int, int]]:
+    """Index pairs sharing a blocking key, each yielded once."""
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for index, candidate in enumerate(candidates):
+        for block in candidate.blocking_keys():
+            blocks[block].append(index)
+
+    seen = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) <= MAX_BLOCK_SIZE:
+            pairs = itertools.combinations(members, 2)
+        else:
+            # Sorted neighbourhood: compare each with the next few in key order
+            members = sorted(members, key=lambda index: candidates[index].keys)
+            pairs = (
+                (members[i], members[j])
+                for i in range(len(members))
+                for j in range(i + 1, min(i + 1 + NEIGHBOUR_WINDOW, len(members)))
+            )
+        for pair in pairs:
+            pair = (min(pair), max(pair))
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+
+def find_duplicates(records: Iterable[DuplicateRecord], currency: str, rates: dict[str, float]) -> list[dict]:
+    """
+    Group one user's subscriptions that look like the same service.
+
+    Returns groups of two or more, most expensive first, with each
+    member's monthly cost and the group's combined monthly cost in
+    currency. `score` is the lowest-scoring match within the group.
+    """
+    candidates = [_Candidate(record, currency, rates) for record in records]
+    groups = UnionFind()
+    weakest: dict[int, float] = {}
+    for i, j in candidate_pairs(candidates):
+        pair_score = score(candidates[i], candidates[j])
+        if pair_score >= MATCH_THRESHOLD:
+            groups.union(i, j)
+            weakest[i] = min(weakest.get(i, 1.0), pair_score)
+            weakest[j] = min(weakest.get(j, 1.0), pair_score)
+
+    members: dict[int, list[int]] = defaultdict(list)
+    for index in weakest:
+        members[groups.find(index)].append(index)
+
+    result = []
+    for indexes in members.values():
+        group = [candidates[index] for index in sorted(indexes)]
+        result.append({
+            "score": round(min(weakest[index] for index in indexes), 3),
+            "combined_monthly_cost": round(sum(member.monthly or 0.0 for member in group), 2),
+            "subscriptions": [
+                {
+                    "id": member.record.id,
+                    "name": member.record.name,
+                    "vendor": member.record.vendor,
+                    "currency": member.record.currency,
+                    "monthly_cost": round(member.monthly, 2) if member.monthly is not None else None,
+                }
+                for member in group
+            ],
+        })
+    result.sort(key=lambda group: group["combined_monthly_cost"], reverse=True)
+    return result
+
+
+def fetch_duplicate_records(session: Session, user_id: int) -> list[DuplicateRecord]:
+    """Load the matching columns of a user's active subscriptions."""
+    statement = select(*DUPLICATE_COLUMNS).where(
+        Subscription.user_id == user_id,
+        Subscription.status == SubscriptionStatus.ACTIVE,
+    )
+    result = session.connection().execute(statement)
+    return list(map(DuplicateRecord._make, result.tuples()))
@@ -0,0 +1,168 @@
+# app/services/fx.py
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.models import FxRate
+
+logger = logging.getLogger(__name__)
+
+
+def read_rates_file(path: Optional[str] = None) -> dict[str, float]:
+    """
+    Read exchange rates from a JSON file.
+
+    Expected format: {"base": "USD", "rates": {"EUR": 0.92, ...}}, where
+    each rate is units of that currency per one unit of the base.
+    """
+    data = json.loads(Path(path or settings.FX_RATES_FILE).read_text())
+    rates = {code.upper(): float(rate) for code, rate in data["rates"].items()}
+    rates.setdefault(data.get("base", "USD").upper(), 1.0)
+    return rates
+
+
+def load_rates_file(session: Session, path: Optional[str] = None) -> int:
+    """
+    Upsert the rates from a JSON file into the fx_rates table.
+
+    Returns the number of currencies written.
+    """
+    rates = read_rates_file(path)
+    now = datetime.utcnow()
+    for code, rate in rates.items():
+        row = session.get(FxRate, code)
+        if row is None:
+            session.add(FxRate(currency=code, rate=rate, updated_at=now))
+        else:
+            row.rate = rate
+            row.updated_at = now
+            session.add(row)
+    session.commit()
+    return len(rates)
+
+
+class FxRateCache:
+    """
+    In-memory copy of the fx_rates table.
+
+    Refreshed by the scheduler every FX_REFRESH_SECONDS, and lazily on
+    first use or when stale. Falls back to the rates file when the table
+    is empty, so conversion works offline and before the table is seeded.
+    The rates dict is replaced wholesale on refresh, never mutated.
+    """
+
+    def __init__(self):
+        self._rates: dict[str, float] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self, session: Session) -> None:
+        rows = session.exec(select(FxRate.currency, FxRate.rate)).all()
+        rates = {code.upper(): rate for code, rate in rows}
+        if not rates:
+            rates = read_rates_file()
+        self._rates = rates
+        self._loaded_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > settings.FX_REFRESH_SECONDS
+        )
+
+    def get_rates(self) -> dict[str, float]:
+        """
+        The current rates, reloaded when stale.
+
+        Always reloaded from the primary (DATABASE_URL): only its fx_rates
+        table is seeded and refreshed, so a shard or replica session could
+        see an empty table and fall back to the rates file.
+        """
+        if self.is_stale():
+            from app.db import get_engine
+
+            engine = get_engine()
+            if engine is None:
+                self._rates = read_rates_file()
+                self._loaded_at = time.monotonic()
+            else:
+                with Session(engine) as session:
+                    self.refresh(session)
+        return self._rates
+
+
+fx_rates = FxRateCache()
+
+
+def refresh_fx_rates() -> None:
+    """Scheduler job: reload the rate cache from the database."""
+    from app.db import engine
+
+    if engine is None:
+        return
+    with Session(engine) as session:
+        fx_rates.refresh(session)
+
+
+def convert(amount: float, from_currency: str, to_currency: str, rates: dict[str, float]) -> Optional[float]:
+    """Convert an amount between currencies, or None if a rate is missing."""
+    if from_currency == to_currency:
+        return amount
+    source = rates.get(from_currency)
+    target = rates.get(to_currency)
+    if not source or not target:
+        return None
+    return amount / source * target
+
+
+def convert_totals(
+    rows: Iterable[tuple[str, float, int]],
+    target_currency: str,
+    rates: dict[str, float]
+) -> tuple[float, int, list[dict]]:
+    """
+    Convert per-currency aggregates into the target currency.
+
+    Takes (currency, total, count) rows as produced by a GROUP BY currency
+    query, so conversion costs one lookup per currency rather than per row.
+    Returns (converted total, count, per-currency breakdown). Currencies
+    without a rate are kept in the breakdown with converted_amount None
+    and left out of the converted total.
+    """
+    total = 0.0
+    count = 0
+    breakdown = []
+    for currency, amount, rows_count in rows:
+        currency = (currency or target_currency).upper()
+        amount = float(amount or 0)
+        rows_count = int(rows_count or 0)
+        converted = convert(amount, currency, target_currency, rates)
+        if converted is None:
+            logger.warning("No FX rate for %s -> %s", currency, target_currency)
+        else:
+            total += converted
+        count += rows_count
+        breakdown.append({
+            "currency": currency,
+            "total_amount": round(amount, 2),
+            "converted_amount": round(converted, 2) if converted is not None else None,
+            "count": rows_count,
+        })
+    return total, count, breakdown
+
+
+def reporting_currency(user, override: Optional[str] = None) -> str:
+    """Currency totals are reported in: explicit override, else the user's setting."""
+    return (override or getattr(user, "reporting_currency", None) or "USD").upper()
+
+
+if __name__ == "__main__":
+    import sys
+    from app.db import engine
+
+    with Session(engine) as session:
+        written = load_rates_file(session, sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"Loaded {written} FX rates")
@@ -0,0 +1,153 @@
+# app/services/health.py
+import logging
+import time
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from sqlalchemy.exc import DBAPIError
+from app.core.config import settings
+from app.core.pool import pool_status
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+# Readiness fails when the last check is older than this many intervals
+# (the checker is stuck, e.g. blocked on an unreachable database)
+STALE_INTERVALS = 3
+
+# A pool this full counts as saturated; the checker then skips its ping
+# rather than queue behind real traffic for a connection
+SATURATION_THRESHOLD = 1.0
+
+
+@lru_cache(maxsize=1)
+def migration_scripts():
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory(str(ALEMBIC_DIR))
+
+
+def migration_state(revisions: list[str]) -> str:
+    """
+    How a database's alembic revisions compare with this code's head.
+
+    current: at head. behind: an older revision, so this code expects
+    schema the database lacks. ahead: a revision this code doesn't know,
+    i.e. migrated for a newer release (normal during a rolling deploy).
+    unversioned: no alembic_version rows (tables made by create_all).
+    """
+    if not revisions:
+        return "unversioned"
+    scripts = migration_scripts()
+    if set(revisions) == set(scripts.get_heads()):
+        return "current"
+    known = {script.revision for script in scripts.walk_revisions()}
+    if any(revision not in known for revision in revisions):
+        return "ahead"
+    return "behind"
+
+
+def check_database(engine, migrations: bool) -> dict:
+    """Ping one database and read its alembic revision, using one pooled connection."""
+    if engine is None:
+        return {"status": "not_configured"}
+    pool = pool_status(engine.pool)
+    result = {"status": "ok", "pool": pool}
+    if pool.get("saturation", 0.0) >= SATURATION_THRESHOLD:
+        # Every connection is in use, so the database is answering someone
+        result["status"] = "saturated"
+        return result
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+            if migrations:
+                try:
+                    revisions = list(connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalars())
+                except DBAPIError:
+                    revisions = []
+                result["migrations"] = {
+                    "revisions": revisions,
+                    "heads": sorted(migration_scripts().get_heads()),
+                    "state": migration_state(revisions),
+                }
+    except Exception as e:
+        message = str(e).strip()
+        result["status"] = "error"
+        result["error"] = message.splitlines()[0][:200] if message else type(e).__name__
+    return result
+
+
+class HealthCache:
+    """
+    Latest database health, refreshed by the scheduler every
+    HEALTH_CHECK_SECONDS. Probes only read it, so load balancers polling
+    /health/ready cost no database connections or queries.
+    """
+
+    def __init__(self):
+        self._databases: dict[str, dict] = {}
+        self._checked_at: Optional[datetime] = None
+        self._checked_monotonic: Optional[float] = None
+
+    def update(self, databases: dict[str, dict]) -> None:
+        self._databases = databases
+        self._checked_at = datetime.utcnow()
+        self._checked_monotonic = time.monotonic()
+
+    def database(self, name: str) -> Optional[dict]:
+        return self._databases.get(name)
+
+    def readiness(self) -> tuple[bool, dict]:
+        """(ready, report) from the cached status."""
+        if self._checked_monotonic is None:
+            return False, {"status": "starting", "checked_at": None, "databases": {}}
+
+        problems = []
+        age = time.monotonic() - self._checked_monotonic
+        if age > STALE_INTERVALS * settings.HEALTH_CHECK_SECONDS:
+            problems.append(f"last check {age:.0f}s ago")
+        for name, database in self._databases.items():
+            if database["status"] in ("error", "not_configured"):
+                problems.append(f"{name}: {database['status']}")
+            if database.get("migrations", {}).get("state") == "behind":
+                problems.append(f"{name}: migrations behind head")
+
+        report = {
+            "status": "not_ready" if problems else "ready",
+            "checked_at": self._checked_at.isoformat() + "Z",
+            "problems": problems,
+            "databases": self._databases,
+        }
+        return not problems, report
+
+
+health = HealthCache()
+
+
+def check_health() -> None:
+    """
+    Scheduler job: check every database and cache the result.
+
+    The primary and shards are pinged and their alembic revision compared
+    with this code's head; a read replica is only pinged (it follows the
+    primary's schema).
+    """
+    from app.db import get_engine, get_read_engine, shard_engines
+
+    primary = get_engine()
+    databases = {"primary": check_database(primary, migrations=True)}
+    replica = get_read_engine()
+    if replica is not primary:
+        databases["replica"] = check_database(replica, migrations=False)
+    if settings.SHARDS:
+        for name, shard_engine in shard_engines().items():
+            if shard_engine is not primary:
+                databases[f"shard:{name}"] = check_database(shard_engine, migrations=True)
+
+    for name, database in databases.items():
+        previous = health.database(name)
+        if database["status"] == "error" and (previous is None or previous["status"] != "error"):
+            logger.warning("Health check: %s unreachable: %s", name, database.get("error"))
+    health.update(databases)
@@ -0,0 +1,165 @@
+# app/services/idempotency.py
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+table = IdempotencyKey.__table__
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+
+
+class IdempotencyConflict(Exception):
+    """The key cannot be used for this request right now."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def request_fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def begin(engine, user_id: int, key: str, fingerprint: str) -> datetime | StoredResponse:
+    """
+    Claim an idempotency key for a request.
+
+    Returns the claim time when the caller owns the key and should process
+    the request (pass it to complete or release), or the stored response
+    of a completed earlier request with the same key. Raises
+    IdempotencyConflict if that request is still in progress or had a
+    different fingerprint.
+
+    A claim left in progress for longer than IDEMPOTENCY_LEASE_SECONDS
+    (its worker was killed or crashed mid-request) is taken over by the
+    next retry of the same request, with a new claim time.
+    """
+    now = datetime.utcnow()
+    try:
+        with engine.begin() as connection:
+            # An expired key may be reused
+            connection.execute(
+                delete(table).where(
+                    table.c.user_id == user_id,
+                    table.c.key == key,
+                    table.c.expires_at < now,
+                )
+            )
+            connection.execute(
+                insert(table).values(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=now,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+                )
+            )
+        return now
+    except IntegrityError:
+        pass
+
+    with engine.begin() as connection:
+        # created_at is the claim time; the conditional update lets only
+        # one retry take over an abandoned claim
+        taken_over = connection.execute(
+            update(table)
+            .where(
+                table.c.user_id == user_id,
+                table.c.key == key,
+                table.c.fingerprint == fingerprint,
+                table.c.status_code.is_(None),
+                table.c.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+            )
+            .values(created_at=now)
+        ).rowcount
+    if taken_over:
+        logger.warning("Took over abandoned Idempotency-Key claim for user %s", user_id)
+        return now
+
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(table.c.fingerprint, table.c.status_code, table.c.content_type, table.c.body)
+            .where(table.c.user_id == user_id, table.c.key == key)
+        ).first()
+
+    if row is None or row.status_code is None:
+        raise IdempotencyConflict(409, "A request with this Idempotency-Key is still in progress")
+    if row.fingerprint != fingerprint:
+        raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request")
+    return StoredResponse(row.status_code, row.content_type, row.body or b"")
+
+
+def _claim(user_id: int, key: str, claimed_at: datetime):
+    """Match the key only while it still holds the claim made at claimed_at."""
+    return (
+        (table.c.user_id == user_id)
+        & (table.c.key == key)
+        & (table.c.created_at == claimed_at)
+        & table.c.status_code.is_(None)
+    )
+
+
+def complete(engine, user_id: int, key: str, claimed_at: datetime, response: StoredResponse) -> None:
+    """
+    Store the response for replay to retries of the request.
+
+    Nothing is stored if a retry took the claim over meanwhile; the retry
+    stores its own response.
+    """
+    with engine.begin() as connection:
+        stored = connection.execute(
+            update(table)
+            .where(_claim(user_id, key, claimed_at))
+            .values(
+                status_code=response.status_code,
+                content_type=response.content_type,
+                body=response.body,
+            )
+        ).rowcount
+    if not stored:
+        logger.warning("Idempotency-Key claim for user %s was taken over; response not stored", user_id)
+
+
+def release(engine, user_id: int, key: str, claimed_at: datetime) -> None:
+    """
+    Forget a key whose request failed, so a retry is processed afresh.
+
+    Only the caller's own claim is deleted, never one a retry took over.
+    """
+    with engine.begin() as connection:
+        connection.execute(
+            delete(table).where(_claim(user_id, key, claimed_at))
+        )
+
+
+def purge_expired_keys() -> None:
+    """Scheduler job: delete idempotency keys past their TTL (on every shard)."""
+    from app.db import shard_engines
+
+    purged = 0
+    for engine in shard_engines().values():
+        if engine is None:
+            continue
+        with engine.begin() as connection:
+            result = connection.execute(
+                delete(table).where(table.c.expires_at < datetime.utcnow())
+            )
+        purged += result.rowcount
+    if purged:
+        logger.info("Purged %s expired idempotency keys", purged)
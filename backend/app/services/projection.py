@@ -0,0 +1,466 @@
+# app/services/projection.py
+#
+# Column-oriented projection engine. Loads a user's active subscriptions
+# once into NumPy arrays and expands recurring charges over a date range
+# without per-subscription or per-day Python loops.
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session, select
+from app.models import Subscription, SubscriptionStatus
+from app.services.fx import convert
+from app.services.subscriptions import MONTHLY_FACTORS, DAYS_PER_MONTH, active_filter
+
+
+# Interval codes used in the snapshot arrays
+WEEKLY, MONTHLY, QUARTERLY, YEARLY, CUSTOM, UNKNOWN = range(6)
+
+INTERVAL_CODES = {"weekly": WEEKLY, "monthly": MONTHLY, "quarterly": QUARTERLY, "yearly": YEARLY}
+
+# Charges per month by code; CUSTOM is derived from custom_interval_days
+FACTOR_TABLE = np.array([
+    MONTHLY_FACTORS["weekly"],
+    MONTHLY_FACTORS["monthly"],
+    MONTHLY_FACTORS["quarterly"],
+    MONTHLY_FACTORS["yearly"],
+    np.nan,
+    0.0,
+])
+
+# Calendar-month steps for month-based codes
+MONTH_STEPS = {MONTHLY: 1, QUARTERLY: 3, YEARLY: 12}
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+@dataclass
+class Snapshot:
+    """A user's active subscriptions as parallel arrays, amounts in one currency."""
+    ids: np.ndarray          # int64
+    amounts: np.ndarray      # float64, converted into currency
+    codes: np.ndarray        # int8 interval codes
+    custom_days: np.ndarray  # float64, nan when unset
+    renewals: np.ndarray     # datetime64[D]
+    currency: str
+    unconverted: list[str]   # currencies without a rate (amounts zeroed)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def monthly_factors(self, codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Charges per month for each column, for these codes or the snapshot's own."""
+        codes = self.codes if codes is None else codes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            custom = DAYS_PER_MONTH / self.custom_days
+        return np.where(codes == CUSTOM, np.nan_to_num(custom), FACTOR_TABLE[codes])
+
+
+def interval_codes(intervals: np.ndarray, custom_days: np.ndarray) -> np.ndarray:
+    """Map interval strings to codes, once per distinct value."""
+    if len(intervals) == 0:
+        return np.zeros(0, dtype=np.int8)
+    unique, inverse = np.unique(intervals, return_inverse=True)
+    lookup = np.array([INTERVAL_CODES.get(value, UNKNOWN) for value in unique], dtype=np.int8)
+    codes = lookup[inverse]
+    codes[(codes == UNKNOWN) & (custom_days > 0)] = CUSTOM
+    return codes
+
+
+def load_snapshot(session: Session, user_id: int, currency: str, rates: dict[str, float]) -> Snapshot:
+    """Load a user's active subscriptions in a single query."""
+    statement = select(
+        Subscription.id,
+        Subscription.amount,
+        Subscription.interval,
+        Subscription.custom_interval_days,
+        Subscription.next_renewal_date,
+        Subscription.currency
+    ).where(*active_filter(user_id)).order_by(Subscription.id)
+    rows = session.connection().execute(statement).all()
+
+    if rows:
+        ids, amounts, intervals, custom_days, renewals, currencies = zip(*rows)
+    else:
+        ids = amounts = intervals = custom_days = renewals = currencies = ()
+
+    custom_days = np.array([days or np.nan for days in custom_days], dtype=np.float64)
+    amounts = np.array(amounts, dtype=np.float64)
+
+    # Convert once per distinct currency
+    unconverted = []
+    if len(currencies):
+        unique, inverse = np.unique(np.array(currencies, dtype=str), return_inverse=True)
+        factors = np.empty(len(unique))
+        for i, code in enumerate(unique):
+            factor = convert(1.0, code.upper(), currency, rates)
+            if factor is None:
+                unconverted.append(code.upper())
+                factor = 0.0
+            factors[i] = factor
+        amounts = amounts * factors[inverse]
+
+    return Snapshot(
+        ids=np.array(ids, dtype=np.int64),
+        amounts=amounts,
+        codes=interval_codes(np.array(intervals, dtype=str), custom_days),
+        custom_days=custom_days,
+        renewals=np.array(renewals, dtype="datetime64[D]"),
+        currency=currency,
+        unconverted=unconverted,
+    )
+
+
+# Charge expansion
+
+def _repeat_ranges(first: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """For each i, emit (i, first[i] + 0..counts[i]-1) as flat arrays."""
+    counts = np.clip(counts, 0, None)
+    index = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    steps = np.arange(counts.sum()) - np.repeat(starts, counts)
+    return index, first[index] + steps
+
+
+def expand_day_steps(
+    renewals: np.ndarray, step_days: np.ndarray, start: np.datetime64, end: np.datetime64
+) -> tuple[np.ndarray, np.ndarray]:
+    """Charge dates renewal + k * step_days within [start, end], k >= 0."""
+    r = renewals.astype(np.int64)
+    s = step_days.astype(np.int64)
+    a = start.astype(np.int64)
+    b = end.astype(np.int64)
+    k0 = np.maximum(0, -((r - a) // s))
+    k1 = (b - r) // s
+    index, k = _repeat_ranges(k0, k1 - k0 + 1)
+    return index, (r[index] + k * s[index]).astype("datetime64[D]")
+
+
+def expand_month_steps(
+    renewals: np.ndarray, step_months: np.ndarray, start: np.datetime64, end: np.datetime64
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Charge dates every step_months calendar months within [start, end].
+
+    The renewal's day of month is kept and clamped to shorter months,
+    so a renewal on the 31st charges on Feb 28/29 and again on Mar 31.
+    """
+    renewal_months = renewals.astype("datetime64[M]")
+    day_of_month = (renewals - renewal_months.astype("datetime64[D]")).astype(np.int64)
+    rm = renewal_months.astype(np.int64)
+    s = step_months.astype(np.int64)
+    sm = start.astype("datetime64[M]").astype(np.int64)
+    em = end.astype("datetime64[M]").astype(np.int64)
+
+    k0 = np.maximum(0, -((rm - sm) // s))
+    k1 = (em - rm) // s
+    index, k = _repeat_ranges(k0, k1 - k0 + 1)
+
+    months = (rm[index] + k * s[index]).astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    month_length = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    dates = month_start + np.minimum(day_of_month[index], month_length - 1)
+
+    keep = (dates >= start) & (dates <= end)
+    return index[keep], dates[keep]
+
+
+def expand_charges(
+    codes: np.ndarray,
+    renewals: np.ndarray,
+    custom_days: np.ndarray,
+    start: date,
+    end: date
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expand every column's recurring charges between start and end (inclusive).
+
+    Returns (column index, charge date) arrays. Work is grouped by
+    interval code, so the cost scales with the number of charges, not
+    with subscriptions times days.
+    """
+    start = np.datetime64(start, "D")
+    end = np.datetime64(end, "D")
+    indexes = []
+    dates = []
+
+    day_steps = np.where(codes == WEEKLY, 7.0, np.where(codes == CUSTOM, custom_days, np.nan))
+    day_columns = np.flatnonzero(~np.isnan(day_steps))
+    if len(day_columns):
+        index, charged = expand_day_steps(
+            renewals[day_columns], day_steps[day_columns], start, end
+        )
+        indexes.append(day_columns[index])
+        dates.append(charged)
+
+    for code, step in MONTH_STEPS.items():
+        columns = np.flatnonzero(codes == code)
+        if len(columns):
+            index, charged = expand_month_steps(
+                renewals[columns], np.full(len(columns), step), start, end
+            )
+            indexes.append(columns[index])
+            dates.append(charged)
+
+    if not indexes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype="datetime64[D]")
+    return np.concatenate(indexes), np.concatenate(dates)
+
+
+def month_labels(start: date, months: int) -> list[str]:
+    """Labels like "Jan 2026" for months consecutive months from start."""
+    labels = []
+    for i in range(months):
+        month_offset = start.month + i
+        year = start.year + (month_offset - 1) // 12
+        month = ((month_offset - 1) % 12) + 1
+        labels.append(f"{MONTH_NAMES[month - 1]} {year}")
+    return labels
+
+
+# Cash-flow calendar
+
+# Postgres expands charges server-side: one generate_series of step numbers
+# per subscription, bounded to the requested range, then aggregated per day
+# and currency. Month steps add k * n months to the original renewal date,
+# so day-of-month clamping matches expand_month_steps. {where} selects the
+# subscriptions: one user's for the calendar, everyone's for admin reports.
+DAILY_CHARGES_TEMPLATE = """
+    WITH subs AS (
+        SELECT
+            amount,
+            currency,
+            next_renewal_date AS renewal,
+            CASE "interval"
+                WHEN 'monthly' THEN 1 WHEN 'quarterly' THEN 3 WHEN 'yearly' THEN 12
+            END AS step_months,
+            CASE
+                WHEN "interval" = 'weekly' THEN 7
+                WHEN "interval" NOT IN ('monthly', 'quarterly', 'yearly')
+                     AND custom_interval_days > 0 THEN custom_interval_days
+            END AS step_days
+        FROM subscriptions
+        WHERE {where}
+    ),
+    bounds AS (
+        SELECT
+            *,
+            CASE WHEN step_months IS NOT NULL THEN
+                (EXTRACT(YEAR FROM CAST(:start AS date)) * 12 + EXTRACT(MONTH FROM CAST(:start AS date))
+                 - EXTRACT(YEAR FROM renewal) * 12 - EXTRACT(MONTH FROM renewal)) / step_months
+            ELSE (CAST(:start AS date) - renewal)::numeric / step_days
+            END AS first_step,
+            CASE WHEN step_months IS NOT NULL THEN
+                (EXTRACT(YEAR FROM CAST(:end AS date)) * 12 + EXTRACT(MONTH FROM CAST(:end AS date))
+                 - EXTRACT(YEAR FROM renewal) * 12 - EXTRACT(MONTH FROM renewal)) / step_months
+            ELSE (CAST(:end AS date) - renewal)::numeric / step_days
+            END AS last_step
+        FROM subs
+        WHERE step_months IS NOT NULL OR step_days IS NOT NULL
+    ),
+    charges AS (
+        SELECT
+            amount,
+            currency,
+            CAST(CASE WHEN step_months IS NOT NULL
+                THEN renewal + k * step_months * INTERVAL '1 month'
+                ELSE renewal + k * step_days * INTERVAL '1 day'
+            END AS date) AS charge_date
+        FROM bounds
+        CROSS JOIN LATERAL generate_series(
+            GREATEST(0, CEIL(first_step))::int, FLOOR(last_step)::int
+        ) AS k
+    )
+    SELECT charge_date, currency, SUM(amount), COUNT(*)
+    FROM charges
+    WHERE charge_date BETWEEN :start AND :end
+    GROUP BY charge_date, currency
+"""
+
+DAILY_CHARGES_SQL = text(DAILY_CHARGES_TEMPLATE.format(where="user_id = :user_id AND status = :status"))
+
+PLATFORM_DAILY_CHARGES_SQL = text(DAILY_CHARGES_TEMPLATE.format(where="status = :status"))
+
+
+def daily_charges(
+    session: Session,
+    user_id: int,
+    start: date,
+    end: date,
+    currency: str,
+    rates: dict[str, float]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expected charges per day between start and end (inclusive).
+
+    Returns (total amount, charge count) arrays with one slot per day,
+    amounts converted into currency. Computed in Postgres with
+    generate_series, or by the vectorized expansion engine elsewhere.
+    """
+    days = (end - start).days + 1
+
+    if session.get_bind().dialect.name == "postgresql":
+        rows = session.connection().execute(DAILY_CHARGES_SQL, {
+            "user_id": user_id,
+            "status": SubscriptionStatus.ACTIVE.name,
+            "start": start,
+            "end": end,
+        }).all()
+        if not rows:
+            return np.zeros(days), np.zeros(days, dtype=np.int64)
+        charge_dates, currencies, amounts, counts = zip(*rows)
+        offsets = (np.array(charge_dates, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+
+        unique, inverse = np.unique(np.array(currencies, dtype=str), return_inverse=True)
+        factors = np.array([convert(1.0, code.upper(), currency, rates) or 0.0 for code in unique])
+        weights = np.array(amounts, dtype=np.float64) * factors[inverse]
+        return (
+            np.bincount(offsets, weights=weights, minlength=days),
+            np.bincount(offsets, weights=np.array(counts, dtype=np.float64), minlength=days).astype(np.int64),
+        )
+
+    snapshot = load_snapshot(session, user_id, currency, rates)
+    index, dates = expand_charges(snapshot.codes, snapshot.renewals, snapshot.custom_days, start, end)
+    offsets = (dates - np.datetime64(start, "D")).astype(np.int64)
+    return (
+        np.bincount(offsets, weights=snapshot.amounts[index], minlength=days),
+        np.bincount(offsets, minlength=days),
+    )
+
+
+def platform_daily_charges(session: Session, start: date, end: date) -> list[tuple]:
+    """
+    Expected charges per day and currency across every user's active
+    subscriptions between start and end (inclusive).
+
+    Returns unconverted (charge date, currency, total amount, charge count)
+    rows, so totals from several databases can be added up before
+    conversion. Same expansion as daily_charges: generate_series on
+    Postgres, the vectorized engine elsewhere.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        rows = session.connection().execute(PLATFORM_DAILY_CHARGES_SQL, {
+            "status": SubscriptionStatus.ACTIVE.name,
+            "start": start,
+            "end": end,
+        }).all()
+        return [tuple(row) for row in rows]
+
+    statement = select(
+        Subscription.amount,
+        Subscription.interval,
+        Subscription.custom_interval_days,
+        Subscription.next_renewal_date,
+        Subscription.currency
+    ).where(Subscription.status == SubscriptionStatus.ACTIVE)
+    rows = session.connection().execute(statement).all()
+    if not rows:
+        return []
+
+    amounts, intervals, custom_days, renewals, currencies = zip(*rows)
+    custom_days = np.array([days or np.nan for days in custom_days], dtype=np.float64)
+    codes = interval_codes(np.array(intervals, dtype=str), custom_days)
+    index, dates = expand_charges(codes, np.array(renewals, dtype="datetime64[D]"), custom_days, start, end)
+    if not len(index):
+        return []
+
+    # One bincount slot per (day, currency)
+    unique, inverse = np.unique(np.array(currencies, dtype=str), return_inverse=True)
+    offsets = (dates - np.datetime64(start, "D")).astype(np.int64)
+    slots = offsets * len(unique) + inverse[index]
+    size = ((end - start).days + 1) * len(unique)
+    totals = np.bincount(slots, weights=np.array(amounts, dtype=np.float64)[index], minlength=size)
+    counts = np.bincount(slots, minlength=size)
+    return [
+        (start + timedelta(days=int(slot // len(unique))), str(unique[slot % len(unique)]),
+         float(totals[slot]), int(counts[slot]))
+        for slot in np.flatnonzero(counts)
+    ]
+
+
+# Scenarios
+
+@dataclass
+class ScenarioMatrices:
+    """Per-scenario overrides of the snapshot, one row per scenario."""
+    amounts: np.ndarray    # (S, N) float64
+    codes: np.ndarray      # (S, N) int8
+    cancelled: np.ndarray  # (S, N) bool
+
+
+def build_scenario_matrices(
+    snapshot: Snapshot,
+    cancellations: list[list[int]],
+    amount_changes: list[dict[int, float]],
+    interval_changes: list[dict[int, str]]
+) -> ScenarioMatrices:
+    """
+    Stack scenario edits into (S, N) matrices.
+
+    Row 0 is the unmodified baseline. Raises KeyError listing any
+    subscription ids that are not among the snapshot's active ones.
+    """
+    count = len(cancellations) + 1
+    amounts = np.repeat(snapshot.amounts[None, :], count, axis=0)
+    codes = np.repeat(snapshot.codes[None, :], count, axis=0)
+    cancelled = np.zeros((count, len(snapshot)), dtype=bool)
+
+    # The snapshot is ordered by id, so columns come from searchsorted
+    def columns(ids) -> np.ndarray:
+        ids = np.fromiter(ids, dtype=np.int64)
+        cols = np.searchsorted(snapshot.ids, ids)
+        found = cols < len(snapshot)
+        found[found] = snapshot.ids[cols[found]] == ids[found]
+        if not found.all():
+            raise KeyError(sorted(set(ids[~found].tolist())))
+        return cols
+
+    for row, (cancel, new_amounts, new_intervals) in enumerate(
+        zip(cancellations, amount_changes, interval_changes), start=1
+    ):
+        if cancel:
+            cancelled[row, columns(cancel)] = True
+        if new_amounts:
+            amounts[row, columns(new_amounts.keys())] = list(new_amounts.values())
+        if new_intervals:
+            codes[row, columns(new_intervals.keys())] = [
+                INTERVAL_CODES[value] for value in new_intervals.values()
+            ]
+
+    return ScenarioMatrices(amounts=amounts, codes=codes, cancelled=cancelled)
+
+
+def evaluate_scenarios(
+    snapshot: Snapshot, matrices: ScenarioMatrices, today: date, months: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate every scenario row in one pass.
+
+    Returns (monthly cost per row, charges per row per calendar month).
+    The monthly cost is normalized; the timeline holds the charges that
+    actually fall in each month from today over the horizon.
+    """
+    live_amounts = np.where(matrices.cancelled, 0.0, matrices.amounts)
+    monthly = (live_amounts * snapshot.monthly_factors(matrices.codes)).sum(axis=1)
+
+    first_month = np.datetime64(today, "M")
+    end = (first_month + months).astype("datetime64[D]") - 1
+    timeline = np.zeros((matrices.amounts.shape[0], months))
+
+    # One charge-count matrix per interval code present in any scenario,
+    # then one (S, N) @ (N, M) product per code
+    for code in np.unique(matrices.codes):
+        if code == UNKNOWN:
+            continue
+        code_columns = np.full(len(snapshot), code, dtype=np.int8)
+        index, dates = expand_charges(
+            code_columns, snapshot.renewals, snapshot.custom_days, today, end.item()
+        )
+        buckets = (dates.astype("datetime64[M]") - first_month).astype(np.int64)
+        charges = np.zeros((len(snapshot), months))
+        np.add.at(charges, (index, buckets), 1.0)
+        timeline += np.where(matrices.codes == code, live_amounts, 0.0) @ charges
+
+    return monthly, timeline
@@ -0,0 +1,145 @@
+# app/services/rebalance.py
+import logging
+import time
+from sqlalchemy import delete, func, insert, select, text, update
+from app.core.config import settings
+from app.db import get_engine, get_shard_engine
+from app.models import (
+    Budget,
+    BudgetAlert,
+    DailySnapshot,
+    IdempotencyKey,
+    Subscription,
+    SubscriptionArchive,
+    TokenRevocation,
+    User,
+    UserDirectory,
+)
+from app.services.directory import directory_entry, forget_entry
+
+logger = logging.getLogger(__name__)
+
+# Tables holding a user's rows, parents before children
+USER_TABLES = (
+    (User.__table__, User.__table__.c.id),
+    (Subscription.__table__, Subscription.__table__.c.user_id),
+    (SubscriptionArchive.__table__, SubscriptionArchive.__table__.c.user_id),
+    (DailySnapshot.__table__, DailySnapshot.__table__.c.user_id),
+    (Budget.__table__, Budget.__table__.c.user_id),
+    (BudgetAlert.__table__, BudgetAlert.__table__.c.user_id),
+    (IdempotencyKey.__table__, IdempotencyKey.__table__.c.user_id),
+    (TokenRevocation.__table__, TokenRevocation.__table__.c.user_id),
+)
+
+
+def _set_directory(user_id: int, **values) -> None:
+    with get_engine().begin() as connection:
+        connection.execute(
+            update(UserDirectory).where(UserDirectory.user_id == user_id).values(**values)
+        )
+    forget_entry(user_id)
+
+
+def _wait_out_cache(wait: bool) -> None:
+    # Other workers may hold the old directory entry until it expires
+    if wait:
+        time.sleep(settings.SHARD_DIRECTORY_CACHE_SECONDS)
+
+
+def move_user(user_id: int, target: str, wait: bool = True) -> int:
+    """
+    Move one user's rows to another shard. Returns the number of rows copied.
+
+    1. Mark the user as moving; once every worker's cached directory entry
+       has expired, their writes are refused (503 with Retry-After) while
+       reads keep working.
+    2. Copy their rows to the target shard in one transaction.
+    3. Point the directory at the target and clear the moving flag.
+    4. After another cache period, delete the rows from the old shard.
+
+    A failure before step 3 clears the moving flag and leaves the user on
+    their old shard (the target transaction is rolled back).
+    """
+    entry = directory_entry(user_id)
+    if entry is None:
+        raise ValueError(f"User {user_id} is not in the directory")
+    if target not in settings.SHARDS:
+        raise ValueError(f"Unknown shard {target!r}")
+    if entry.shard == target:
+        return 0
+
+    source_engine = get_shard_engine(entry.shard)
+    target_engine = get_shard_engine(target)
+
+    _set_directory(user_id, moving=True)
+    try:
+        _wait_out_cache(wait)
+        copied = 0
+        with source_engine.connect() as source, target_engine.begin() as destination:
+            for table, owner in USER_TABLES:
+                rows = source.execute(select(table).where(owner == user_id)).mappings().all()
+                if rows:
+                    destination.execute(insert(table), [dict(row) for row in rows])
+                    copied += len(rows)
+        _set_directory(user_id, shard=target, moving=False)
+    except BaseException:
+        _set_directory(user_id, moving=False)
+        raise
+
+    _wait_out_cache(wait)
+    with source_engine.begin() as source:
+        for table, owner in reversed(USER_TABLES):
+            source.execute(delete(table).where(owner == user_id))
+
+    logger.info("Moved user %s from shard %s to %s (%s rows)", user_id, entry.shard, target, copied)
+    return copied
+
+
+def backfill_directory(shard: str) -> int:
+    """
+    Add directory entries for users already stored on a shard (e.g. the
+    original database when sharding is first turned on). Returns how many
+    were added; users already in the directory are skipped.
+    """
+    with get_shard_engine(shard).connect() as connection:
+        users = connection.execute(
+            select(User.id, User.email, User.calendar_token)
+        ).all()
+
+    primary = get_engine()
+    with primary.begin() as connection:
+        known = set(connection.execute(select(UserDirectory.user_id)).scalars())
+        rows = [
+            {"user_id": user_id, "email": email, "shard": shard, "calendar_token": token, "moving": False}
+            for user_id, email, token in users
+            if user_id not in known
+        ]
+        if rows:
+            connection.execute(insert(UserDirectory), rows)
+        if primary.dialect.name == "postgresql":
+            # Ids were inserted explicitly; move the sequence past them
+            highest = connection.execute(select(func.max(UserDirectory.user_id))).scalar()
+            if highest:
+                connection.execute(
+                    text("SELECT setval(pg_get_serial_sequence('user_directory', 'user_id'), :highest)"),
+                    {"highest": highest},
+                )
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import sys
+
+    usage = "usage: python -m app.services.rebalance move <user_id> <shard> | backfill <shard>"
+    if len(sys.argv) < 2 or not settings.SHARDS:
+        sys.exit(usage if settings.SHARDS else "SHARDS is not configured")
+
+    command = sys.argv[1]
+    if command == "move" and len(sys.argv) == 4:
+        copied = move_user(int(sys.argv[2]), sys.argv[3])
+        print(f"Moved user {sys.argv[2]} to {sys.argv[3]} ({copied} rows)")
+    elif command == "backfill" and len(sys.argv) == 3:
+        added = backfill_directory(sys.argv[2])
+        print(f"Added {added} directory entries for shard {sys.argv[2]}")
+    else:
+        sys.exit(usage)
@@ -0,0 +1,298 @@
+# app/services/reports.py
+import itertools
+import logging
+from datetime import date
+from typing import Iterator, Optional
+import orjson
+from fastapi import Request
+from sqlalchemy import func, select
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.singleflight import flight
+from app.db import get_read_engine, open_session, shard_engines
+from app.models import Subscription, SubscriptionStatus
+from app.services.duplicates import DUPLICATE_COLUMNS, DuplicateRecord, find_duplicates
+from app.services.fx import convert_totals, fx_rates
+from app.services.projection import platform_daily_charges
+from app.services.subscriptions import monthly_cost_expr
+
+logger = logging.getLogger(__name__)
+
+# Platform-wide reports for admins. Each report is one aggregate query per
+# database (every shard, or the read replica when unsharded) whose rows are
+# merged here; results are cached for ADMIN_REPORT_CACHE_SECONDS, and
+# concurrent misses for the same report share one computation.
+
+report_cache = LRUCache(maxsize=64)
+
+# Streamed breakdowns larger than this are served but not cached
+MAX_CACHED_STREAM_BYTES = 8 * 1024 * 1024
+
+# Rows fetched per round trip by the server-side cursor
+STREAM_BATCH_SIZE = 1000
+
+ACTIVE = Subscription.status == SubscriptionStatus.ACTIVE
+
+# Currency of the duplicates report precomputed by scan_duplicates
+DUPLICATE_REPORT_CURRENCY = "USD"
+
+
+def report_engines() -> dict:
+    """Databases a platform report reads: every shard, or the read replica."""
+    if settings.SHARDS:
+        return shard_engines()
+    return {"default": get_read_engine()}
+
+
+def cached_report(key: tuple, compute, ttl: Optional[float] = None):
+    """The cached result for key, computed once on a miss."""
+    result = report_cache.get(key)
+    if result is None:
+        def fill():
+            # A request that waited on the leader finds its result here
+            value = report_cache.get(key)
+            if value is None:
+                value = compute()
+                report_cache.set(key, value, ttl=ttl or settings.ADMIN_REPORT_CACHE_SECONDS)
+            return value
+        result = flight.do(("admin.reports",) + key, fill)
+    return result
+
+
+def _aggregate(statement, groups: int, request: Optional[Request]) -> dict[tuple, list]:
+    """
+    Run an aggregate statement on every report database and merge the results.
+
+    The statement selects `groups` group-by columns followed by additive
+    totals (counts, sums); totals for the same group on different shards
+    are added up. Returns {group tuple: [totals]}.
+    """
+    return _merge((
+        session.connection().execute(statement).all()
+        for session in _report_sessions(request)
+    ), groups)
+
+
+def _report_sessions(request: Optional[Request]) -> Iterator:
+    """A session on each report database in turn, closed before the next opens."""
+    for engine in report_engines().values():
+        with open_session(engine, request) as session:
+            yield session
+
+
+def _merge(results, groups: int) -> dict[tuple, list]:
+    """Add up per-database (groups..., totals...) rows into {group tuple: [totals]}."""
+    merged: dict[tuple, list] = {}
+    for rows in results:
+        for row in rows:
+            key, totals = tuple(row[:groups]), row[groups:]
+            current = merged.setdefault(key, [0] * len(totals))
+            for i, value in enumerate(totals):
+                current[i] += value or 0
+    return merged
+
+
+def _rollup(rows: list[tuple], currency: str, rates: dict[str, float], label: str) -> list[dict]:
+    """Convert (group, currency, total, count) rows into per-group entries."""
+    grouped: dict = {}
+    for group, row_currency, total, count in rows:
+        current = grouped.setdefault(group, {}).setdefault(row_currency, [0.0, 0])
+        current[0] += total
+        current[1] += count
+    entries = []
+    for group, totals in grouped.items():
+        total, count, breakdown = convert_totals(
+            ((row_currency, total, count) for row_currency, (total, count) in totals.items()),
+            currency, rates
+        )
+        entries.append({
+            label: group,
+            "total_amount": round(total, 2),
+            "count": count,
+            "by_currency": breakdown,
+        })
+    entries.sort(key=lambda entry: entry["total_amount"], reverse=True)
+    return entries
+
+
+def subscription_report(currency: str, request: Optional[Request] = None) -> dict:
+    """
+    Active subscriptions across all users, as normalized monthly cost.
+
+    One GROUP BY (category, interval, currency) scan per database; the
+    category, interval and currency breakdowns are rolled up from it.
+    """
+    statement = select(
+        Subscription.category,
+        Subscription.interval,
+        Subscription.currency,
+        func.sum(monthly_cost_expr()),
+        func.count(Subscription.id),
+    ).where(ACTIVE).group_by(
+        Subscription.category, Subscription.interval, Subscription.currency
+    )
+    merged = _aggregate(statement, 3, request)
+    rates = fx_rates.get_rates()
+
+    by_category = [(category or "Other", cur, total, count) for (category, _, cur), (total, count) in merged.items()]
+    by_interval = [(interval, cur, total, count) for (_, interval, cur), (total, count) in merged.items()]
+    overall = _rollup([(None, cur, total, count) for (_, _, cur), (total, count) in merged.items()], currency, rates, "all")
+    overall = overall[0] if overall else {"total_amount": 0.0, "count": 0, "by_currency": []}
+
+    return {
+        "currency": currency,
+        "total_monthly_cost": overall["total_amount"],
+        "active_subscriptions": overall["count"],
+        "by_currency": overall["by_currency"],
+        "by_category": _rollup(by_category, currency, rates, "category"),
+        "by_interval": _rollup(by_interval, currency, rates, "interval"),
+    }
+
+
+def renewal_report(start: date, end: date, currency: str, request: Optional[Request] = None) -> dict:
+    """
+    Renewal volume per day: every charge active subscriptions make between
+    start and end, recurrences included (a weekly subscription counts once
+    a week), with the amounts charged.
+
+    Charges are expanded per database the same way as the user calendar
+    (projection.platform_daily_charges) and the per-day totals merged.
+    """
+    merged = _merge((
+        platform_daily_charges(session, start, end)
+        for session in _report_sessions(request)
+    ), 2)
+    rates = fx_rates.get_rates()
+
+    rows = [(day, cur, total, count) for (day, cur), (total, count) in merged.items()]
+    days = sorted(_rollup(rows, currency, rates, "date"), key=lambda entry: entry["date"])
+    return {
+        "currency": currency,
+        "start": start,
+        "end": end,
+        "total_amount": round(sum(day["total_amount"] for day in days), 2),
+        "count": sum(day["count"] for day in days),
+        "days": days,
+    }
+
+
+BREAKDOWN_KEYS = ("user_id", "category", "currency", "count", "monthly_total")
+
+
+def stream_user_breakdown(request: Optional[Request] = None) -> Iterator[bytes]:
+    """
+    Per-user active subscription totals by category and currency, as a
+    JSON array, one database after another.
+
+    Rows come through a server-side cursor (yield_per) and are encoded a
+    batch at a time, so the full breakdown is never held in memory. The
+    body is cached once complete if it is under MAX_CACHED_STREAM_BYTES.
+    """
+    statement = select(
+        Subscription.user_id,
+        Subscription.category,
+        Subscription.currency,
+        func.count(Subscription.id),
+        func.sum(monthly_cost_expr()),
+    ).where(ACTIVE).group_by(
+        Subscription.user_id, Subscription.category, Subscription.currency
+    ).order_by(
+        Subscription.user_id, Subscription.category, Subscription.currency
+    ).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    chunks: Optional[list[bytes]] = []
+    size = 0
+
+    def emit(chunk: bytes) -> bytes:
+        nonlocal chunks, size
+        if chunks is not None:
+            size += len(chunk)
+            if size > MAX_CACHED_STREAM_BYTES:
+                chunks = None
+            else:
+                chunks.append(chunk)
+        return chunk
+
+    yield emit(b"[")
+    first = True
+    for engine in report_engines().values():
+        with open_session(engine, request) as session:
+            for batch in session.connection().execute(statement).partitions():
+                encoded = orjson.dumps([
+                    dict(zip(BREAKDOWN_KEYS, (*row[:4], round(row[4] or 0, 2)))) for row in batch
+                ])[1:-1]
+                if encoded:
+                    yield emit(encoded if first else b"," + encoded)
+                    first = False
+    yield emit(b"]")
+
+    if chunks is not None:
+        report_cache.set(("breakdown",), b"".join(chunks), ttl=settings.ADMIN_REPORT_CACHE_SECONDS)
+
+
+# Users listed in the duplicates report, by redundant spend
+TOP_DUPLICATE_USERS = 20
+
+
+def duplicate_report(currency: str, request: Optional[Request] = None) -> dict:
+    """
+    Duplicate detection over every user's active subscriptions.
+
+    Subscriptions are streamed in user order through a server-side
+    cursor and matched one user at a time (blocking keeps each user's
+    matching subquadratic). Redundant spend is a group's combined monthly
+    cost less its most expensive member.
+    """
+    statement = select(Subscription.user_id, *DUPLICATE_COLUMNS).where(ACTIVE).order_by(
+        Subscription.user_id
+    ).execution_options(yield_per=STREAM_BATCH_SIZE)
+    rates = fx_rates.get_rates()
+
+    users = users_with_duplicates = groups = duplicates = 0
+    redundant_total = 0.0
+    top: list[dict] = []
+    for engine in report_engines().values():
+        with open_session(engine, request) as session:
+            rows = session.connection().execute(statement)
+            for user_id, user_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                users += 1
+                found = find_duplicates(
+                    (DuplicateRecord._make(row[1:]) for row in user_rows), currency, rates
+                )
+                if not found:
+                    continue
+                redundant = sum(
+                    group["combined_monthly_cost"]
+                    - max(member["monthly_cost"] or 0.0 for member in group["subscriptions"])
+                    for group in found
+                )
+                users_with_duplicates += 1
+                groups += len(found)
+                duplicates += sum(len(group["subscriptions"]) for group in found)
+                redundant_total += redundant
+                top.append({"user_id": user_id, "groups": len(found), "redundant_monthly_cost": round(redundant, 2)})
+                if len(top) > 2 * TOP_DUPLICATE_USERS:
+                    top = sorted(top, key=lambda entry: entry["redundant_monthly_cost"], reverse=True)[:TOP_DUPLICATE_USERS]
+
+    return {
+        "currency": currency,
+        "users_scanned": users,
+        "users_with_duplicates": users_with_duplicates,
+        "groups": groups,
+        "subscriptions_in_groups": duplicates,
+        "redundant_monthly_cost": round(redundant_total, 2),
+        "top_users": sorted(top, key=lambda entry: entry["redundant_monthly_cost"], reverse=True)[:TOP_DUPLICATE_USERS],
+    }
+
+
+def scan_duplicates() -> None:
+    """
+    Scheduler job: run the platform-wide duplicates report (in the
+    default currency) and keep it cached until the next run.
+    """
+    report = duplicate_report(DUPLICATE_REPORT_CURRENCY)
+    report_cache.set(("duplicates", DUPLICATE_REPORT_CURRENCY), report, ttl=settings.DUPLICATE_SCAN_SECONDS)
+    logger.info(
+        "Duplicate scan: %s of %s users have %s duplicate groups",
+        report["users_with_duplicates"], report["users_scanned"], report["groups"]
+    )
@@ -0,0 +1,67 @@
+# app/services/scheduler.py
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], None]
+    interval_seconds: float
+    run_at_start: bool = True
+
+
+class Scheduler:
+    """
+    Minimal in-process periodic job runner.
+
+    Jobs are plain sync functions run in a worker thread so they never
+    block the event loop. Started and stopped from the app lifespan; each
+    worker process runs its own copy, so jobs must be safe to run
+    concurrently across workers.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval_seconds: float,
+        run_at_start: bool = True
+    ) -> None:
+        self._jobs[name] = Job(name, func, interval_seconds, run_at_start)
+
+    @property
+    def jobs(self) -> list[Job]:
+        return list(self._jobs.values())
+
+    async def _run(self, job: Job) -> None:
+        if not job.run_at_start:
+            await asyncio.sleep(job.interval_seconds)
+        while True:
+            try:
+                await asyncio.to_thread(job.func)
+            except Exception:
+                logger.exception("Scheduled job %s failed", job.name)
+            await asyncio.sleep(job.interval_seconds)
+
+    def start(self) -> None:
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._run(job), name=f"job:{job.name}"))
+
+    async def stop(self, timeout: Optional[float] = 5.0) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        self._tasks.clear()
+
+
+scheduler = Scheduler()
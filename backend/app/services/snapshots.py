@@ -0,0 +1,143 @@
+# app/services/snapshots.py
+import logging
+from datetime import date, datetime, timedelta
+from typing import Literal
+from sqlalchemy import Date, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from app.models import DailySnapshot, Subscription, SubscriptionStatus
+from app.services.fx import convert_totals
+from app.services.subscriptions import monthly_cost_expr
+
+logger = logging.getLogger(__name__)
+
+snapshots = DailySnapshot.__table__
+
+SNAPSHOT_COLUMNS = ("user_id", "snapshot_date", "category", "currency", "monthly_total", "count")
+
+Resolution = Literal["day", "week", "month"]
+
+
+def take_snapshot(engine, snapshot_date: date) -> int:
+    """
+    Write every user's snapshot rows for snapshot_date.
+
+    A single INSERT ... SELECT aggregates the active subscriptions per
+    user, category and currency inside the database. Does nothing if the
+    date already has rows. Returns the number of rows written.
+    """
+    with engine.begin() as connection:
+        taken = connection.execute(
+            select(snapshots.c.user_id)
+            .where(snapshots.c.snapshot_date == snapshot_date)
+            .limit(1)
+        ).first()
+        if taken is not None:
+            return 0
+        result = connection.execute(
+            insert(snapshots).from_select(
+                SNAPSHOT_COLUMNS,
+                select(
+                    Subscription.user_id,
+                    literal(snapshot_date, Date),
+                    Subscription.category,
+                    Subscription.currency,
+                    func.sum(monthly_cost_expr()),
+                    func.count(Subscription.id),
+                )
+                .where(Subscription.status == SubscriptionStatus.ACTIVE)
+                .group_by(Subscription.user_id, Subscription.category, Subscription.currency)
+            )
+        )
+    return result.rowcount
+
+
+def snapshot_daily_spend() -> None:
+    """
+    Scheduler job: snapshot today's (UTC) spend on every shard.
+
+    Runs every SNAPSHOT_CHECK_SECONDS but writes once per day; when
+    several workers race, the primary key keeps only the first one's rows.
+    """
+    from app.db import shard_engines
+
+    today = datetime.utcnow().date()
+    written = 0
+    for engine in shard_engines().values():
+        if engine is None:
+            continue
+        try:
+            written += take_snapshot(engine, today)
+        except IntegrityError:
+            pass  # another worker took this shard's snapshot first
+    if written:
+        logger.info("Wrote %s spend snapshot rows for %s", written, today)
+
+
+def fetch_snapshot_rows(session: Session, user_id: int, start: date, end: date) -> list[tuple]:
+    """A user's snapshot rows between start and end, oldest first."""
+    statement = select(
+        DailySnapshot.snapshot_date,
+        DailySnapshot.category,
+        DailySnapshot.currency,
+        DailySnapshot.monthly_total,
+        DailySnapshot.count,
+    ).where(
+        DailySnapshot.user_id == user_id,
+        DailySnapshot.snapshot_date >= start,
+        DailySnapshot.snapshot_date <= end,
+    ).order_by(DailySnapshot.snapshot_date)
+    return session.connection().execute(statement).all()
+
+
+def period_start(day: date, resolution: Resolution) -> date:
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def spend_trends(
+    rows: list[tuple],
+    resolution: Resolution,
+    currency: str,
+    rates: dict[str, float]
+) -> list[dict]:
+    """
+    Turn snapshot rows into trend points converted into currency.
+
+    With week or month resolution each period is represented by its
+    latest snapshot (spend is a level, so the period's closing value).
+    """
+    by_day: dict[date, list] = {}
+    for row in rows:
+        by_day.setdefault(row.snapshot_date, []).append(row)
+
+    # Rows are oldest first, so later days overwrite earlier ones
+    latest: dict[date, date] = {}
+    for day in by_day:
+        latest[period_start(day, resolution)] = day
+
+    points = []
+    for period, day in latest.items():
+        per_category: dict[str, list] = {}
+        for _, category, row_currency, total, count in by_day[day]:
+            per_category.setdefault(category, []).append((row_currency, total, count))
+
+        categories = []
+        point_total = 0.0
+        for category, totals in per_category.items():
+            total, count, _ = convert_totals(totals, currency, rates)
+            point_total += total
+            categories.append({"category": category, "total_amount": round(total, 2), "count": count})
+        categories.sort(key=lambda entry: entry["total_amount"], reverse=True)
+
+        points.append({
+            "date": period,
+            "snapshot_date": day,
+            "total_monthly_cost": round(point_total, 2),
+            "count": sum(entry["count"] for entry in categories),
+            "by_category": categories,
+        })
+    return points
@@ -0,0 +1,210 @@
+# app/services/subscriptions.py
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import case
+from sqlmodel import Session, select, func, update
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models import Subscription, SubscriptionStatus, User
+from app.serialization import SUBSCRIPTION_ENCODER, RowEncoder
+from app.services.fx import convert_totals
+
+
+# Billing periods per month for each fixed interval
+MONTHLY_FACTORS = {
+    "weekly": 52 / 12,
+    "monthly": 1.0,
+    "quarterly": 4 / 12,
+    "yearly": 1 / 12,
+}
+
+DAYS_PER_MONTH = 365.25 / 12
+
+# Users who wrote in this process within READ_YOUR_WRITES_SECONDS; covers
+# stateless-auth users, whose version stamps are not loaded per request
+recent_writers = LRUCache(maxsize=10_000)
+
+
+def monthly_factor(interval: str, custom_interval_days: Optional[int] = None) -> float:
+    """
+    Number of charges per month for a billing interval.
+
+    Custom intervals are spread over their length in days; unknown
+    intervals without a day count contribute nothing.
+    """
+    factor = MONTHLY_FACTORS.get(interval)
+    if factor is not None:
+        return factor
+    if custom_interval_days:
+        return DAYS_PER_MONTH / custom_interval_days
+    return 0.0
+
+
+def monthly_cost(amount: float, interval: str, custom_interval_days: Optional[int] = None) -> float:
+    """Normalize a subscription amount to its monthly cost."""
+    return amount * monthly_factor(interval, custom_interval_days)
+
+
+def next_subscriptions_version(previous: Optional[datetime], now: datetime) -> datetime:
+    """
+    The version stamp for a write at now: now, or the second after
+    previous if that is later. Each version then falls in a later whole
+    second than the one before, so the feed's one-second Last-Modified
+    changes on every write.
+    """
+    if previous is None:
+        return now
+    return max(now, previous.replace(microsecond=0) + timedelta(seconds=1))
+
+
+def mark_subscriptions_changed(session: Session, user_id: int) -> None:
+    """
+    Bump the user's subscriptions version.
+
+    Call in the same transaction as any subscription write; per-user
+    cached output (such as the iCalendar feed) is keyed on this value.
+    The user row is locked so concurrent writes bump it in turn.
+    """
+    recent_writers.set(user_id, True, ttl=settings.READ_YOUR_WRITES_SECONDS)
+    previous = session.execute(
+        select(User.subscriptions_changed_at).where(User.id == user_id).with_for_update()
+    ).scalar()
+    session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(subscriptions_changed_at=next_subscriptions_version(previous, datetime.utcnow()))
+    )
+
+
+def monthly_cost_expr():
+    """SQL expression for a subscription's normalized monthly cost."""
+    return Subscription.amount * case(
+        *((Subscription.interval == interval, factor) for interval, factor in MONTHLY_FACTORS.items()),
+        (Subscription.custom_interval_days > 0, DAYS_PER_MONTH / Subscription.custom_interval_days),
+        else_=0.0
+    )
+
+
+# Read records
+#
+# Read paths select only the columns they need into these compact tuples.
+# Statements run on the session's connection, so no Subscription entities
+# are built and nothing is added to the identity map.
+
+class BillingRecord(NamedTuple):
+    amount: float
+    interval: str
+    category: str
+    custom_interval_days: Optional[int]
+
+    @property
+    def monthly_cost(self) -> float:
+        return monthly_cost(self.amount, self.interval, self.custom_interval_days)
+
+
+BILLING_COLUMNS = (
+    Subscription.amount,
+    Subscription.interval,
+    Subscription.category,
+    Subscription.custom_interval_days,
+)
+
+
+def active_filter(user_id: int) -> tuple:
+    """WHERE clauses for a user's active subscriptions."""
+    return (
+        Subscription.user_id == user_id,
+        Subscription.status == SubscriptionStatus.ACTIVE,
+    )
+
+
+def fetch_billing_records(session: Session, user_id: int) -> list[BillingRecord]:
+    """Load the billing columns of a user's active subscriptions."""
+    statement = select(*BILLING_COLUMNS).where(*active_filter(user_id))
+    result = session.connection().execute(statement)
+    return list(map(BillingRecord._make, result.tuples()))
+
+
+def fetch_upcoming_rows(
+    session: Session,
+    user_id: int,
+    start: date,
+    end: date,
+    encoder: RowEncoder = SUBSCRIPTION_ENCODER
+) -> list[tuple]:
+    """
+    Load response rows for active subscriptions renewing between start and end.
+
+    Rows follow the encoder's column order, followed by the renewal date
+    as renews_on (which the encoder ignores).
+    """
+    statement = select(
+        *encoder.columns, Subscription.next_renewal_date.label("renews_on")
+    ).where(
+        *active_filter(user_id),
+        Subscription.next_renewal_date >= start,
+        Subscription.next_renewal_date <= end
+    ).order_by(Subscription.next_renewal_date)
+    return session.connection().execute(statement).all()
+
+
+def total_monthly_cost(records: list[BillingRecord]) -> float:
+    return sum(record.monthly_cost for record in records)
+
+
+def fetch_currency_totals(session: Session, user_id: int, value, *group_by) -> list[tuple]:
+    """
+    Aggregate a user's active subscriptions per currency.
+
+    Returns rows of (*group_by, currency, SUM(value), COUNT(*)), letting
+    callers convert each currency group once instead of each row.
+    """
+    statement = select(
+        *group_by,
+        Subscription.currency,
+        func.sum(value),
+        func.count(Subscription.id)
+    ).where(*active_filter(user_id)).group_by(*group_by, Subscription.currency)
+    return session.connection().execute(statement).all()
+
+
+def monthly_spend(session: Session, user_id: int, currency: str, rates: dict[str, float]) -> tuple[float, int, list[dict]]:
+    """
+    Total monthly spend converted into currency.
+
+    Returns (total, active count, per-currency breakdown).
+    """
+    rows = fetch_currency_totals(session, user_id, monthly_cost_expr())
+    return convert_totals(rows, currency, rates)
+
+
+def grouped_spend(session: Session, user_id: int, value, column, currency: str, rates: dict[str, float]) -> list[tuple]:
+    """
+    Aggregate value per column group, converted into currency.
+
+    Returns (group, total, count, per-currency breakdown) tuples.
+    """
+    groups: dict = {}
+    for group, *totals in fetch_currency_totals(session, user_id, value, column):
+        groups.setdefault(group, []).append(totals)
+
+    result = []
+    for group, totals in groups.items():
+        total, count, breakdown = convert_totals(totals, currency, rates)
+        result.append((group, total, count, breakdown))
+    return result
+
+
+def category_spend(session: Session, user_id: int, currency: str, rates: dict[str, float]) -> list[dict]:
+    """Monthly spend per category, converted into currency."""
+    return [
+        {
+            "category": category or "Other",
+            "total_amount": round(total, 2),
+            "count": count,
+            "by_currency": breakdown,
+        }
+        for category, total, count, breakdown in grouped_spend(
+            session, user_id, monthly_cost_expr(), Subscription.category, currency, rates
+        )
+    ]
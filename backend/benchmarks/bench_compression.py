@@ -0,0 +1,75 @@
+# benchmarks/bench_compression.py
+"""
+Compression benchmark: CPU time vs bytes saved per encoding and level.
+
+Builds the GET /api/v1/subscriptions JSON for an account with N
+subscriptions (seeded into a throwaway SQLite database) and compresses
+it with gzip and, when installed, brotli at several levels.
+
+Run from the backend directory:
+    python -m benchmarks.bench_compression [rows]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.compression import brotli, compress
+from app.models import Subscription
+from app.serialization import SUBSCRIPTION_ENCODER
+from benchmarks.bench_read_projection import seed
+
+LEVELS = {
+    "gzip": (1, 4, 6, 9),
+    "br": (1, 4, 6, 11),
+}
+
+
+def build_payload(engine, user_id: int) -> bytes:
+    with Session(engine) as session:
+        rows = session.connection().execute(
+            select(*SUBSCRIPTION_ENCODER.columns).where(Subscription.user_id == user_id)
+        ).all()
+    return SUBSCRIPTION_ENCODER.encode(rows)
+
+
+def measure(payload: bytes, encoding: str, level: int, repeat: int = 5) -> None:
+    compressed = compress(payload, encoding, level)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compress(payload, encoding, level)
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    print(
+        f"{encoding:<5} level {level:>2}  {median * 1000:8.1f} ms"
+        f"  {len(compressed) / 1024:9.1f} KiB  ratio {len(payload) / len(compressed):6.1f}x"
+        f"  {len(payload) / median / 1024 / 1024:7.1f} MiB/s"
+    )
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        user_id = seed(engine, rows)
+        payload = build_payload(engine, user_id)
+        engine.dispose()
+
+    print(f"Compressing a {rows}-row subscription list ({len(payload) / 1024:.1f} KiB)")
+    for encoding, levels in LEVELS.items():
+        if encoding == "br" and brotli is None:
+            print("br    skipped (brotli not installed)")
+            continue
+        for level in levels:
+            measure(payload, encoding, level)
+
+
+if __name__ == "__main__":
+    main()
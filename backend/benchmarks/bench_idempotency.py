@@ -0,0 +1,75 @@
+# benchmarks/bench_idempotency.py
+"""
+Write-path benchmark: cost of Idempotency-Key handling.
+
+Runs the app in-process against a throwaway SQLite database and times
+POST /api/v1/subscriptions without the header, with a fresh key per
+request (claim + store), and replays of an already used key (which never
+reach the route).
+
+Run from the backend directory:
+    python -m benchmarks.bench_idempotency [requests]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+TMP = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP, 'bench.db')}"
+os.environ["DB_ECHO"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+
+BODY = {
+    "name": "Streaming",
+    "amount": 9.99,
+    "interval": "monthly",
+    "next_renewal_date": "2030-01-01",
+    "currency": "USD",
+}
+
+
+def measure(label: str, client: TestClient, headers_for, requests: int) -> None:
+    timings = []
+    for i in range(requests):
+        headers = headers_for(i)
+        start = time.perf_counter()
+        response = client.post("/api/v1/subscriptions", json=BODY, headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.text
+    timings.sort()
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1000:7.2f} ms"
+        f"  p95 {timings[int(len(timings) * 0.95)] * 1000:7.2f} ms"
+    )
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        auth = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    with TestClient(app) as client:
+        print(f"POST /api/v1/subscriptions x {requests}")
+        measure("no key", client, lambda i: auth, requests)
+        measure("new key", client, lambda i: {**auth, "Idempotency-Key": f"key-{i}"}, requests)
+        measure("replay", client, lambda i: {**auth, "Idempotency-Key": "key-0"}, requests)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_logging.py
+"""
+Logging benchmark: time a request thread spends logging.
+
+Each simulated request sets a request id and logs what a failed login
+does (a warning naming the email) plus one info record. Three setups:
+
+- sync:    f-string messages, formatted and written by the caller
+           (how the auth routes used to log)
+- queue:   lazy %-style messages through ContextQueueHandler; a
+           QueueListener thread formats JSON and writes
+- sampled: as queue, with failed logins tagged for SamplingFilter
+
+Each setup runs against a temporary file and against a slow sink that
+stalls every write (like stderr piped to a busy log collector). "caller"
+is time spent in the request thread; "drained" includes waiting for the
+writer to catch up.
+
+Run from the backend directory:
+    python -m benchmarks.bench_logging [requests] [slow sink stall in us]
+"""
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from app.core.logs import ContextQueueHandler, JSONFormatter, SamplingFilter, request_id_var
+
+EMAIL = "someone@example.com"
+
+
+class SlowStream:
+    """File wrapper whose writes stall, releasing the GIL like blocked I/O."""
+
+    def __init__(self, stream, stall: float):
+        self.stream = stream
+        self.stall = stall
+
+    def write(self, data: str) -> int:
+        time.sleep(self.stall)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def sync_request(logger: logging.Logger, i: int) -> None:
+    request_id_var.set(f"req-{i}")
+    logger.warning(f"Failed login attempt - incorrect password for: {EMAIL}")
+    logger.info(f"Request req-{i} finished with status 401")
+
+
+def lazy_request(logger: logging.Logger, i: int, extra=None) -> None:
+    request_id_var.set(f"req-{i}")
+    logger.warning("Failed login attempt - incorrect password for: %s", EMAIL, extra=extra)
+    logger.info("Request %s finished with status %s", f"req-{i}", 401)
+
+
+def run(label: str, handler: logging.Handler, requests: int, listener=None, extra=None) -> None:
+    logger = logging.getLogger(f"bench.{label}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    if listener is not None:
+        listener.start()
+    start = time.perf_counter()
+    for i in range(requests):
+        if listener is None:
+            sync_request(logger, i)
+        else:
+            lazy_request(logger, i, extra)
+    caller = time.perf_counter() - start
+    if listener is not None:
+        listener.stop()
+    drained = time.perf_counter() - start
+    handler.close()
+
+    print(
+        f"{label:<16} caller {caller / requests * 1e6:7.2f} us/request"
+        f"  drained {drained / requests * 1e6:7.2f} us/request"
+    )
+
+
+def make_output(path: str, stall: float, formatter: logging.Formatter) -> logging.Handler:
+    output = logging.StreamHandler(SlowStream(open(path, "w"), stall) if stall else open(path, "w"))
+    output.setFormatter(formatter)
+    return output
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    stall = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1e6
+    print(f"{requests} requests, 2 records each")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sink, sink_stall in (("file", 0), ("slow", stall)):
+            sync_output = make_output(
+                os.path.join(tmp, f"sync-{sink}.log"), sink_stall,
+                logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"),
+            )
+            run(f"sync/{sink}", sync_output, requests)
+
+            for label, extra in (("queue", None), ("sampled", {"sample": "auth.login_failed"})):
+                output = make_output(os.path.join(tmp, f"{label}-{sink}.log"), sink_stall, JSONFormatter())
+                log_queue = queue.SimpleQueue()
+                handler = ContextQueueHandler(log_queue)
+                handler.addFilter(SamplingFilter(burst=20, every=100, window=60))
+                listener = QueueListener(log_queue, output)
+                run(f"{label}/{sink}", handler, requests, listener, extra)
+                output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_read_projection.py
+"""
+Read-path benchmark: full entity hydration vs column projection.
+
+Seeds a throwaway SQLite database with one account holding N active
+subscriptions, then compares loading them as Subscription entities
+(the old analytics path) with fetch_billing_records(), which selects
+four columns into BillingRecord tuples.
+
+Run from the backend directory:
+    python -m benchmarks.bench_read_projection [rows]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import Subscription, SubscriptionStatus, User
+from app.services.subscriptions import fetch_billing_records, monthly_cost
+
+
+def seed(engine, rows: int) -> int:
+    today = date.today()
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        session.bulk_insert_mappings(Subscription, [
+            {
+                "name": f"Service {i}",
+                "amount": 9.99 + i % 20,
+                "interval": ("weekly", "monthly", "quarterly", "yearly")[i % 4],
+                "next_renewal_date": today + timedelta(days=i % 365),
+                "category": ("Entertainment", "Productivity", "Utilities")[i % 3],
+                "vendor": f"Vendor {i % 50}",
+                "currency": "USD",
+                "start_date": today,
+                "website": "https://example.com",
+                "description": "A fairly typical description of a subscription. " * 3,
+                "status": SubscriptionStatus.ACTIVE,
+                "user_id": user.id,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ])
+        session.commit()
+        return user.id
+
+
+def load_entities(engine, user_id: int) -> float:
+    with Session(engine) as session:
+        subs = session.exec(select(Subscription).where(
+            Subscription.user_id == user_id,
+            Subscription.status == SubscriptionStatus.ACTIVE
+        )).all()
+        return sum(monthly_cost(s.amount, s.interval, s.custom_interval_days) for s in subs)
+
+
+def load_records(engine, user_id: int) -> float:
+    with Session(engine) as session:
+        records = fetch_billing_records(session, user_id)
+        return sum(r.monthly_cost for r in records)
+
+
+def measure(label: str, fn, engine, user_id: int, repeat: int = 7) -> None:
+    fn(engine, user_id)  # warm up statement caches
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(engine, user_id)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(engine, user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1000:8.1f} ms"
+        f"  peak {peak / 1024 / 1024:7.2f} MiB"
+    )
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        user_id = seed(engine, rows)
+
+        print(f"Loading {rows} active subscriptions for one account")
+        measure("entities", load_entities, engine, user_id)
+        measure("records", load_records, engine, user_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_serialization.py
+"""
+Serialization microbenchmark for subscription list payloads.
+
+Compares the old path (subscription_to_response + jsonable_encoder +
+json.dumps, as FastAPI's default JSONResponse does it) with the
+RowEncoder/orjson path used by the list, dashboard and export routes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization [rows]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.subscriptions import subscription_to_response
+from app.models import Subscription, SubscriptionStatus
+from app.serialization import SUBSCRIPTION_ENCODER
+
+
+def make_subscriptions(count: int) -> list[Subscription]:
+    today = date.today()
+    now = datetime.utcnow()
+    return [
+        Subscription(
+            id=i,
+            name=f"Service {i}",
+            amount=9.99 + i % 20,
+            interval=("weekly", "monthly", "quarterly", "yearly")[i % 4],
+            next_renewal_date=today + timedelta(days=i % 60),
+            category=("Entertainment", "Productivity", "Utilities")[i % 3],
+            vendor=f"Vendor {i % 50}",
+            currency="USD",
+            start_date=today - timedelta(days=365),
+            last_paid_at=today - timedelta(days=i % 30),
+            tags="streaming,family",
+            website="https://example.com",
+            description="A fairly typical description of a subscription.",
+            status=SubscriptionStatus.ACTIVE,
+            user_id=1,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def as_rows(subscriptions: list[Subscription]) -> list[tuple]:
+    attrs = [column.key for column in SUBSCRIPTION_ENCODER.columns]
+    return [tuple(getattr(sub, attr) for attr in attrs) for sub in subscriptions]
+
+
+def before(subscriptions: list[Subscription]) -> bytes:
+    content = jsonable_encoder([subscription_to_response(sub) for sub in subscriptions])
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def after(rows: list[tuple]) -> bytes:
+    return SUBSCRIPTION_ENCODER.encode(rows)
+
+
+def measure(label: str, fn, arg, rows: int, repeat: int = 20) -> None:
+    seconds = min(timeit.repeat(lambda: fn(arg), number=1, repeat=repeat))
+
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_1k = 1000 / rows
+    print(
+        f"{label:<8} {seconds * 1000 * per_1k:8.2f} ms/1k rows"
+        f"  {peak / 1024 * per_1k:9.1f} KiB peak/1k rows"
+        f"  {len(fn(arg)):9d} bytes"
+    )
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    subscriptions = make_subscriptions(rows)
+    tuples = as_rows(subscriptions)
+
+    print(f"Serializing {rows} subscriptions")
+    measure("before", before, subscriptions, rows)
+    measure("after", after, tuples, rows)
+
+
+if __name__ == "__main__":
+    main()
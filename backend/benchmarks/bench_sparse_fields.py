@@ -0,0 +1,72 @@
+# benchmarks/bench_sparse_fields.py
+"""
+List-path benchmark: full subscription rows vs sparse fieldsets.
+
+Seeds a throwaway SQLite database with one account holding N
+subscriptions, then selects and encodes them the way GET
+/api/v1/subscriptions does, once per field set, reporting payload size
+and latency (query + encoding).
+
+Run from the backend directory:
+    python -m benchmarks.bench_sparse_fields [rows]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import Subscription
+from app.serialization import subscription_encoder
+from benchmarks.bench_read_projection import seed
+
+FIELD_SETS = {
+    "all": None,
+    "list view": "id,name,cost,next_renewal",
+    "ids": "id",
+}
+
+
+def fetch_and_encode(engine, user_id: int, fields) -> bytes:
+    encoder = subscription_encoder(fields)
+    with Session(engine) as session:
+        rows = session.connection().execute(
+            select(*encoder.columns)
+            .where(Subscription.user_id == user_id)
+            .order_by(Subscription.next_renewal_date)
+        ).all()
+    return encoder.encode(rows)
+
+
+def measure(label: str, engine, user_id: int, fields, repeat: int = 7) -> None:
+    payload = fetch_and_encode(engine, user_id, fields)  # warm up statement caches
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch_and_encode(engine, user_id, fields)
+        timings.append(time.perf_counter() - start)
+
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1000:8.1f} ms"
+        f"  payload {len(payload) / 1024:9.1f} KiB"
+    )
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        user_id = seed(engine, rows)
+
+        print(f"Listing {rows} subscriptions for one account")
+        for label, fields in FIELD_SETS.items():
+            measure(label, engine, user_id, fields)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
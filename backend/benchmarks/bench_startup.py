@@ -0,0 +1,128 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: import time and time to first successful response.
+
+1. Imports app.main in a fresh interpreter under `-X importtime` and
+   reports the cumulative import time plus the slowest app.* modules.
+2. Starts uvicorn against a throwaway SQLite database and polls
+   GET /health until it answers 200, timing from process spawn.
+
+Exits non-zero when either figure exceeds its threshold, so it can gate
+CI or a deploy.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [--max-import-ms 1500] [--max-ttfr-ms 4000]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time: <self us> | <cumulative us> | <indented module>"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def bench_env(database_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "DB_ECHO": "false",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def measure_import(env: dict) -> tuple[float, list[tuple[float, str]]]:
+    """Cumulative app.main import time (ms) and the slowest app modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        name = match.group(4)
+        if name == "app.main":
+            total = cumulative_ms
+        elif name.startswith("app."):
+            modules.append((cumulative_ms, name))
+    modules.sort(reverse=True)
+    return total, modules[:5]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(env: dict, timeout: float = 30.0) -> float:
+    """Milliseconds from spawning uvicorn until /health returns 200."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"no successful response within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-ttfr-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = bench_env(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        import_ms = statistics.median(total for total, _ in imports)
+        print(f"import app.main       median {import_ms:8.1f} ms over {args.runs} runs")
+        for cumulative_ms, name in imports[-1][1]:
+            print(f"  {name:<30} {cumulative_ms:8.1f} ms")
+
+        ttfr_ms = statistics.median(measure_first_response(env) for _ in range(args.runs))
+        print(f"first /health 200     median {ttfr_ms:8.1f} ms over {args.runs} runs")
+
+    failures = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if args.max_ttfr_ms is not None and ttfr_ms > args.max_ttfr_ms:
+        failures.append(f"time to first response {ttfr_ms:.0f} ms > {args.max_ttfr_ms:.0f} ms")
+    if failures:
+        print("REGRESSION: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
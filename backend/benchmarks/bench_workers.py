@@ -0,0 +1,177 @@
+# benchmarks/bench_workers.py
+"""
+Throughput benchmark: requests per second from 1 to N gunicorn workers.
+
+Seeds a throwaway SQLite database with one user and their subscriptions,
+then for each worker count starts `gunicorn app.main:app` (the production
+launcher, gunicorn.conf.py) and drives it from client processes with
+keep-alive connections for a fixed duration. Reports throughput and the
+speedup over one worker.
+
+Clients run on the same machine and take CPU from the server, so scaling
+flattens before the core count; leave cores free or give --clients less
+than the core count for cleaner numbers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--seconds 10] [--path /api/v1/subscriptions]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUBSCRIPTIONS = 25
+
+
+def bench_env(database_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "DB_ECHO": "false",
+        "JWT_SECRET": "bench-secret",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def seed(env: dict) -> str:
+    """Create the schema and a user with subscriptions; returns a bearer token."""
+    os.environ.update(env)
+    from datetime import date, timedelta
+    from sqlmodel import Session, SQLModel
+    from app.core.security import create_access_token
+    from app.db import engine
+    from app.models import Subscription, User
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        for i in range(SUBSCRIPTIONS):
+            session.add(Subscription(
+                user_id=user.id,
+                name=f"Service {i}",
+                amount=5 + i,
+                interval="monthly",
+                next_renewal_date=date.today() + timedelta(days=i),
+                category=f"Category {i % 5}",
+            ))
+        session.commit()
+        token = create_access_token({"sub": str(user.id)})
+    engine.dispose()
+    return token
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(server: subprocess.Popen, port: int, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError(f"server not up within {timeout:.0f}s")
+
+
+def client(port: int, path: str, headers: dict, seconds: float, results) -> None:
+    """Send requests back to back on one connection; report (ok, errors)."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    ok = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.close()
+    results.put((ok, errors))
+
+
+def measure(env: dict, workers: int, clients: int, seconds: float, path: str, headers: dict) -> tuple[float, int]:
+    """Requests per second and error count with `workers` gunicorn workers."""
+    port = free_port()
+    server_env = {**env, "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "--bind", f"127.0.0.1:{port}"],
+        cwd=BACKEND_DIR, env=server_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(server, port)
+        # Warm every worker's pool and caches before timing
+        client(port, path, headers, 1.0, multiprocessing.Queue())
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client, args=(port, path, headers, seconds, results))
+            for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+    ok = sum(count for count, _ in totals)
+    errors = sum(count for _, count in totals)
+    return ok / seconds, errors
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, *(n for n in (2, 4, 8, 16) if n <= cores), cores})
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--clients", type=int, default=None, help="client processes (default: 2 per worker)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--path", default="/api/v1/subscriptions")
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = bench_env(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        headers = {"Authorization": f"Bearer {seed(env)}"}
+
+        print(f"GET {args.path} for {args.seconds:.0f}s per run, {cores} cores")
+        baseline = None
+        for workers in worker_counts:
+            clients = args.clients or 2 * workers
+            throughput, errors = measure(env, workers, clients, args.seconds, args.path, headers)
+            baseline = baseline or throughput
+            print(
+                f"{workers:>3} workers {clients:>3} clients  {throughput:9.1f} req/s"
+                f"  x{throughput / baseline:5.2f}  errors {errors}"
+            )
+
+
+if __name__ == "__main__":
+    main()
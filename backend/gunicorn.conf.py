@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+"""
+Production server: gunicorn supervising WEB_CONCURRENCY uvicorn workers.
+
+    gunicorn app.main:app
+
+gunicorn loads this file from the working directory. The app is imported
+once in the master (preload_app) and forked, so workers start without
+re-importing it; database engines are created lazily, per worker. Set
+DB_MAX_CONNECTIONS to size each worker's pools from a deployment-wide
+connection budget.
+"""
+import os
+from app.core.config import settings
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = settings.WEB_CONCURRENCY
+worker_class = "app.server.UvicornWorker"
+preload_app = True
+
+# SIGTERM: stop accepting, drain in-flight requests, then exit. The
+# master allows a little longer than the worker's own drain limit.
+graceful_timeout = settings.GRACEFUL_TIMEOUT + 5
+keepalive = 5
+
+# Behind the platform proxy every connection comes from the proxy; trust
+# its X-Forwarded-For so per-IP limits see the real client
+forwarded_allow_ips = settings.FORWARDED_ALLOW_IPS
+
+# The app writes its own request logs
+accesslog = None
+errorlog = "-"
+loglevel = settings.LOG_LEVEL.lower()
+
+
+def post_fork(server, worker):
+    from app.db import dispose_engines
+
+    dispose_engines()
@@ -9,15 +9,14 @@ echo "Python version: $(python3 --version)"
 echo "Python3 path: $(which python3)"
 echo "Pip3 path: $(which pip3)"
 echo ""
-echo "Checking for uvicorn..."
-pip3 show uvicorn || echo "uvicorn package info not available"
+echo "WEB_CONCURRENCY: ${WEB_CONCURRENCY:-1}"
 echo "========================================="
 
-# Try to run uvicorn directly first
-if command -v uvicorn &> /dev/null; then
-    echo "Using uvicorn command directly"
-    exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
+# gunicorn with uvicorn workers (settings in gunicorn.conf.py)
+if command -v gunicorn &> /dev/null; then
+    echo "Using gunicorn"
+    exec gunicorn app.main:app
 else
-    echo "Uvicorn not in PATH, trying python3 -m uvicorn"
-    exec python3 -m uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
+    echo "gunicorn not in PATH, trying python3 -m gunicorn"
+    exec python3 -m gunicorn app.main:app
 fi